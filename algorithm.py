@@ -1,23 +1,55 @@
 import sys
 import copy
+import heapq
+import itertools
 import time
+from operator import itemgetter
+
+# insert_many/delete_many rebuild the whole tree instead of applying keys one
+# by one once the batch is this many times larger than the number of keys the
+# rebuild would carry over unchanged (measured crossover is roughly 3-5x)
+BULK_REBUILD_RATIO = 4
+
+# union/intersection/difference switch from split-and-join recursion to
+# one-key-at-a-time work once either side is this small (measured: the
+# recursion's call overhead dominates below roughly 10-30 keys)
+SET_OPERATION_CUTOFF = 16
 
 class Node:
-    def __init__(self, key, color="RED", parent=None, left=None, right=None):
+    # Slots keep nodes free of a per-instance __dict__; the color is stored as
+    # a bool and exposed as the usual "RED"/"BLACK" string through `color`
+    __slots__ = ('key', 'value', 'red', 'parent', 'left', 'right', 'size', '_snapshot')
+
+    def __init__(self, key, color="RED", parent=None, left=None, right=None, value=None):
         self.key = key
-        self.color = color
+        self.value = value  # Payload when the tree is used as a mapping
+        self.color = color  # Validated by the setter
         self.parent = parent
         self.left = left
         self.right = right
+        self.size = 1  # Nodes in this subtree (0 for TNULL)
+        self._snapshot = None  # Cached SnapshotNode, cleared when the node changes
+
+    @property
+    def color(self):
+        return "RED" if self.red else "BLACK"
+
+    @color.setter
+    def color(self, color):
+        if color not in ("RED", "BLACK"):
+            raise ValueError(f"Invalid node color: {color}")
+        self.red = color == "RED"
     
     def __copy__(self):
-        return Node(self.key, self.color, self.parent, self.left, self.right)
+        return Node(self.key, self.color, self.parent, self.left, self.right, self.value)
     
     def __deepcopy__(self, memo):
         if self in memo:
             return memo[self]
+        if self is TNULL:
+            return self
         
-        new_node = Node(self.key, self.color)
+        new_node = Node(self.key, self.color, value=copy.deepcopy(self.value, memo))
         memo[self] = new_node
         
         # Don't deepcopy parent to avoid circular references
@@ -29,257 +61,1658 @@ class Node:
         
         return new_node
 
+# Black sentinel shared by every RedBlackTree as its TNULL. Nothing writes to
+# it, so trees can exchange subtrees (join, split) without relinking leaves
+TNULL = Node(0, "BLACK")
+TNULL.size = 0
+
+class SnapshotNode:
+    """Immutable copy of a node, shared between operation history snapshots"""
+    # __weakref__ lets render caches key on a snapshot without keeping it alive
+    __slots__ = ('key', 'red', 'left', 'right', 'size', '__weakref__')
+
+    def __init__(self, key, red, left=None, right=None, size=None):
+        self.key = key
+        self.red = red
+        self.left = left
+        self.right = right
+        if size is None:
+            size = left.size + right.size + 1 if left is not None else 0
+        self.size = size  # Nodes in this subtree (0 for SNAPSHOT_NULL)
+
+    @property
+    def color(self):
+        return "RED" if self.red else "BLACK"
+
+SNAPSHOT_NULL = SnapshotNode(0, False)
+
+class TreeSnapshot:
+    """Read-only tree state recorded for one operation step.
+
+    Exposes the same root/TNULL/left/right/color shape as RedBlackTree so it
+    can be visualized directly. Unchanged subtrees are shared with the other
+    snapshots of the same tree, and no operation history is carried along.
+    """
+    def __init__(self, root, size=0):
+        self.root = root
+        self.TNULL = SNAPSHOT_NULL
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def snapshot(self):
+        return self
+
+class Tracer:
+    """Observer for the steps of RedBlackTree operations.
+
+    Tracing is opt-in: a tree without a tracer (the default) skips every hook,
+    so untraced operations do no string formatting, timing or snapshotting.
+    Subclass and override the hooks you need; the defaults do nothing.
+    """
+    def step(self, tree, description, step_type):
+        """Called at each explained step of insert/delete and their fix-ups"""
+
+    def touched(self, tree, node):
+        """Called with each node whose color or child links were changed"""
+
+    def started(self, tree, operation):
+        """Called when an insert, delete or search (operation) begins"""
+
+    def finished(self, tree, operation):
+        """Called once an insert, delete or search (operation) has completed"""
+
+    def compared(self, tree, count):
+        """Called with the number of key comparisons made by a descent"""
+
+    def rotated(self, tree, node, direction):
+        """Called after a 'left' or 'right' rotation at node"""
+
+    def fixup(self, tree, operation):
+        """Called on each iteration of the insert or delete fix-up loop"""
+
+    def allocated(self, tree, count):
+        """Called when count new nodes are created"""
+
+class HistoryTracer(Tracer):
+    """Tracer that records every step in tree.operation_history"""
+    def step(self, tree, description, step_type):
+        tree.add_operation_step(description, step_type)
+
+class ForwardingTracer(Tracer):
+    """Base for tracers that wrap another tracer and pass every hook on to it"""
+    def __init__(self, tracer=None):
+        self.tracer = tracer
+
+    def step(self, tree, description, step_type):
+        if self.tracer is not None:
+            self.tracer.step(tree, description, step_type)
+
+    def touched(self, tree, node):
+        if self.tracer is not None:
+            self.tracer.touched(tree, node)
+
+    def started(self, tree, operation):
+        if self.tracer is not None:
+            self.tracer.started(tree, operation)
+
+    def finished(self, tree, operation):
+        if self.tracer is not None:
+            self.tracer.finished(tree, operation)
+
+    def compared(self, tree, count):
+        if self.tracer is not None:
+            self.tracer.compared(tree, count)
+
+    def rotated(self, tree, node, direction):
+        if self.tracer is not None:
+            self.tracer.rotated(tree, node, direction)
+
+    def fixup(self, tree, operation):
+        if self.tracer is not None:
+            self.tracer.fixup(tree, operation)
+
+    def allocated(self, tree, count):
+        if self.tracer is not None:
+            self.tracer.allocated(tree, count)
+
+class InvariantViolation(AssertionError):
+    """Raised by ValidatingTracer when an operation breaks a tree invariant"""
+
+class ValidatingTracer(ForwardingTracer):
+    """Tracer that re-checks the tree after every insert and delete.
+
+    Only the nodes the operation changed and their ancestors are checked
+    (plus one black-height walk per unchanged child), so each check costs
+    O(log^2 n) at worst rather than a full O(n) validation, which is cheap
+    enough to leave on in staging. Untouched subtrees are assumed valid.
+    Pass another tracer to forward its hooks as well, and override
+    violation() to log instead of raising.
+    """
+    def __init__(self, tracer=None):
+        super().__init__(tracer)
+        self._touched = []
+
+    def touched(self, tree, node):
+        if node is not None and node is not tree.TNULL:
+            self._touched.append(node)
+        super().touched(tree, node)
+
+    def finished(self, tree, operation):
+        if operation != "search":
+            touched, self._touched = self._touched, []
+            message = self.check(tree, touched)
+            if message is not None:
+                self.violation(tree, f"After {operation}: {message}")
+        super().finished(tree, operation)
+
+    def violation(self, tree, message):
+        raise InvariantViolation(message)
+
+    def check(self, tree, nodes):
+        """Return a description of the first violation around nodes, or None"""
+        TNULL = tree.TNULL
+        root = tree.root
+        if TNULL.red or TNULL.size != 0 or TNULL.parent is not None:
+            return "TNULL sentinel was modified"
+        if root is TNULL:
+            return None if tree.black_height == 0 else "Empty tree has a black height"
+        if root.red:
+            return "Root is not black"
+        if root.parent is not None:
+            return "Root has a parent"
+
+        # Every changed node and its ancestors, skipping nodes no longer in the tree
+        pending = set()
+        for node in nodes:
+            path = []
+            while node not in pending:
+                path.append(node)
+                if node is root:
+                    break
+                parent = node.parent
+                if parent is None or (parent.left is not node and parent.right is not node):
+                    path = []
+                    break
+                node = parent
+            pending.update(path)
+
+        # Walk down through the changed nodes only, carrying key bounds and
+        # the black count; an unchanged child subtree is checked at its root
+        black_height = tree.black_height
+        stack = [(root, None, None, 0)]
+        while stack:
+            node, low, high, black_above = stack.pop()
+            key = node.key
+            left, right = node.left, node.right
+            if (low is not None and key < low) or (high is not None and key > high):
+                return f"Node {key} is out of BST order"
+            if node.red is not True and node.red is not False:
+                return f"Node {key} has invalid color"
+            if node.red and (left.red or right.red):
+                return f"Red node {key} has a red child"
+            if node.size != left.size + right.size + 1:
+                return f"Node {key} has size {node.size}, expected {left.size + right.size + 1}"
+            black = black_above + (0 if node.red else 1)
+            for child, child_low, child_high in ((left, low, key), (right, key, high)):
+                if child is TNULL:
+                    if black != black_height:
+                        return f"Path to leaf under {key} has black height {black}, expected {black_height}"
+                elif child.parent is not node:
+                    return f"Node {child.key} has a wrong parent pointer"
+                elif child in pending:
+                    stack.append((child, child_low, child_high, black))
+                elif ((child_low is not None and child.key < child_low)
+                      or (child_high is not None and child.key > child_high)):
+                    return f"Node {child.key} is out of BST order"
+                elif black + self._black_height(tree, child) != black_height:
+                    return f"Subtree under {key} has the wrong black height"
+        return None
+
+    @staticmethod
+    def _black_height(tree, node):
+        """Black nodes on the leftmost path of a subtree assumed to be valid"""
+        count = 0
+        while node is not tree.TNULL:
+            if not node.red:
+                count += 1
+            node = node.left
+        return count
+
+class MetricsTracer(ForwardingTracer):
+    """Tracer that counts hot-path work and records per-operation latency.
+
+    Latencies go into log-scale histograms: bucket b counts operations that
+    took [2**(b-1), 2**b) nanoseconds. The number of fix-up iterations per
+    operation is kept as a histogram too, since long fix-up cascades are
+    what show up as latency spikes. Enable it with tree.enable_metrics().
+
+    Latencies are taken with the tracer installed, so they include its own
+    overhead: the hook calls inside the timed window and the traced code
+    paths, which are slower than the untraced ones. That adds up to a
+    microsecond or two per operation, so compare the figures with each
+    other rather than with timings of an untraced tree.
+    """
+    OPERATIONS = ("insert", "delete", "search")
+
+    def __init__(self, tracer=None):
+        super().__init__(tracer)
+        self.reset()
+
+    def reset(self, tree=None):
+        """Zero every counter; recolors are counted from tree's current total"""
+        self.comparisons = 0
+        self.rotations = {"left": 0, "right": 0}
+        self.fixups = {"insert": 0, "delete": 0}
+        self.allocations = 0
+        self.counts = {operation: 0 for operation in self.OPERATIONS}
+        self.latency = {operation: {} for operation in self.OPERATIONS}
+        self.fixup_depth = {"insert": {}, "delete": {}}
+        self._recolor_base = tree.recolors if tree is not None else 0
+        self._start = None
+        self._operation_fixups = 0
+
+    def started(self, tree, operation):
+        self._operation_fixups = 0
+        self._start = time.perf_counter_ns()
+        super().started(tree, operation)
+
+    def finished(self, tree, operation):
+        if self._start is not None:
+            elapsed = time.perf_counter_ns() - self._start
+            self._start = None
+            buckets = self.latency[operation]
+            bucket = elapsed.bit_length()
+            buckets[bucket] = buckets.get(bucket, 0) + 1
+            self.counts[operation] += 1
+            if operation in self.fixup_depth:
+                depth = self.fixup_depth[operation]
+                depth[self._operation_fixups] = depth.get(self._operation_fixups, 0) + 1
+        super().finished(tree, operation)
+
+    def compared(self, tree, count):
+        self.comparisons += count
+        super().compared(tree, count)
+
+    def rotated(self, tree, node, direction):
+        self.rotations[direction] += 1
+        super().rotated(tree, node, direction)
+
+    def fixup(self, tree, operation):
+        self.fixups[operation] += 1
+        self._operation_fixups += 1
+        super().fixup(tree, operation)
+
+    def allocated(self, tree, count):
+        self.allocations += count
+        super().allocated(tree, count)
+
+    def snapshot(self, tree):
+        """Return the counters and latency summaries as a plain dict"""
+        latency = {}
+        for operation, buckets in self.latency.items():
+            total = sum(buckets.values())
+            summary = {'count': total,
+                       'buckets': {f"<{1 << b}ns": buckets[b] for b in sorted(buckets)}}
+            if total:
+                summary['p50_ns'] = self._percentile(buckets, total, 0.5)
+                summary['p99_ns'] = self._percentile(buckets, total, 0.99)
+                summary['max_ns'] = 1 << max(buckets)
+            latency[operation] = summary
+        return {
+            'comparisons': self.comparisons,
+            'rotations_left': self.rotations["left"],
+            'rotations_right': self.rotations["right"],
+            'recolors': tree.recolors - self._recolor_base,
+            'insert_fixup_iterations': self.fixups["insert"],
+            'delete_fixup_iterations': self.fixups["delete"],
+            'allocations': self.allocations,
+            'operations': dict(self.counts),
+            'fixup_depth': {operation: dict(sorted(depth.items()))
+                            for operation, depth in self.fixup_depth.items()},
+            'latency': latency,
+        }
+
+    @staticmethod
+    def _percentile(buckets, total, fraction):
+        """Upper bound (in ns) of the bucket holding the given fraction of samples"""
+        seen = 0
+        for bucket in sorted(buckets):
+            seen += buckets[bucket]
+            if seen >= fraction * total:
+                return 1 << bucket
+        return 1 << max(buckets)
+
+def _unpickle_tree(cls, keys, values, reds, depths):
+    return cls.from_shape(keys, values, reds, depths)
+
 class RedBlackTree:
-    def __init__(self):
-        self.TNULL = Node(0, "BLACK")
+    _uids = itertools.count()
+
+    def __init__(self, tracer=None):
+        self.TNULL = TNULL
         self.root = self.TNULL
         self.operation_history = []  # Track operations for visualization
+        self.tracer = tracer  # None disables tracing (fast mode)
+        self._snapshots_stale = False  # Set when nodes changed without _touch
+        # (uid, version) identifies the tree's current contents: version goes
+        # up on every change, so caches keyed on it never serve stale results
+        self.uid = next(RedBlackTree._uids)
+        self.version = 0
+        # Kept up to date by every operation so statistics are O(1)
+        self.black_height = 0  # Black nodes on any root-to-leaf path
+        self.rotations = 0
+        self.recolors = 0
+
+    @classmethod
+    def from_sorted(cls, keys, values=None, tracer=None):
+        """Build a tree from keys in ascending order in O(n) time.
+
+        values, if given, holds the payload for each key in the same order.
+        Raises ValueError if the keys are not sorted; use bulk_load for
+        arbitrary input.
+        """
+        keys = list(keys)
+        for i in range(1, len(keys)):
+            if keys[i] < keys[i - 1]:
+                raise ValueError("from_sorted requires keys in ascending order")
+        if values is not None:
+            values = list(values)
+            if len(values) != len(keys):
+                raise ValueError("from_sorted requires one value per key")
+        tree = cls(tracer)
+        tree._load_sorted(keys, values)
+        return tree
+
+    @classmethod
+    def from_shape(cls, keys, values, reds, depths, tracer=None):
+        """Rebuild an exact tree from its in-order keys, colors and depths in O(n) time.
+
+        This is the inverse of _iter_depths. In key order, a node's left
+        child is the shallowest of the deeper nodes just before it (popped
+        off a stack), and a node right after its parent at one level up is
+        that parent's right child. Raises ValueError if the depths do not
+        describe a binary tree.
+        """
+        keys = list(keys)
+        for i in range(1, len(keys)):
+            if keys[i] < keys[i - 1]:
+                raise ValueError("from_shape requires keys in ascending order")
+        if values is None:
+            values = [None] * len(keys)
+        tree = cls(tracer)
+        TNULL = tree.TNULL
+        stack = []
+        links = 0
+        for key, value, red, depth in zip(keys, values, reds, depths):
+            node = Node(key, "RED" if red else "BLACK", left=TNULL, right=TNULL, value=value)
+            popped = None
+            while stack and stack[-1][1] > depth:
+                popped = stack.pop()
+            if popped is not None:
+                if popped[1] != depth + 1 or popped[0].parent is not None:
+                    raise ValueError("Inconsistent node depths")
+                node.left = popped[0]
+                popped[0].parent = node
+                links += 1
+            if stack and stack[-1][1] == depth - 1:
+                parent = stack[-1][0]
+                parent.right = node
+                node.parent = parent
+                links += 1
+            elif stack and stack[-1][1] == depth:
+                raise ValueError("Inconsistent node depths")
+            stack.append((node, depth))
+        # One root at depth 0, every other node linked to exactly one parent
+        if stack and (stack[0][1] != 0 or links != len(keys) - 1):
+            raise ValueError("Inconsistent node depths")
+        tree.root = stack[0][0] if stack else TNULL
+
+        # Parents come before their children here, so sizes are summed in reverse
+        order = []
+        pending = [tree.root] if tree.root is not TNULL else []
+        while pending:
+            node = pending.pop()
+            order.append(node)
+            if node.left is not TNULL:
+                pending.append(node.left)
+            if node.right is not TNULL:
+                pending.append(node.right)
+        for node in reversed(order):
+            node.size = node.left.size + node.right.size + 1
+        node = tree.root
+        while node is not TNULL:
+            tree.black_height += not node.red
+            node = node.left
+        tree._snapshots_stale = True
+        if tracer is not None:
+            tracer.allocated(tree, len(keys))
+        return tree
+
+    def _iter_depths(self):
+        """Yield (node, depth) for every node in key order"""
+        stack = []
+        node, depth = self.root, 0
+        while stack or node is not self.TNULL:
+            while node is not self.TNULL:
+                stack.append((node, depth))
+                node, depth = node.left, depth + 1
+            node, depth = stack.pop()
+            yield node, depth
+            node, depth = node.right, depth + 1
+
+    def __reduce__(self):
+        """Pickle as flat in-order lists instead of linked nodes.
+
+        Pickling linked nodes recurses through every parent and child link,
+        which overflows the stack on large trees, and would also carry
+        operation_history and the tracer. The tree is
+        rebuilt with from_shape, so it keeps its exact shape and colors.
+        """
+        keys = []
+        values = []
+        reds = bytearray()
+        depths = []
+        for node, depth in self._iter_depths():
+            keys.append(node.key)
+            values.append(node.value)
+            reds.append(node.red)
+            depths.append(depth)
+        if all(value is None for value in values):
+            values = None
+        return _unpickle_tree, (type(self), keys, values, bytes(reds), depths)
+
+    @classmethod
+    def bulk_load(cls, keys, values=None, tracer=None):
+        """Sort keys (with their values), then build the tree in linear time"""
+        tree = cls(tracer)
+        if values is None:
+            tree._load_sorted(sorted(keys))
+        else:
+            items = sorted(zip(keys, values), key=itemgetter(0))
+            tree._load_sorted([k for k, _ in items], [v for _, v in items])
+        return tree
+
+    def _load_sorted(self, keys, values=None):
+        """Replace the tree's contents with the sorted keys in O(n) time"""
+        self.version += 1
+        self.root = self._build_sorted(keys, values)
+        n = len(keys)
+        # Every level above the deepest is black; the deepest is black only
+        # when it is complete
+        self.black_height = n.bit_length() if n & (n + 1) == 0 else n.bit_length() - 1
+
+    def _build_sorted(self, keys, values=None):
+        """Return the root of a valid subtree holding the sorted keys.
+
+        Splitting at the midpoint keeps every nil link on the last two
+        levels, so coloring the deepest level red (when it is incomplete)
+        and everything else black satisfies all Red-Black properties.
+        """
+        n = len(keys)
+        if n == 0:
+            return self.TNULL
+        red_depth = n.bit_length() - 1 if n & (n + 1) else -1
+        TNULL = self.TNULL
+
+        def build(lo, hi, depth, parent):
+            if lo > hi:
+                return TNULL
+            mid = (lo + hi) // 2
+            node = Node(keys[mid], "RED" if depth == red_depth else "BLACK", parent)
+            if values is not None:
+                node.value = values[mid]
+            node.left = build(lo, mid - 1, depth + 1, node)
+            node.right = build(mid + 1, hi, depth + 1, node)
+            node.size = hi - lo + 1
+            return node
+
+        self._snapshots_stale = True
+        if self.tracer is not None:
+            self.tracer.allocated(self, n)
+        return build(0, n - 1, 0, None)
 
     def add_operation_step(self, description, operation_type="operation"):
         """Add a step to the operation history for visualization"""
-        # Create deep copy for all operations to ensure accurate visualization
-        tree_copy = copy.deepcopy(self)
-        
         self.operation_history.append({
             'description': description,
-            'tree_state': tree_copy,
+            'tree_state': self.snapshot(),
             'step_type': operation_type,  # Use 'step_type' to match app.py
             'timestamp': time.time()
         })
 
-    def insert(self, key):
-        # Add initial step for all operations
-        self.add_operation_step(f"Starting insertion of {key}", "start")
+    def snapshot(self):
+        """Return an immutable TreeSnapshot of the current tree.
+
+        Only nodes touched since the previous snapshot are copied; every other
+        subtree is reused, so recording a step costs O(log n) per changed node.
+        Untraced operations do not track touched nodes, so the first snapshot
+        after them copies the whole tree once.
+        """
+        if self._snapshots_stale:
+            self._snapshots_stale = False
+            return TreeSnapshot(self._freeze(self.root, refresh=True), self.root.size)
+        return TreeSnapshot(self._freeze(self.root), self.root.size)
+
+    def _freeze(self, node, refresh=False):
+        """Return the SnapshotNode for node, rebuilding only touched subtrees"""
+        if node is self.TNULL:
+            return SNAPSHOT_NULL
+        frozen = node._snapshot
+        if frozen is None or refresh:
+            frozen = SnapshotNode(node.key, node.red,
+                                  self._freeze(node.left, refresh),
+                                  self._freeze(node.right, refresh), node.size)
+            node._snapshot = frozen
+        return frozen
+
+    def _touch(self, node):
+        """Invalidate cached snapshots of a changed node and its ancestors.
+
+        Called (only while tracing) after any change to a node's color or
+        child links. A node without a cached snapshot already has uncached
+        ancestors, so the walk stops there.
+        """
+        self.tracer.touched(self, node)
+        while node is not None and node is not self.TNULL and node._snapshot is not None:
+            node._snapshot = None
+            node = node.parent
+
+    def enable_metrics(self):
+        """Start counting hot-path work with a MetricsTracer.
+
+        The MetricsTracer wraps any tracer already set. Untraced trees skip
+        every metrics hook, so this is off by default.
+        """
+        if self._find_metrics()[1] is None:
+            metrics = MetricsTracer(self.tracer)
+            metrics.reset(self)
+            self.tracer = metrics
+
+    def disable_metrics(self):
+        """Stop counting, keeping any tracer the MetricsTracer wrapped"""
+        outer, metrics = self._find_metrics()
+        if metrics is None:
+            return
+        if outer is None:
+            self.tracer = metrics.tracer
+        else:
+            outer.tracer = metrics.tracer
+
+    def metrics(self):
+        """Return a dict of the counters and latency histograms, or None if disabled"""
+        metrics = self._find_metrics()[1]
+        return metrics.snapshot(self) if metrics is not None else None
+
+    def reset_metrics(self):
+        """Zero the counters and histograms"""
+        metrics = self._find_metrics()[1]
+        if metrics is not None:
+            metrics.reset(self)
+
+    def _find_metrics(self):
+        """Return (wrapping tracer or None, MetricsTracer or None) from the tracer chain"""
+        outer = None
+        tracer = self.tracer
+        while tracer is not None:
+            if isinstance(tracer, MetricsTracer):
+                return outer, tracer
+            if not isinstance(tracer, ForwardingTracer):
+                break
+            outer, tracer = tracer, tracer.tracer
+        return None, None
+
+    def insert(self, key, value=None):
+        tracer = self.tracer
+        if tracer is not None:
+            tracer.started(self, "insert")
+            tracer.step(self, f"Starting insertion of {key}", "start")
         
-        node = Node(key, "RED", left=self.TNULL, right=self.TNULL)
+        node = Node(key, "RED", left=self.TNULL, right=self.TNULL, value=value)
         
         y = None
         x = self.root
 
-        while x != self.TNULL:
+        # Nothing is changed until the descent is done, so a key that cannot
+        # be compared leaves the tree as it was
+        while x is not self.TNULL:
             y = x
-            if node.key < x.key:
+            if key < x.key:
                 x = x.left
             else:
                 x = x.right
 
+        self.version += 1
+        if tracer is None:
+            self._snapshots_stale = True
+        self._grow_path(y)
         node.parent = y
         if y is None:
             self.root = node
-        elif node.key < y.key:
+        elif key < y.key:
             y.left = node
         else:
             y.right = node
 
-        # Add step after basic insertion
-        self.add_operation_step(f"Inserted {key} as red node", "insert")
+        if tracer is not None:
+            tracer.allocated(self, 1)
+            tracer.compared(self, self._depth(y))
+            self._touch(y)
+            tracer.step(self, f"Inserted {key} as red node", "insert")
 
-        if node.parent is None:
-            node.color = "BLACK"
-            self.add_operation_step(f"Root node {key} colored black", "recolor")
-            return
+        if y is None:
+            node.red = False
+            self.black_height = 1
+            self.recolors += 1
+            if tracer is not None:
+                self._touch(node)
+                tracer.step(self, f"Root node {key} colored black", "recolor")
+        elif y.parent is not None:
+            self.fix_insert(node)
 
-        if node.parent.parent is None:
-            return
+        if tracer is not None:
+            tracer.finished(self, "insert")
 
-        self.fix_insert(node)
+    @staticmethod
+    def _grow_path(node):
+        """Count one more node in the subtree of node and of each ancestor"""
+        while node is not None:
+            node.size += 1
+            node = node.parent
 
     def fix_insert(self, k):
-        while k.parent.color == "RED":
-            if k.parent == k.parent.parent.right:
+        tracer = self.tracer
+        while k.parent.red:
+            if tracer is not None:
+                tracer.fixup(self, "insert")
+            if k.parent is k.parent.parent.right:
                 u = k.parent.parent.left
-                if u.color == "RED":
+                if u.red:
                     # Case 1: Uncle is red - recoloring
-                    self.add_operation_step(f"Case 1: Uncle is red - recoloring nodes", "recolor")
-                    u.color = "BLACK"
-                    k.parent.color = "BLACK"
-                    k.parent.parent.color = "RED"
+                    if tracer is not None:
+                        tracer.step(self, "Case 1: Uncle is red - recoloring nodes", "recolor")
+                    u.red = False
+                    k.parent.red = False
+                    k.parent.parent.red = True
+                    self.recolors += 3
+                    if tracer is not None:
+                        self._touch(u)
+                        self._touch(k.parent)
+                        self._touch(k.parent.parent)
                     k = k.parent.parent
                 else:
-                    if k == k.parent.left:
+                    if k is k.parent.left:
                         # Case 2: Uncle is black, node is left child - right rotation
-                        self.add_operation_step(f"Case 2: Right rotation on parent", "rotation")
+                        if tracer is not None:
+                            tracer.step(self, "Case 2: Right rotation on parent", "rotation")
                         k = k.parent
                         self.right_rotate(k)
                     # Case 3: Uncle is black, node is right child - left rotation
-                    self.add_operation_step(f"Case 3: Left rotation on grandparent", "rotation")
-                    k.parent.color = "BLACK"
-                    k.parent.parent.color = "RED"
+                    if tracer is not None:
+                        tracer.step(self, "Case 3: Left rotation on grandparent", "rotation")
+                    k.parent.red = False
+                    k.parent.parent.red = True
+                    self.recolors += 2
+                    if tracer is not None:
+                        self._touch(k.parent)
+                        self._touch(k.parent.parent)
                     self.left_rotate(k.parent.parent)
             else:
                 u = k.parent.parent.right
 
-                if u.color == "RED":
+                if u.red:
                     # Case 1: Uncle is red - recoloring
-                    self.add_operation_step(f"Case 1: Uncle is red - recoloring nodes", "recolor")
-                    u.color = "BLACK"
-                    k.parent.color = "BLACK"
-                    k.parent.parent.color = "RED"
+                    if tracer is not None:
+                        tracer.step(self, "Case 1: Uncle is red - recoloring nodes", "recolor")
+                    u.red = False
+                    k.parent.red = False
+                    k.parent.parent.red = True
+                    self.recolors += 3
+                    if tracer is not None:
+                        self._touch(u)
+                        self._touch(k.parent)
+                        self._touch(k.parent.parent)
                     k = k.parent.parent
                 else:
-                    if k == k.parent.right:
+                    if k is k.parent.right:
                         # Case 2: Uncle is black, node is right child - left rotation
-                        self.add_operation_step(f"Case 2: Left rotation on parent", "rotation")
+                        if tracer is not None:
+                            tracer.step(self, "Case 2: Left rotation on parent", "rotation")
                         k = k.parent
                         self.left_rotate(k)
                     # Case 3: Uncle is black, node is left child - right rotation
-                    self.add_operation_step(f"Case 3: Right rotation on grandparent", "rotation")
-                    k.parent.color = "BLACK"
-                    k.parent.parent.color = "RED"
+                    if tracer is not None:
+                        tracer.step(self, "Case 3: Right rotation on grandparent", "rotation")
+                    k.parent.red = False
+                    k.parent.parent.red = True
+                    self.recolors += 2
+                    if tracer is not None:
+                        self._touch(k.parent)
+                        self._touch(k.parent.parent)
                     self.right_rotate(k.parent.parent)
-            if k == self.root:
+            if k is self.root:
                 break
-        self.root.color = "BLACK"
-        self.add_operation_step("Final step: Root colored black", "recolor")
+        if self.root.red:
+            # Case 1 pushed red up to the root; blackening it adds a black level
+            self.root.red = False
+            self.black_height += 1
+            self.recolors += 1
+        if tracer is not None:
+            self._touch(self.root)
+            tracer.step(self, "Final step: Root colored black", "recolor")
+
+    def _traced_find(self, key, operation):
+        """search or _find_for_delete, reporting its comparisons to the tracer.
+
+        A delete keeps descending past a match to find the last node with
+        key on the path; its finished() hook is called by _delete, or here
+        when the key is missing and the delete ends with the search.
+        """
+        tracer = self.tracer
+        tracer.started(self, operation)
+        found = self.TNULL
+        node = self.root
+        comparisons = 0
+        while node is not self.TNULL:
+            comparisons += 1
+            if node.key == key:
+                found = node
+                if operation == "search":
+                    break
+            if node.key <= key:
+                node = node.right
+            else:
+                node = node.left
+        tracer.compared(self, comparisons)
+        if operation == "search" or found is self.TNULL:
+            tracer.finished(self, operation)
+        return found
+
+    def _depth(self, node):
+        """Number of nodes from the root down to node (0 for None)"""
+        depth = 0
+        while node is not None:
+            depth += 1
+            node = node.parent
+        return depth
 
     def delete_node(self, key):
+        z = self._find_for_delete(key)
+        if z is self.TNULL:
+            print("Key not found in the tree")
+            return
+        self._delete(z)
+
+    def _find_for_delete(self, key):
+        """Return the last node with key on its search path, or TNULL"""
+        if self.tracer is not None:
+            return self._traced_find(key, "delete")
         z = self.TNULL
         node = self.root
-        while node != self.TNULL:
+        while node is not self.TNULL:
             if node.key == key:
                 z = node
             if node.key <= key:
                 node = node.right
             else:
                 node = node.left
+        return z
 
-        if z == self.TNULL:
-            print("Key not found in the tree")
-            return
+    def _delete(self, z):
+        """Unlink node z from the tree and rebalance"""
+        tracer = self.tracer
+        key = z.key
+        self.version += 1
+        if tracer is None:
+            self._snapshots_stale = True
+        else:
+            tracer.step(self, f"Starting deletion of {key}", "start")
 
         y = z
-        y_original_color = y.color
-        if z.left == self.TNULL:
+        y_original_red = y.red
+        # Lowest node whose subtree size changes; sizes are fixed from here up
+        resize_from = z.parent
+        if z.left is self.TNULL:
             x = z.right
             self.rb_transplant(z, z.right)
-        elif z.right == self.TNULL:
+        elif z.right is self.TNULL:
             x = z.left
             self.rb_transplant(z, z.left)
         else:
             y = self.minimum(z.right)
-            y_original_color = y.color
+            y_original_red = y.red
             x = y.right
-            if y.parent == z:
-                x.parent = y
+            if y.parent is z:
+                resize_from = y
             else:
+                resize_from = y.parent
                 self.rb_transplant(y, y.right)
                 y.right = z.right
                 y.right.parent = y
+                if tracer is not None:
+                    self._touch(y)
             
             self.rb_transplant(z, y)
             y.left = z.left
             y.left.parent = y
-            y.color = z.color
+            y.red = z.red
+            if tracer is not None:
+                self._touch(y)
+
+        x_parent = resize_from
+        while resize_from is not None:
+            resize_from.size = resize_from.left.size + resize_from.right.size + 1
+            resize_from = resize_from.parent
+
+        if tracer is not None:
+            tracer.step(self, f"Removed {key} from the tree", "delete")
         
-        if y_original_color == "BLACK":
-            self.fix_delete(x)
+        if not y_original_red:
+            self.fix_delete(x, x_parent)
+
+        if tracer is not None:
+            tracer.finished(self, "delete")
     
-    def fix_delete(self, x):
-        while x != self.root and x.color == "BLACK":
-            if x == x.parent.left:
-                s = x.parent.right
-                if s.color == "RED":
-                    s.color = "BLACK"
-                    x.parent.color = "RED"
-                    self.left_rotate(x.parent)
-                    s = x.parent.right
+    def insert_many(self, keys):
+        """Insert a batch of keys in one sorted pass.
+
+        Small batches are applied in key order, starting each descent from
+        the previously inserted node (a finger) instead of the root, which
+        saves the key comparisons of the upper levels. It does not save the
+        walk itself: each new node still counts itself in the size of every
+        ancestor up to the root, so an insert stays O(log n). Batches much
+        larger than the tree are merged with its keys and rebuilt in linear
+        time.
+        """
+        batch = sorted(keys)
+        if not batch:
+            return
+        if self.tracer is not None:
+            # Keep every step visible to the tracer
+            for key in batch:
+                self.insert(key)
+            return
+        if self.root.size * BULK_REBUILD_RATIO <= len(batch):
+            keys = []
+            values = []
+            new_items = ((key, None) for key in batch)
+            for key, value in heapq.merge(self.items(), new_items, key=itemgetter(0)):
+                keys.append(key)
+                values.append(value)
+            self._load_sorted(keys, values)
+            return
+        finger = None
+        try:
+            for key in batch:
+                finger = self._insert_from(finger, key)
+        finally:
+            # Keys inserted before one that failed to compare still count
+            if finger is not None:
+                self._snapshots_stale = True
+                self.version += 1
+
+    def _insert_from(self, finger, key):
+        """Insert key (>= finger.key) by climbing from finger, then descending.
+
+        The climb stops at the first node whose subtree a root descent for
+        key would enter: either the root, or a left child whose parent's key
+        is greater than key. Only comparisons are saved: the sizes of all
+        the node's ancestors are still updated on the way back up.
+        """
+        TNULL = self.TNULL
+        x = self.root
+        if finger is not None:
+            x = finger
+            while x.parent is not None and not (x is x.parent.left and key < x.parent.key):
+                x = x.parent
+
+        node = Node(key, "RED", left=TNULL, right=TNULL)
+        y = x.parent if x is not TNULL else None
+        while x is not TNULL:
+            y = x
+            if key < x.key:
+                x = x.left
+            else:
+                x = x.right
+
+        self._grow_path(y)
+        node.parent = y
+        if y is None:
+            self.root = node
+            node.red = False
+            self.black_height = 1
+            self.recolors += 1
+            return node
+        if key < y.key:
+            y.left = node
+        else:
+            y.right = node
+        if y.parent is not None:
+            self.fix_insert(node)
+        return node
+
+    def delete_many(self, keys):
+        """Delete a batch of keys in one sorted pass, returning how many were removed.
+
+        Keys that are not in the tree are skipped silently. Batches that remove
+        most of the tree are applied by filtering the tree's keys and rebuilding
+        from what is left.
+        """
+        batch = sorted(keys)
+        if not batch:
+            return 0
+        carried = max(self.root.size - len(batch), 0)
+        if self.tracer is None and carried * BULK_REBUILD_RATIO <= len(batch):
+            kept_keys = []
+            kept_values = []
+            removed = 0
+            i = 0
+            for key, value in self.items():
+                while i < len(batch) and batch[i] < key:
+                    i += 1
+                if i < len(batch) and batch[i] == key:
+                    i += 1
+                    removed += 1
+                else:
+                    kept_keys.append(key)
+                    kept_values.append(value)
+            self._load_sorted(kept_keys, kept_values)
+            return removed
+        removed = 0
+        for key in batch:
+            z = self._find_for_delete(key)
+            if z is not self.TNULL:
+                self._delete(z)
+                removed += 1
+        return removed
+
+    @classmethod
+    def join(cls, left, pivot, right, value=None):
+        """Return a tree holding left's keys, pivot, then right's keys.
+
+        Every key in left must be <= pivot <= every key in right. Runs in
+        O(|bh(left) - bh(right)| + 1) time by hanging the shorter tree off
+        the spine of the taller one. The nodes move into the new tree, so
+        left and right are left empty.
+        """
+        if left is right:
+            raise ValueError("Cannot join a tree with itself")
+        if left.root is not left.TNULL and left.maximum(left.root).key > pivot:
+            raise ValueError("Keys in left must not exceed the pivot")
+        if right.root is not right.TNULL and right.minimum(right.root).key < pivot:
+            raise ValueError("Keys in right must not be below the pivot")
+        tree = cls()
+        node = Node(pivot, left=TNULL, right=TNULL, value=value)
+        tree.root, tree.black_height = tree._join(left.root, left.black_height,
+                                                  node, right.root, right.black_height)
+        left._clear()
+        right._clear()
+        tree.tracer = left.tracer
+        return tree
+
+    def split(self, key):
+        """Split into two trees with the keys < key and the keys >= key.
+
+        Takes O(log n) time. The nodes move into the returned trees, so this
+        tree is left empty.
+        """
+        tracer = self.tracer
+        low = type(self)()
+        high = type(self)()
+        low.root, low.black_height, high.root, high.black_height = low._split(
+            self.root, self.black_height, key, False)
+        self._clear()
+        low.tracer = high.tracer = tracer
+        return low, high
+
+    def union(self, other):
+        """Return a tree with the keys of both trees.
+
+        Keys of other already in this tree are dropped, so values come
+        from this tree. Takes O(m log(n/m + 1)) time for trees of sizes
+        m <= n. Both trees are consumed: their nodes move into the result
+        and they are left empty.
+        """
+        return self._combine(other, self._union)
+
+    def intersection(self, other):
+        """Return a tree with this tree's keys that are also in other.
+
+        Same cost and consumption rules as union().
+        """
+        return self._combine(other, self._intersection)
+
+    def difference(self, other):
+        """Return a tree with this tree's keys that are not in other.
+
+        Same cost and consumption rules as union().
+        """
+        return self._combine(other, self._difference)
+
+    def _combine(self, other, operation):
+        if other is self:
+            raise ValueError("Cannot combine a tree with itself")
+        tree = type(self)()
+        tree.root, tree.black_height = operation(self.root, self.black_height,
+                                                 other.root, other.black_height)
+        self._clear()
+        other._clear()
+        tree.tracer = self.tracer
+        return tree
+
+    def _clear(self):
+        """Drop every node (they have moved to another tree)"""
+        self.root = TNULL
+        self.black_height = 0
+        self._snapshots_stale = True
+        self.version += 1
+
+    # The helpers below work on detached subtrees given as (root, black
+    # height) pairs with black roots. They use this tree's root and
+    # black_height as scratch space for fix_insert, so they run on a fresh,
+    # untraced tree.
+
+    def _detach(self, node, black_height):
+        """Make node the black root of a standalone subtree"""
+        if node is TNULL:
+            return node, 0
+        node.parent = None
+        if node.red:
+            node.red = False
+            self.recolors += 1
+            black_height += 1
+        return node, black_height
+
+    def _join(self, left, left_bh, pivot, right, right_bh):
+        """Join two detached subtrees around the pivot node"""
+        self._snapshots_stale = True
+        if left_bh == right_bh:
+            pivot.red = False
+            pivot.parent = None
+            pivot.left = left
+            pivot.right = right
+            pivot.size = left.size + right.size + 1
+            if left is not TNULL:
+                left.parent = pivot
+            if right is not TNULL:
+                right.parent = pivot
+            return pivot, left_bh + 1
+
+        taller_is_left = left_bh > right_bh
+        if taller_is_left:
+            top, top_bh, short, short_bh = left, left_bh, right, right_bh
+        else:
+            top, top_bh, short, short_bh = right, right_bh, left, left_bh
+
+        # Walk down the inner spine of the taller tree to a black node with
+        # the shorter tree's black height; the pivot replaces it, red
+        parent = None
+        node = top
+        black_height = top_bh
+        added = short.size + 1
+        while node.red or black_height != short_bh:
+            if not node.red:
+                black_height -= 1
+            node.size += added
+            parent = node
+            node = node.right if taller_is_left else node.left
+
+        pivot.red = True
+        pivot.parent = parent
+        if taller_is_left:
+            parent.right = pivot
+            pivot.left = node
+            pivot.right = short
+        else:
+            parent.left = pivot
+            pivot.left = short
+            pivot.right = node
+        pivot.size = node.size + added
+        if node is not TNULL:
+            node.parent = pivot
+        if short is not TNULL:
+            short.parent = pivot
+
+        self.root = top
+        self.black_height = top_bh
+        if parent.red:
+            self.fix_insert(pivot)
+        return self.root, self.black_height
+
+    def _join2(self, left, left_bh, right, right_bh):
+        """Join two detached subtrees without a pivot"""
+        if left is TNULL:
+            return right, right_bh
+        if right is TNULL:
+            return left, left_bh
+        left, left_bh, last = self._split_last(left, left_bh)
+        return self._join(left, left_bh, last, right, right_bh)
+
+    def _split_last(self, node, black_height):
+        """Remove the maximum node of a detached subtree: (rest, rest_bh, last)"""
+        child_bh = black_height - (0 if node.red else 1)
+        rest, rest_bh = self._detach(node.left, child_bh)
+        if node.right is TNULL:
+            return rest, rest_bh, node
+        right, right_bh, last = self._split_last(*self._detach(node.right, child_bh))
+        rest, rest_bh = self._join(rest, rest_bh, node, right, right_bh)
+        return rest, rest_bh, last
+
+    def _split(self, node, black_height, key, inclusive):
+        """Split a detached subtree into keys < key (<= key if inclusive) and the rest"""
+        if node is TNULL:
+            return TNULL, 0, TNULL, 0
+        child_bh = black_height - (0 if node.red else 1)
+        left, left_bh = self._detach(node.left, child_bh)
+        right, right_bh = self._detach(node.right, child_bh)
+        if node.key < key or (inclusive and node.key == key):
+            low, low_bh, high, high_bh = self._split(right, right_bh, key, inclusive)
+            low, low_bh = self._join(left, left_bh, node, low, low_bh)
+        else:
+            low, low_bh, high, high_bh = self._split(left, left_bh, key, inclusive)
+            high, high_bh = self._join(high, high_bh, node, right, right_bh)
+        return low, low_bh, high, high_bh
+
+    def _split3(self, node, black_height, key):
+        """Split a detached subtree into keys < key, == key and > key"""
+        low, low_bh, rest, rest_bh = self._split(node, black_height, key, False)
+        equal, equal_bh, high, high_bh = self._split(rest, rest_bh, key, True)
+        return low, low_bh, equal, high, high_bh
+
+    def _union(self, a, a_bh, b, b_bh):
+        if a is TNULL:
+            return b, b_bh
+        if b is TNULL:
+            return a, a_bh
+        if b.size <= SET_OPERATION_CUTOFF:
+            # Add b's few missing keys to a one by one
+            self.root, self.black_height = a, a_bh
+            missing = [item for item in self._subtree_items(b) if self.search(item[0]) is TNULL]
+            for key, value in missing:
+                self.insert(key, value)
+            return self.root, self.black_height
+        if a.size <= SET_OPERATION_CUTOFF:
+            # Replace b's entries for a's few keys with a's entries
+            items = self._subtree_items(a)
+            self.root, self.black_height = b, b_bh
+            for key, _ in items:
+                self._discard(key)
+            for key, value in items:
+                self.insert(key, value)
+            return self.root, self.black_height
+        child_bh = a_bh - (0 if a.red else 1)
+        a_left, a_left_bh = self._detach(a.left, child_bh)
+        a_right, a_right_bh = self._detach(a.right, child_bh)
+        b_left, b_left_bh, _, b_right, b_right_bh = self._split3(b, b_bh, a.key)
+        left, left_bh = self._union(a_left, a_left_bh, b_left, b_left_bh)
+        right, right_bh = self._union(a_right, a_right_bh, b_right, b_right_bh)
+        return self._join(left, left_bh, a, right, right_bh)
+
+    def _intersection(self, a, a_bh, b, b_bh):
+        if a is TNULL or b is TNULL:
+            return TNULL, 0
+        if b.size <= SET_OPERATION_CUTOFF:
+            keys = sorted({key for key, _ in self._subtree_items(b)})
+            self.root, self.black_height = a, a_bh
+            kept = [(node.key, node.value) for key in keys for node in self._iter_nodes(key, key)]
+            return self._subtree_from_items(kept)
+        if a.size <= SET_OPERATION_CUTOFF:
+            items = self._subtree_items(a)
+            self.root, self.black_height = b, b_bh
+            return self._subtree_from_items([item for item in items
+                                             if self.search(item[0]) is not TNULL])
+        child_bh = a_bh - (0 if a.red else 1)
+        a_left, a_left_bh = self._detach(a.left, child_bh)
+        a_right, a_right_bh = self._detach(a.right, child_bh)
+        b_left, b_left_bh, equal, b_right, b_right_bh = self._split3(b, b_bh, a.key)
+        if equal is TNULL:
+            # Any duplicates of a.key in a's subtrees meet only keys of b
+            # that differ from a.key, so the recursion drops them as well
+            left, left_bh = self._intersection(a_left, a_left_bh, b_left, b_left_bh)
+            right, right_bh = self._intersection(a_right, a_right_bh, b_right, b_right_bh)
+            return self._join2(left, left_bh, right, right_bh)
+        a_left, a_left_bh, same_left, same_left_bh, same_right, same_right_bh, a_right, a_right_bh = \
+            self._split_equal(a_left, a_left_bh, a_right, a_right_bh, a.key)
+        left, left_bh = self._intersection(a_left, a_left_bh, b_left, b_left_bh)
+        right, right_bh = self._intersection(a_right, a_right_bh, b_right, b_right_bh)
+        left, left_bh = self._join2(left, left_bh, same_left, same_left_bh)
+        right, right_bh = self._join2(same_right, same_right_bh, right, right_bh)
+        return self._join(left, left_bh, a, right, right_bh)
+
+    def _difference(self, a, a_bh, b, b_bh):
+        if a is TNULL or b is TNULL:
+            return a, a_bh
+        if b.size <= SET_OPERATION_CUTOFF:
+            self.root, self.black_height = a, a_bh
+            for key, _ in self._subtree_items(b):
+                self._discard(key)
+            return self.root, self.black_height
+        if a.size <= SET_OPERATION_CUTOFF:
+            items = self._subtree_items(a)
+            self.root, self.black_height = b, b_bh
+            return self._subtree_from_items([item for item in items
+                                             if self.search(item[0]) is TNULL])
+        child_bh = a_bh - (0 if a.red else 1)
+        a_left, a_left_bh = self._detach(a.left, child_bh)
+        a_right, a_right_bh = self._detach(a.right, child_bh)
+        b_left, b_left_bh, equal, b_right, b_right_bh = self._split3(b, b_bh, a.key)
+        if equal is TNULL:
+            # Any duplicates of a.key in a's subtrees meet only keys of b
+            # that differ from a.key, so the recursion keeps them as well
+            left, left_bh = self._difference(a_left, a_left_bh, b_left, b_left_bh)
+            right, right_bh = self._difference(a_right, a_right_bh, b_right, b_right_bh)
+            return self._join(left, left_bh, a, right, right_bh)
+        # a.key is in b, so a and its duplicates are all dropped
+        a_left, a_left_bh, _, _, _, _, a_right, a_right_bh = \
+            self._split_equal(a_left, a_left_bh, a_right, a_right_bh, a.key)
+        left, left_bh = self._difference(a_left, a_left_bh, b_left, b_left_bh)
+        right, right_bh = self._difference(a_right, a_right_bh, b_right, b_right_bh)
+        return self._join2(left, left_bh, right, right_bh)
+
+    def _split_equal(self, left, left_bh, right, right_bh, key):
+        """Separate duplicates of key from the two subtrees of a node with key.
+
+        Returns (left < key, left == key, right == key, right > key) as four
+        (root, black height) pairs. Only needed where the other tree holds
+        key as well; the splits then cost O(height) like the split of the
+        other tree, so the set operations keep their O(m log(n/m + 1)) bound.
+        """
+        left, left_bh, same_left, same_left_bh = self._split(left, left_bh, key, False)
+        same_right, same_right_bh, right, right_bh = self._split(right, right_bh, key, True)
+        return left, left_bh, same_left, same_left_bh, same_right, same_right_bh, right, right_bh
+
+    def _subtree_items(self, node):
+        """(key, value) pairs of a detached subtree in order"""
+        items = []
+        node = self.minimum(node)
+        while node is not TNULL:
+            items.append((node.key, node.value))
+            node = self.successor(node)
+        return items
+
+    def _subtree_from_items(self, items):
+        """Build a detached subtree from sorted (key, value) pairs"""
+        self._load_sorted([key for key, _ in items], [value for _, value in items])
+        return self.root, self.black_height
+
+    def _discard(self, key):
+        """Delete every node with key from the scratch root"""
+        z = self._find_for_delete(key)
+        while z is not TNULL:
+            self._delete(z)
+            z = self._find_for_delete(key)
+
+    def fix_delete(self, x, parent=None):
+        """Restore the Red-Black properties after removing a black node.
+
+        x carries the extra black and parent is its parent. Passing the
+        parent explicitly means x may be TNULL without writing to the
+        shared sentinel.
+        """
+        tracer = self.tracer
+        if parent is None:
+            parent = x.parent
+        resolved = False  # Set when case 4 absorbs the extra black
+        while x is not self.root and not x.red:
+            if tracer is not None:
+                tracer.fixup(self, "delete")
+            if x is parent.left:
+                s = parent.right
+                if s.red:
+                    # Case 1: Sibling is red - rotate it above the parent
+                    if tracer is not None:
+                        tracer.step(self, "Case 1: Sibling is red - left rotation on parent", "rotation")
+                    s.red = False
+                    parent.red = True
+                    self.recolors += 2
+                    if tracer is not None:
+                        self._touch(s)
+                        self._touch(parent)
+                    self.left_rotate(parent)
+                    s = parent.right
                 
-                if s.left.color == "BLACK" and s.right.color == "BLACK":
-                    s.color = "RED"
-                    x = x.parent
+                if not s.left.red and not s.right.red:
+                    # Case 2: Sibling and its children are black - recolor sibling
+                    if tracer is not None:
+                        tracer.step(self, "Case 2: Sibling's children are black - recoloring sibling", "recolor")
+                    s.red = True
+                    self.recolors += 1
+                    if tracer is not None:
+                        self._touch(s)
+                    x = parent
+                    parent = x.parent
                 else:
-                    if s.right.color == "BLACK":
-                        s.left.color = "BLACK"
-                        s.color = "RED"
+                    if not s.right.red:
+                        # Case 3: Sibling's far child is black - right rotation on sibling
+                        if tracer is not None:
+                            tracer.step(self, "Case 3: Right rotation on sibling", "rotation")
+                        s.left.red = False
+                        s.red = True
+                        self.recolors += 2
+                        if tracer is not None:
+                            self._touch(s.left)
+                            self._touch(s)
                         self.right_rotate(s)
-                        s = x.parent.right
+                        s = parent.right
                     
-                    s.color = x.parent.color
-                    x.parent.color = "BLACK"
-                    s.right.color = "BLACK"
-                    self.left_rotate(x.parent)
+                    # Case 4: Sibling's far child is red - left rotation on parent
+                    if tracer is not None:
+                        tracer.step(self, "Case 4: Left rotation on parent", "rotation")
+                    s.red = parent.red
+                    parent.red = False
+                    s.right.red = False
+                    self.recolors += 3
+                    if tracer is not None:
+                        self._touch(s)
+                        self._touch(parent)
+                        self._touch(s.right)
+                    self.left_rotate(parent)
                     x = self.root
+                    resolved = True
             else:
-                s = x.parent.left
-                if s.color == "RED":
-                    s.color = "BLACK"
-                    x.parent.color = "RED"
-                    self.right_rotate(x.parent)
-                    s = x.parent.left
+                s = parent.left
+                if s.red:
+                    # Case 1: Sibling is red - rotate it above the parent
+                    if tracer is not None:
+                        tracer.step(self, "Case 1: Sibling is red - right rotation on parent", "rotation")
+                    s.red = False
+                    parent.red = True
+                    self.recolors += 2
+                    if tracer is not None:
+                        self._touch(s)
+                        self._touch(parent)
+                    self.right_rotate(parent)
+                    s = parent.left
                 
-                if s.right.color == "BLACK" and s.left.color == "BLACK":
-                    s.color = "RED"
-                    x = x.parent
+                if not s.right.red and not s.left.red:
+                    # Case 2: Sibling and its children are black - recolor sibling
+                    if tracer is not None:
+                        tracer.step(self, "Case 2: Sibling's children are black - recoloring sibling", "recolor")
+                    s.red = True
+                    self.recolors += 1
+                    if tracer is not None:
+                        self._touch(s)
+                    x = parent
+                    parent = x.parent
                 else:
-                    if s.left.color == "BLACK":
-                        s.right.color = "RED"
-                        s.color = "BLACK"
+                    if not s.left.red:
+                        # Case 3: Sibling's far child is black - left rotation on sibling
+                        if tracer is not None:
+                            tracer.step(self, "Case 3: Left rotation on sibling", "rotation")
+                        s.right.red = False
+                        s.red = True
+                        self.recolors += 2
+                        if tracer is not None:
+                            self._touch(s.right)
+                            self._touch(s)
                         self.left_rotate(s)
-                        s = x.parent.left
+                        s = parent.left
                     
-                    s.color = x.parent.color
-                    x.parent.color = "BLACK"
-                    s.left.color = "BLACK"
-                    self.right_rotate(x.parent)
+                    # Case 4: Sibling's far child is red - right rotation on parent
+                    if tracer is not None:
+                        tracer.step(self, "Case 4: Right rotation on parent", "rotation")
+                    s.red = parent.red
+                    parent.red = False
+                    s.left.red = False
+                    self.recolors += 3
+                    if tracer is not None:
+                        self._touch(s)
+                        self._touch(parent)
+                        self._touch(s.left)
+                    self.right_rotate(parent)
                     x = self.root
-        x.color = "BLACK"
+                    resolved = True
+        if x.red:
+            x.red = False
+            self.recolors += 1
+        elif not resolved:
+            # The extra black reached the root, removing one black level everywhere
+            self.black_height -= 1
+        if tracer is not None:
+            self._touch(x)
+            tracer.step(self, "Final step: Replacement node colored black", "recolor")
     
     def rb_transplant(self, u, v):
         if u.parent is None:
             self.root = v
-        elif u == u.parent.left:
+        elif u is u.parent.left:
             u.parent.left = v
         else:
             u.parent.right = v
-        v.parent = u.parent
+        if v is not self.TNULL:
+            v.parent = u.parent
+        if self.tracer is not None:
+            self._touch(u.parent)
 
     def left_rotate(self, x):
+        self.rotations += 1
         y = x.right
         x.right = y.left
-        if y.left != self.TNULL:
+        if y.left is not self.TNULL:
             y.left.parent = x
 
         y.parent = x.parent
         if x.parent is None:
             self.root = y
-        elif x == x.parent.left:
+        elif x is x.parent.left:
             x.parent.left = y
         else:
             x.parent.right = y
         y.left = x
         x.parent = y
+        y.size = x.size
+        x.size = x.left.size + x.right.size + 1
+        if self.tracer is not None:
+            self.tracer.rotated(self, x, "left")
+            self._touch(x)
+            self._touch(y)
 
     def right_rotate(self, x):
+        self.rotations += 1
         y = x.left
         x.left = y.right
-        if y.right != self.TNULL:
+        if y.right is not self.TNULL:
             y.right.parent = x
 
         y.parent = x.parent
         if x.parent is None:
             self.root = y
-        elif x == x.parent.right:
+        elif x is x.parent.right:
             x.parent.right = y
         else:
             x.parent.left = y
         y.right = x
         x.parent = y
+        y.size = x.size
+        x.size = x.left.size + x.right.size + 1
+        if self.tracer is not None:
+            self.tracer.rotated(self, x, "right")
+            self._touch(x)
+            self._touch(y)
         
+    def __len__(self):
+        return self.root.size
+
+    def select(self, k):
+        """Return the node holding the k-th smallest key (0-based) in O(log n)"""
+        if not 0 <= k < self.root.size:
+            raise IndexError("select index out of range")
+        node = self.root
+        while True:
+            left_size = node.left.size
+            if k < left_size:
+                node = node.left
+            elif k == left_size:
+                return node
+            else:
+                k -= left_size + 1
+                node = node.right
+
+    def rank(self, key):
+        """Return the number of keys smaller than key in O(log n)"""
+        rank = 0
+        node = self.root
+        while node is not self.TNULL:
+            if node.key < key:
+                rank += node.left.size + 1
+                node = node.right
+            else:
+                node = node.left
+        return rank
+
+    # Mapping interface: payloads live on the nodes themselves
+
+    def __getitem__(self, key):
+        node = self.search(key)
+        if node is self.TNULL:
+            raise KeyError(key)
+        return node.value
+
+    def __setitem__(self, key, value):
+        """Set the value for key, updating the existing node in place if present"""
+        node = self.search(key)
+        if node is self.TNULL:
+            self.insert(key, value)
+        else:
+            node.value = value
+            self.version += 1
+
+    def __delitem__(self, key):
+        z = self._find_for_delete(key)
+        if z is self.TNULL:
+            raise KeyError(key)
+        self._delete(z)
+
+    def __contains__(self, key):
+        return self.search(key) is not self.TNULL
+
+    def get(self, key, default=None):
+        node = self.search(key)
+        return default if node is self.TNULL else node.value
+
+    def pop(self, key, *default):
+        """Remove key and return its value, or default if given and key is missing"""
+        z = self._find_for_delete(key)
+        if z is self.TNULL:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        value = z.value
+        self._delete(z)
+        return value
+
+    def keys(self):
+        return self.irange()
+
+    def values(self):
+        """Yield values in key order"""
+        for node in self._iter_nodes():
+            yield node.value
+
+    def items(self):
+        """Yield (key, value) pairs in key order"""
+        for node in self._iter_nodes():
+            yield node.key, node.value
+
     def minimum(self, node):
-        while node.left != self.TNULL:
+        while node.left is not self.TNULL:
             node = node.left
         return node
+
+    def maximum(self, node):
+        while node.right is not self.TNULL:
+            node = node.right
+        return node
+
+    def successor(self, node):
+        """Return the node after node in key order, or TNULL"""
+        if node.right is not self.TNULL:
+            return self.minimum(node.right)
+        parent = node.parent
+        while parent is not None and node is parent.right:
+            node = parent
+            parent = parent.parent
+        return parent if parent is not None else self.TNULL
+
+    def predecessor(self, node):
+        """Return the node before node in key order, or TNULL"""
+        if node.left is not self.TNULL:
+            return self.maximum(node.left)
+        parent = node.parent
+        while parent is not None and node is parent.left:
+            node = parent
+            parent = parent.parent
+        return parent if parent is not None else self.TNULL
+
+    def floor(self, key):
+        """Return the node with the largest key <= key, or TNULL"""
+        found = self.TNULL
+        node = self.root
+        while node is not self.TNULL:
+            if node.key <= key:
+                found = node
+                node = node.right
+            else:
+                node = node.left
+        return found
+
+    def ceiling(self, key):
+        """Return the node with the smallest key >= key, or TNULL"""
+        found = self.TNULL
+        node = self.root
+        while node is not self.TNULL:
+            if node.key >= key:
+                found = node
+                node = node.left
+            else:
+                node = node.right
+        return found
+
+    def __iter__(self):
+        """Yield keys in ascending order.
+
+        Iteration is lazy and walks parent links, so it needs O(1) extra
+        memory. The tree must not be modified while it is being iterated.
+        """
+        return self.irange()
+
+    def __reversed__(self):
+        """Yield keys in descending order"""
+        return self.irange(reverse=True)
+
+    def irange(self, lo=None, hi=None, reverse=False):
+        """Yield keys with lo <= key <= hi in order, visiting O(log n + k) nodes.
+
+        Either bound may be None to leave that side open.
+        """
+        for node in self._iter_nodes(lo, hi, reverse):
+            yield node.key
+
+    def _iter_nodes(self, lo=None, hi=None, reverse=False):
+        """Yield the nodes behind irange"""
+        TNULL = self.TNULL
+        if self.root is TNULL:
+            return
+        if reverse:
+            node = self.maximum(self.root) if hi is None else self.floor(hi)
+            while node is not TNULL and (lo is None or node.key >= lo):
+                yield node
+                node = self.predecessor(node)
+        else:
+            node = self.minimum(self.root) if lo is None else self.ceiling(lo)
+            while node is not TNULL and (hi is None or node.key <= hi):
+                yield node
+                node = self.successor(node)
     
     def search(self, key):
         """Search for a key in the tree"""
-        return self._search_recursive(self.root, key)
-    
-    def _search_recursive(self, node, key):
-        """Recursive search helper"""
-        if node == self.TNULL or key == node.key:
-            return node
-        
-        if key < node.key:
-            return self._search_recursive(node.left, key)
-        else:
-            return self._search_recursive(node.right, key) 
\ No newline at end of file
+        if self.tracer is not None:
+            return self._traced_find(key, "search")
+        node = self.root
+        while node is not self.TNULL and key != node.key:
+            if key < node.key:
+                node = node.left
+            else:
+                node = node.right
+        return node
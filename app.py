@@ -1,38 +1,65 @@
 import streamlit as st
 from algorithm import RedBlackTree
-from utils import plot_tree, get_tree_statistics, count_nodes, get_tree_height
-import copy
+from history import OperationHistory, OP_INSERT, OP_DELETE
+from utils import (plot_tree, render_svg, render_layout_svg, use_native_layout, use_viewport, get_tree_statistics,
+                   count_nodes, get_tree_height, validate_red_black_properties)
+from viewport import DEFAULT_DEPTH, tree_viewport
 import time
 import random
 
+# Expander icons by step type
+STEP_ICONS = {"start": "🟢", "insert": "🔵", "rotation": "🟡", "recolor": "🔴"}
+
 def get_tree():
     if 'tree' not in st.session_state:
         st.session_state.tree = RedBlackTree()
     return st.session_state.tree
 
+def show_svg(svg, max_height=800, fit_width=False):
+    """Embed an SVG render in the page.
+
+    Renders come laid out and cached (see utils.render_svg), so unlike
+    st.graphviz_chart the browser does no layout work on each rerun.
+    """
+    if isinstance(svg, bytes):
+        svg = svg.decode()
+    # Drop Graphviz's XML prolog, and blank lines, which would end the HTML block
+    svg = '\n'.join(line for line in svg[svg.find('<svg'):].splitlines() if line.strip())
+    if fit_width:
+        svg = f'<style>.rbt-fit svg {{ width: 100%; height: auto; }}</style><div class="rbt-fit">{svg}</div>'
+    st.markdown(f'<div style="overflow:auto; max-height:{max_height}px">{svg}</div>', unsafe_allow_html=True)
+
+def show_graph(tree, focus=None, depth=None, view=None, max_height=800, fit_width=False):
+    """Draw the tree (or its viewport) with Graphviz, returning False if there was nothing to draw.
+
+    Without the dot program on the server, the graph is handed to
+    st.graphviz_chart so the browser lays it out instead.
+    """
+    svg = render_svg(tree, focus, depth, view)
+    if svg is not None:
+        show_svg(svg, max_height, fit_width)
+        return True
+    dot = plot_tree(tree, focus, depth, view)
+    if dot is None:
+        return False
+    st.graphviz_chart(dot, use_container_width=fit_width)
+    return True
+
 def get_operation_history():
+    # Steps are positions in an operation log with periodic checkpoints, so
+    # a long session costs at most the history's memory budget
     if 'operation_history' not in st.session_state:
-        st.session_state.operation_history = []
+        st.session_state.operation_history = OperationHistory()
     return st.session_state.operation_history
 
-def add_operation_step(description, tree_state, step_type="operation"):
+def add_operation_step(description, tree, step_type="operation", trace=None):
     history = get_operation_history()
     
     # Check if this is a duplicate of the last step
     if history and history[-1]['description'] == description:
         return  # Skip duplicate steps
     
-    # Limit history size for performance
-    if len(history) > 30:
-        history = history[-25:]  # Keep only last 25 steps
-        st.session_state.operation_history = history
-    
-    history.append({
-        'description': description,
-        'tree_state': copy.deepcopy(tree_state),
-        'step_type': step_type,
-        'timestamp': time.time()
-    })
+    history.record(tree, description, step_type, trace)
 
 def main():
     st.set_page_config(page_title="Red-Black Tree Visualizer", layout="wide")
@@ -47,6 +74,8 @@ def main():
         st.subheader("Algorithm Settings")
         auto_step_delay = st.slider("Step Delay (seconds)", 0.0, 2.0, 0.5, 0.1)
         show_explanations = st.checkbox("Show Step Explanations", value=True)
+        history_budget = st.slider("History Memory (MB)", 1, 64, 8)
+        get_operation_history().memory_budget = history_budget * 1024 * 1024
         
         # Test cases
         st.subheader("📋 Test Cases")
@@ -75,9 +104,10 @@ def main():
             tree.__init__()  # Reset tree
             st.session_state.tree = tree
             
+            history = get_operation_history()
             for value in test_data:
                 add_operation_step(f"Inserting {value}", tree)
-                tree.insert(value)
+                history.insert(tree, value)
                 add_operation_step(f"After inserting {value}", tree, "result")
             
             st.success(f"Loaded {len(test_data)} nodes from {test_case}")
@@ -87,13 +117,20 @@ def main():
             tree = get_tree()
             tree.__init__()
             st.session_state.tree = tree
-            st.session_state.operation_history = []
+            get_operation_history().clear()
             st.success("Tree cleared!")
         
         if st.button("📝 Clear History"):
-            st.session_state.operation_history = []
+            get_operation_history().clear()
             st.success("History cleared!")
 
+    # Validation is the only O(n) statistic, so run it at most once per rerun
+    validation = {}
+    def tree_validation(tree):
+        if 'result' not in validation:
+            validation['result'] = validate_red_black_properties(tree)
+        return validation['result']
+
     # Main content area
     col1, col2 = st.columns([1, 2])
 
@@ -110,30 +147,27 @@ def main():
                 tree = get_tree()
                 # Only track before and after states for better performance
                 add_operation_step(f"Before inserting {insert_value}", tree)
-                tree.insert(insert_value)
+                get_operation_history().insert(tree, insert_value)
                 add_operation_step(f"After inserting {insert_value}", tree, "result")
                 st.success(f"Inserted {insert_value}")
         
         with col_insert2:
             if st.button("🔄 Insert with Steps"):
                 tree = get_tree()
-                # Clear previous operation history
-                tree.operation_history = []
                 
-                # Perform insertion with detailed steps
-                tree.insert(insert_value)
+                # Perform insertion with detailed steps (tracing is off otherwise)
+                trace = get_operation_history().apply(tree, OP_INSERT, insert_value, trace=True)
                 
-                # Only add the final result to avoid overwhelming the history
-                if tree.operation_history:
-                    # Take only the last few meaningful steps
-                    meaningful_steps = []
-                    for step in tree.operation_history:
-                        if step['operation_type'] in ['start', 'rotation', 'recolor']:
-                            meaningful_steps.append(step)
-                    
-                    # Add only the most important steps (max 3)
-                    for step in meaningful_steps[-3:]:
-                        add_operation_step(step['description'], step['tree_state'], step['operation_type'])
+                # Take only the last few meaningful steps
+                meaningful_steps = []
+                for index, (description, step_type) in enumerate(trace):
+                    if step_type in ['start', 'rotation', 'recolor']:
+                        meaningful_steps.append((index, description, step_type))
+                
+                # Add only the most important steps (max 3); their trees are
+                # rebuilt by replaying the insertion when viewed
+                for index, description, step_type in meaningful_steps[-3:]:
+                    add_operation_step(description, tree, step_type, trace=index)
                 
                 st.success(f"Inserted {insert_value} with detailed Red-Black Tree operations")
 
@@ -146,15 +180,21 @@ def main():
             if st.button("🗑️ Delete"):
                 tree = get_tree()
                 add_operation_step(f"Before deleting {delete_value}", tree)
-                tree.delete_node(delete_value)
-                add_operation_step(f"After deleting {delete_value}", tree, "result")
-                st.success(f"Deleted {delete_value}")
+                if get_operation_history().delete(tree, delete_value):
+                    add_operation_step(f"After deleting {delete_value}", tree, "result")
+                    st.success(f"Deleted {delete_value}")
+                else:
+                    st.warning(f"{delete_value} is not in the tree")
         
         with col_delete2:
             if st.button("🔄 Delete with Steps"):
                 tree = get_tree()
-                add_operation_step(f"Starting deletion of {delete_value}", tree)
-                tree.delete_node(delete_value)
+                trace = get_operation_history().apply(tree, OP_DELETE, delete_value, trace=True)
+                
+                # Keep the explained rebalancing steps, then the final state
+                for index, (description, step_type) in enumerate(trace):
+                    if step_type in ['start', 'rotation', 'recolor']:
+                        add_operation_step(description, tree, step_type, trace=index)
                 add_operation_step(f"Completed deletion of {delete_value}", tree, "result")
                 st.success(f"Deleted {delete_value} with detailed steps")
 
@@ -186,32 +226,60 @@ def main():
                 if st.button("🔄 Refresh"):
                     st.rerun()
             
-            # Create and display the tree visualization
-            dot = plot_tree(tree)
-            if dot:
-                # Use a smaller, more compact container
-                if compact_mode:
-                    # Create a very large container for the chart in compact mode
-                    with st.container():
-                        st.markdown("""
-                        <style>
-                        .very-large-chart {
-                            max-width: 1200px;
-                            margin: auto;
-                        }
-                        </style>
-                        """, unsafe_allow_html=True)
-                        st.graphviz_chart(dot, use_container_width=False)
-                else:
+            # Huge trees start in the focus view: the path to one key and a
+            # few levels below it, with every other subtree collapsed
+            focus_view = st.checkbox("Focus View", value=use_viewport(tree))
+            
+            # Create and display the tree visualization. Large trees skip
+            # Graphviz and are drawn by the built-in tidy layout instead
+            if focus_view:
+                if 'view_focus' not in st.session_state:
+                    st.session_state.view_focus = tree.root.key
+                col_focus, col_depth = st.columns(2)
+                with col_focus:
+                    st.session_state.view_focus = st.number_input("Focus key:", value=st.session_state.view_focus, step=1)
+                with col_depth:
+                    view_depth = st.slider("Depth (zoom)", 0, 10, DEFAULT_DEPTH)
+                
+                view = tree_viewport(tree, st.session_state.view_focus, view_depth)
+                # Pan by moving the focus to a neighbouring node
+                col_pan1, col_pan2, col_pan3, col_pan4 = st.columns(4)
+                moves = {}
+                with col_pan1:
+                    moves['up'] = st.button("⬆️ Up", disabled=view.parent_key is None)
+                with col_pan2:
+                    moves['left'] = st.button("↙️ Left", disabled=view.focus.left is view.TNULL)
+                with col_pan3:
+                    moves['right'] = st.button("↘️ Right", disabled=view.focus.right is view.TNULL)
+                with col_pan4:
+                    moves['root'] = st.button("🏠 Root")
+                if any(moves.values()):
+                    if moves['up']:
+                        st.session_state.view_focus = view.parent_key
+                    elif moves['left']:
+                        st.session_state.view_focus = view.focus.left.key
+                    elif moves['right']:
+                        st.session_state.view_focus = view.focus.right.key
+                    else:
+                        st.session_state.view_focus = tree.root.key
+                    st.rerun()
+                
+                show_graph(tree, st.session_state.view_focus, view_depth, view, fit_width=True)
+                st.caption(f"Showing {len(view):,} of {view.total:,} nodes · boxes are collapsed subtrees "
+                           f"(size and black height)")
+            elif use_native_layout(tree):
+                show_svg(render_layout_svg(tree))
+            else:
+                if not compact_mode:
                     # Full-width mode - balanced visualization
                     st.markdown("**Full-size visualization (use container width)**")
-                    st.graphviz_chart(dot, use_container_width=True)
-            else:
-                st.error("❌ Visualization error")
+                # Use a smaller, more compact container in compact mode
+                if not show_graph(tree, fit_width=not compact_mode):
+                    st.error("❌ Visualization error")
             
             # Display compact tree statistics
             if show_stats:
-                # Always recalculate stats to ensure they're up to date
+                # Stats are maintained by the tree, so this is O(1)
                 stats = get_tree_statistics(tree)
                 
                 # Compact metrics display
@@ -220,15 +288,17 @@ def main():
                 with col_stats1:
                     st.metric("Nodes", stats['total_nodes'])
                 with col_stats2:
-                    st.metric("Height", stats['height'])
+                    st.metric("Max Height", stats['height_bound'])
                 with col_stats3:
                     st.metric("Black Height", stats['black_height'])
+                st.caption(f"Rotations: {stats['rotations']} · Recolors: {stats['recolors']}")
                 
                 # Compact validation status
-                if stats['is_valid']:
+                is_valid, validation_message = tree_validation(tree)
+                if is_valid:
                     st.success("✅ Valid Red-Black Tree")
                 else:
-                    st.error("❌ " + stats['validation_message'][:50] + "...")
+                    st.error("❌ " + validation_message[:50] + "...")
         else:
             st.info("🌱 Empty tree - insert nodes to visualize")
 
@@ -316,55 +386,49 @@ def main():
     
     history = get_operation_history()
     if history:
-        # Show the last 10 steps to see more visualizations
-        recent_history = history[-10:] if len(history) > 10 else history
-        
-        for i, step in enumerate(recent_history):
-            step_number = len(history) - len(recent_history) + i + 1
+        # Only the selected step's tree is rebuilt (from the nearest
+        # checkpoint) and drawn; the others are just labels
+        def step_label(index):
+            step = history[index]
+            return f"{STEP_ICONS.get(step['step_type'], '⚪')} Step {history.dropped + index + 1}: {step['description']}"
+        
+        selected = st.selectbox("Step to view:", range(len(history)), index=len(history) - 1,
+                                format_func=step_label)
+        step = history[selected]
+        
+        with st.expander(step_label(selected), expanded=True):
+            st.write(f"**Description:** {step['description']}")
+            st.write(f"**Operation Type:** {step['step_type']}")
             
-            # Color code the expander based on operation type
+            # Add detailed algorithm explanation based on step type
             if step['step_type'] == "start":
-                expander_color = "🟢"
+                st.markdown("**Operation Start:** Initialize insertion process")
             elif step['step_type'] == "insert":
-                expander_color = "🔵"
+                st.markdown("**Basic Insertion:** Insert node as red leaf")
             elif step['step_type'] == "rotation":
-                expander_color = "🟡"
+                st.markdown("**Rotation Operation:** Restructures tree to fix violations")
             elif step['step_type'] == "recolor":
-                expander_color = "🔴"
-            else:
-                expander_color = "⚪"
+                st.markdown("**Recoloring Operation:** Changes node colors to fix violations")
             
-            with st.expander(f"{expander_color} Step {step_number}: {step['description']}", expanded=True):
-                st.write(f"**Description:** {step['description']}")
-                st.write(f"**Operation Type:** {step['step_type']}")
-                
-                # Add detailed algorithm explanation based on step type
-                if step['step_type'] == "start":
-                    st.markdown("**Operation Start:** Initialize insertion process")
-                elif step['step_type'] == "insert":
-                    st.markdown("**Basic Insertion:** Insert node as red leaf")
-                elif step['step_type'] == "rotation":
-                    st.markdown("**Rotation Operation:** Restructures tree to fix violations")
-                elif step['step_type'] == "recolor":
-                    st.markdown("**Recoloring Operation:** Changes node colors to fix violations")
-                
-                # Show tree visualization for each step - make it more prominent
-                st.subheader("🌳 Tree State at This Step")
-                if step['tree_state'].root != step['tree_state'].TNULL:
-                    dot = plot_tree(step['tree_state'])
-                    if dot:
-                        # Make the step visualizations smaller and more compact
-                        col1, col2, col3 = st.columns([1, 2, 1])
-                        with col2:
-                            st.graphviz_chart(dot, use_container_width=False)
-                    else:
+            # Show tree visualization for the step - make it more prominent
+            st.subheader("🌳 Tree State at This Step")
+            tree_state = history.state(step, get_tree())
+            if tree_state.root != tree_state.TNULL and use_native_layout(tree_state):
+                show_svg(render_layout_svg(tree_state), max_height=500)
+            elif tree_state.root != tree_state.TNULL:
+                # Make the step visualizations smaller and more compact
+                col1, col2, col3 = st.columns([1, 2, 1])
+                with col2:
+                    if not show_graph(tree_state, max_height=500):
                         st.write("Empty tree")
-                else:
-                    st.write("Empty tree")
+            else:
+                st.write("Empty tree")
         
-        # Show total steps info
-        if len(history) > 10:
-            st.info(f"Showing last 10 of {len(history)} total steps. Use 'Clear History' to reset.")
+        # Show history size info
+        st.caption(f"{len(history)} steps kept in {history.bytes / (1024 * 1024):.1f} MB "
+                   f"of {history_budget} MB. Use 'Clear History' to reset.")
+        if history.dropped:
+            st.info(f"{history.dropped} older steps were dropped to stay within the memory budget.")
     else:
         st.info("No operations performed yet. Try 'Insert with Steps' to see detailed Red-Black Tree operations!")
 
@@ -488,12 +552,8 @@ def main():
         if st.button("Load Custom Sequence"):
             try:
                 values = [int(x.strip()) for x in custom_input.split(',') if x.strip()]
-                tree = get_tree()
-                tree.__init__()
-                st.session_state.tree = tree
-                
-                for value in values:
-                    tree.insert(value)
+                # Sort once and build in linear time instead of inserting one by one
+                st.session_state.tree = RedBlackTree.bulk_load(values)
                 
                 st.success(f"Loaded {len(values)} custom values!")
             except ValueError:
@@ -552,8 +612,13 @@ def main():
             
             search_time = (search_end - search_start) / 100  # Average search time
             
+            # Compare with linear-time construction from the same data
+            bulk_start = time.time()
+            RedBlackTree.bulk_load(test_data)
+            bulk_time = time.time() - bulk_start
+            
             # Display results
-            col_metrics1, col_metrics2, col_metrics3 = st.columns(3)
+            col_metrics1, col_metrics2, col_metrics3, col_metrics4 = st.columns(4)
             
             with col_metrics1:
                 st.metric("Insertion Time", f"{insertion_time:.4f}s")
@@ -561,6 +626,8 @@ def main():
                 st.metric("Avg Search Time", f"{search_time:.6f}s")
             with col_metrics3:
                 st.metric("Tree Height", get_tree_height(tree))
+            with col_metrics4:
+                st.metric("Bulk Build Time", f"{bulk_time:.4f}s")
             
             st.success(f"Performance test completed with {test_size} nodes ({test_type} pattern)")
     
@@ -584,14 +651,15 @@ def main():
         current_tree = get_tree()
         if current_tree.root != current_tree.TNULL:
             stats = get_tree_statistics(current_tree)
+            is_valid, validation_message = tree_validation(current_tree)
             
-            if stats['is_valid']:
+            if is_valid:
                 st.success("✅ Current tree satisfies all Red-Black properties")
             else:
-                st.error(f"❌ Tree validation failed: {stats['validation_message']}")
+                st.error(f"❌ Tree validation failed: {validation_message}")
             
             st.metric("Black Height", stats['black_height'])
-            st.metric("Total Height", stats['height'])
+            st.metric("Max Height", stats['height_bound'])
         else:
             st.info("🌱 No tree to validate (empty tree)")
 
@@ -0,0 +1,322 @@
+from array import array
+
+# Link arrays hold node indices; 'i' keeps them at 4 bytes per link
+LINK_TYPECODE = 'i'
+
+class ArrayRedBlackTree:
+    """Red-Black Tree stored as parallel typed arrays (struct-of-arrays).
+
+    Node i is described by keys[i], red[i], left[i], right[i] and parent[i].
+    Index 0 is the TNULL sentinel and also stands for "no parent", so the
+    public API matches RedBlackTree with integer indices in place of Node
+    objects. Deleted slots go on a free list threaded through `right` and are
+    reused by later inserts.
+    """
+    TNULL = 0
+
+    def __init__(self, typecode='q'):
+        self.keys = array(typecode, [0])
+        self.red = array('b', [0])
+        self.left = array(LINK_TYPECODE, [0])
+        self.right = array(LINK_TYPECODE, [0])
+        self.parent = array(LINK_TYPECODE, [0])
+        self.root = self.TNULL
+        self._free = 0  # Head of the free slot list, 0 when empty
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def _new_node(self, key):
+        """Allocate a red node for key, reusing a freed slot when possible"""
+        node = self._free
+        if node:
+            self._free = self.right[node]
+            self.keys[node] = key
+            self.red[node] = 1
+            self.left[node] = 0
+            self.right[node] = 0
+            self.parent[node] = 0
+        else:
+            node = len(self.keys)
+            self.keys.append(key)
+            self.red.append(1)
+            self.left.append(0)
+            self.right.append(0)
+            self.parent.append(0)
+        self._count += 1
+        return node
+
+    def _free_node(self, node):
+        """Return a slot to the free list"""
+        self.keys[node] = 0
+        self.red[node] = 0
+        self.left[node] = 0
+        self.parent[node] = 0
+        self.right[node] = self._free
+        self._free = node
+        self._count -= 1
+
+    def insert(self, key):
+        keys, left, right, parent = self.keys, self.left, self.right, self.parent
+        node = self._new_node(key)
+
+        y = 0
+        x = self.root
+        while x:
+            y = x
+            if key < keys[x]:
+                x = left[x]
+            else:
+                x = right[x]
+
+        parent[node] = y
+        if not y:
+            self.root = node
+        elif key < keys[y]:
+            left[y] = node
+        else:
+            right[y] = node
+
+        if not y:
+            self.red[node] = 0
+            return
+
+        if not parent[y]:
+            return
+
+        self.fix_insert(node)
+
+    def fix_insert(self, k):
+        red, left, right, parent = self.red, self.left, self.right, self.parent
+        while red[parent[k]]:
+            p = parent[k]
+            g = parent[p]
+            if p == right[g]:
+                u = left[g]
+                if red[u]:
+                    # Case 1: Uncle is red - recoloring
+                    red[u] = 0
+                    red[p] = 0
+                    red[g] = 1
+                    k = g
+                else:
+                    if k == left[p]:
+                        # Case 2: Uncle is black, node is left child - right rotation
+                        k = p
+                        self.right_rotate(k)
+                        p = parent[k]
+                    # Case 3: Uncle is black, node is right child - left rotation
+                    red[p] = 0
+                    red[g] = 1
+                    self.left_rotate(g)
+            else:
+                u = right[g]
+                if red[u]:
+                    # Case 1: Uncle is red - recoloring
+                    red[u] = 0
+                    red[p] = 0
+                    red[g] = 1
+                    k = g
+                else:
+                    if k == right[p]:
+                        # Case 2: Uncle is black, node is right child - left rotation
+                        k = p
+                        self.left_rotate(k)
+                        p = parent[k]
+                    # Case 3: Uncle is black, node is left child - right rotation
+                    red[p] = 0
+                    red[g] = 1
+                    self.right_rotate(g)
+            if k == self.root:
+                break
+        red[self.root] = 0
+
+    def delete_node(self, key):
+        keys, red, left, right, parent = self.keys, self.red, self.left, self.right, self.parent
+        z = 0
+        node = self.root
+        while node:
+            if keys[node] == key:
+                z = node
+            if keys[node] <= key:
+                node = right[node]
+            else:
+                node = left[node]
+
+        if not z:
+            print("Key not found in the tree")
+            return
+
+        y = z
+        y_original_red = red[y]
+        if not left[z]:
+            x = right[z]
+            self.rb_transplant(z, x)
+        elif not right[z]:
+            x = left[z]
+            self.rb_transplant(z, x)
+        else:
+            y = self.minimum(right[z])
+            y_original_red = red[y]
+            x = right[y]
+            if parent[y] == z:
+                parent[x] = y
+            else:
+                self.rb_transplant(y, x)
+                right[y] = right[z]
+                parent[right[y]] = y
+
+            self.rb_transplant(z, y)
+            left[y] = left[z]
+            parent[left[y]] = y
+            red[y] = red[z]
+
+        self._free_node(z)
+        if not y_original_red:
+            self.fix_delete(x)
+
+    def fix_delete(self, x):
+        red, left, right, parent = self.red, self.left, self.right, self.parent
+        while x != self.root and not red[x]:
+            p = parent[x]
+            if x == left[p]:
+                s = right[p]
+                if red[s]:
+                    red[s] = 0
+                    red[p] = 1
+                    self.left_rotate(p)
+                    s = right[p]
+
+                if not red[left[s]] and not red[right[s]]:
+                    red[s] = 1
+                    x = p
+                else:
+                    if not red[right[s]]:
+                        red[left[s]] = 0
+                        red[s] = 1
+                        self.right_rotate(s)
+                        s = right[p]
+
+                    red[s] = red[p]
+                    red[p] = 0
+                    red[right[s]] = 0
+                    self.left_rotate(p)
+                    x = self.root
+            else:
+                s = left[p]
+                if red[s]:
+                    red[s] = 0
+                    red[p] = 1
+                    self.right_rotate(p)
+                    s = left[p]
+
+                if not red[right[s]] and not red[left[s]]:
+                    red[s] = 1
+                    x = p
+                else:
+                    if not red[left[s]]:
+                        red[right[s]] = 0
+                        red[s] = 1
+                        self.left_rotate(s)
+                        s = left[p]
+
+                    red[s] = red[p]
+                    red[p] = 0
+                    red[left[s]] = 0
+                    self.right_rotate(p)
+                    x = self.root
+        red[x] = 0
+
+    def rb_transplant(self, u, v):
+        parent = self.parent
+        up = parent[u]
+        if not up:
+            self.root = v
+        elif u == self.left[up]:
+            self.left[up] = v
+        else:
+            self.right[up] = v
+        parent[v] = up
+
+    def left_rotate(self, x):
+        left, right, parent = self.left, self.right, self.parent
+        y = right[x]
+        right[x] = left[y]
+        if left[y]:
+            parent[left[y]] = x
+
+        xp = parent[x]
+        parent[y] = xp
+        if not xp:
+            self.root = y
+        elif x == left[xp]:
+            left[xp] = y
+        else:
+            right[xp] = y
+        left[y] = x
+        parent[x] = y
+
+    def right_rotate(self, x):
+        left, right, parent = self.left, self.right, self.parent
+        y = left[x]
+        left[x] = right[y]
+        if right[y]:
+            parent[right[y]] = x
+
+        xp = parent[x]
+        parent[y] = xp
+        if not xp:
+            self.root = y
+        elif x == right[xp]:
+            right[xp] = y
+        else:
+            left[xp] = y
+        right[y] = x
+        parent[x] = y
+
+    def minimum(self, node):
+        left = self.left
+        while left[node]:
+            node = left[node]
+        return node
+
+    def search(self, key):
+        """Search for a key in the tree, returning its index or TNULL"""
+        keys, left, right = self.keys, self.left, self.right
+        node = self.root
+        while node and key != keys[node]:
+            if key < keys[node]:
+                node = left[node]
+            else:
+                node = right[node]
+        return node
+
+    def irange(self, lo=None, hi=None):
+        """Yield keys with lo <= key <= hi in order (either bound may be None)"""
+        keys, left, right = self.keys, self.left, self.right
+        stack = []
+        node = self.root
+        while stack or node:
+            while node:
+                if lo is not None and keys[node] < lo:
+                    node = right[node]
+                else:
+                    stack.append(node)
+                    node = left[node]
+            if not stack:
+                return
+            node = stack.pop()
+            key = keys[node]
+            if hi is not None and key > hi:
+                return
+            yield key
+            node = right[node]
+
+    def __iter__(self):
+        return self.irange()
+
+    def memory_usage(self):
+        """Bytes held by the node arrays"""
+        return sum(arr.buffer_info()[1] * arr.itemsize
+                   for arr in (self.keys, self.red, self.left, self.right, self.parent))
@@ -0,0 +1,80 @@
+"""Scaling benchmark for ShardedRedBlackTree.
+
+Times a bulk build, batched inserts, batched lookups and a full range scan
+for several shard counts, each shard in its own worker process, and reports
+the speedup over one shard. Speedup is bounded by the number of cores, so
+shard counts above os.cpu_count() are not expected to help.
+
+    python benchmarks/bench_sharded.py --size 1000000 --shards 1 2 4 8
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sharded import ShardedRedBlackTree
+
+OPERATIONS = ['bulk_load', 'insert_many', 'search_many', 'scan']
+
+def run_case(shards, keys, extra, probes, repeat):
+    """Return the best of repeat timings (seconds) for each operation"""
+    best = {operation: float('inf') for operation in OPERATIONS}
+    for _ in range(repeat):
+        with ShardedRedBlackTree(shards=shards) as tree:
+            timings = {}
+            start = time.perf_counter()
+            tree.bulk_load(keys)
+            timings['bulk_load'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            tree.insert_many(extra)
+            timings['insert_many'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            tree.search_many(probes)
+            timings['search_many'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in tree.irange():
+                pass
+            timings['scan'] = time.perf_counter() - start
+        for operation, seconds in timings.items():
+            best[operation] = min(best[operation], seconds)
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark sharded tree scaling")
+    parser.add_argument('--size', type=int, default=200000)
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    keys = [rng.random() for _ in range(args.size)]
+    extra = [rng.random() for _ in range(args.size)]
+    probes = [rng.random() for _ in range(args.size)]
+
+    print(f"{args.size} keys, {os.cpu_count()} CPUs")
+    results = {}
+    for shards in args.shards:
+        results[shards] = run_case(shards, keys, extra, probes, args.repeat)
+    baseline = results[args.shards[0]]
+    for shards, timings in results.items():
+        cells = "  ".join(f"{operation} {timings[operation]:7.3f}s "
+                          f"({baseline[operation] / timings[operation]:4.2f}x)"
+                          for operation in OPERATIONS)
+        print(f"{shards:>3} shards: {cells}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'size': args.size, 'cpus': os.cpu_count(), 'seconds': results},
+                      f, indent=2, sort_keys=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Load generator for tree_service.
+
+Opens several connections, keeps a fixed number of requests in flight on
+each (pipelining), and reports throughput and p50/p99 latency. Without
+--port or --unix it starts a server in this process first.
+
+    python benchmarks/loadgen.py --connections 8 --pipeline 32 --requests 200000
+    python benchmarks/loadgen.py --port 8765 --mix search=0.9,insert=0.1
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tree_service import TreeClient, TreeServer
+
+DEFAULT_MIX = 'search=0.6,insert=0.2,delete=0.1,range=0.05,rank=0.05'
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, weight = part.split('=')
+        if name not in ('search', 'insert', 'delete', 'range', 'rank'):
+            raise ValueError(f"Unknown operation {name!r}")
+        mix[name] = float(weight)
+    return mix
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
+async def worker(client, operations, key_space, rng, latencies, remaining):
+    names, weights = zip(*operations.items())
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        name = rng.choices(names, weights)[0]
+        key = rng.randrange(key_space)
+        start = time.perf_counter()
+        if name == 'search':
+            await client.search(key)
+        elif name == 'insert':
+            await client.insert(key)
+        elif name == 'delete':
+            await client.delete(key)
+        elif name == 'range':
+            await client.range(key, key + 100, 10)
+        else:
+            await client.rank(key)
+        latencies.append(time.perf_counter() - start)
+
+async def run(args):
+    server = None
+    if args.unix or args.port:
+        address = args.unix or (args.host, args.port)
+    else:
+        server = TreeServer()
+        address = await server.start(args.host, 0)
+        server.tree.insert_many(range(0, args.key_space, 2))
+
+    async def connect():
+        if args.unix:
+            return await TreeClient.connect_unix(args.unix)
+        return await TreeClient.connect(*address[:2])
+
+    clients = [await connect() for _ in range(args.connections)]
+    operations = parse_mix(args.mix)
+    latencies = []
+    remaining = [args.requests]
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(client, operations, args.key_space,
+                                  random.Random(rng.random()), latencies, remaining)
+                           for client in clients for _ in range(args.pipeline)))
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        await client.close()
+
+    latencies.sort()
+    print(f"{len(latencies)} requests over {args.connections} connections "
+          f"x {args.pipeline} in flight: {len(latencies) / elapsed:,.0f} req/s")
+    print(f"latency p50 {percentile(latencies, 0.5) * 1e6:,.0f} us, "
+          f"p99 {percentile(latencies, 0.99) * 1e6:,.0f} us")
+    if server is not None:
+        print(f"server applied {server.requests} requests in {server.batches} batches "
+              f"({server.requests / max(server.batches, 1):.1f} per batch)")
+        await server.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate load against the tree service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help="Use a running server on this port")
+    parser.add_argument('--unix', help="Use a running server on this Unix socket")
+    parser.add_argument('--connections', type=int, default=4)
+    parser.add_argument('--pipeline', type=int, default=16, help="Requests in flight per connection")
+    parser.add_argument('--requests', type=int, default=100000)
+    parser.add_argument('--key-space', type=int, default=100000)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="Operation weights, e.g. search=0.9,insert=0.1")
+    parser.add_argument('--seed', type=int, default=0)
+    asyncio.run(run(parser.parse_args(argv)))
+
+if __name__ == "__main__":
+    main()
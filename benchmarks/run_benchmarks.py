@@ -0,0 +1,326 @@
+"""Headless benchmark suite for the Red-Black Tree engine.
+
+Times insert, delete, search, iteration and mixed workloads for the tree and
+for two baselines (a sorted list maintained with bisect, and a dict of key
+counts) across sizes and key patterns, then writes the results as JSON so
+runs can be diffed.
+
+    python benchmarks/run_benchmarks.py --sizes 1000 10000 --output before.json
+    python benchmarks/run_benchmarks.py --compare before.json after.json
+"""
+import argparse
+import bisect
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from algorithm import RedBlackTree
+
+SIZES = [1000, 10000, 100000, 1000000]
+PATTERNS = ['random', 'sequential', 'balanced', 'reverse', 'zipfian', 'duplicates']
+WORKLOADS = ['insert', 'delete', 'search', 'iterate', 'mixed']
+ZIPF_EXPONENT = 1.1
+
+# Key patterns
+
+def balanced_keys(n):
+    """Midpoint-first order of 1..n, as built by add_balanced in app.py"""
+    keys = []
+    stack = [(1, n)]
+    while stack:
+        start, end = stack.pop()
+        if start <= end:
+            mid = (start + end) // 2
+            keys.append(mid)
+            stack.append((mid + 1, end))
+            stack.append((start, mid - 1))
+    return keys
+
+def zipfian_keys(n, rng):
+    """n draws from a Zipf distribution over n ranks, with shuffled rank-to-key mapping"""
+    weights = [1.0 / rank ** ZIPF_EXPONENT for rank in range(1, n + 1)]
+    total = 0.0
+    cumulative = []
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    ranks = list(range(n))
+    rng.shuffle(ranks)
+    return rng.choices(ranks, cum_weights=cumulative, k=n)
+
+def generate_keys(pattern, n, rng):
+    if pattern == 'random':
+        return [rng.randint(0, 10 * n) for _ in range(n)]
+    if pattern == 'sequential':
+        return list(range(1, n + 1))
+    if pattern == 'balanced':
+        return balanced_keys(n)
+    if pattern == 'reverse':
+        return list(range(n, 0, -1))
+    if pattern == 'zipfian':
+        return zipfian_keys(n, rng)
+    if pattern == 'duplicates':
+        return [rng.randint(0, max(n // 100, 1)) for _ in range(n)]
+    raise ValueError(f"Unknown key pattern: {pattern}")
+
+# Engines: each builds a structure from keys (untimed) and exposes the timed operations
+
+class TreeEngine:
+    name = 'rbtree'
+
+    def build(self, keys):
+        return RedBlackTree.bulk_load(keys)
+
+    def empty(self):
+        return RedBlackTree()
+
+    def operations(self, tree):
+        return tree.insert, tree.search, tree.delete_node
+
+    def iterate(self, tree):
+        for _ in tree:
+            pass
+
+class BisectEngine:
+    name = 'bisect'
+
+    def build(self, keys):
+        return sorted(keys)
+
+    def empty(self):
+        return []
+
+    def operations(self, items):
+        def insert(key):
+            bisect.insort(items, key)
+
+        def search(key):
+            i = bisect.bisect_left(items, key)
+            return i < len(items) and items[i] == key
+
+        def delete(key):
+            i = bisect.bisect_left(items, key)
+            if i < len(items) and items[i] == key:
+                del items[i]
+
+        return insert, search, delete
+
+    def iterate(self, items):
+        for _ in items:
+            pass
+
+class DictEngine:
+    """Unordered baseline: a dict of key counts (iteration is not sorted)"""
+    name = 'dict'
+
+    def build(self, keys):
+        counts = {}
+        for key in keys:
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def empty(self):
+        return {}
+
+    def operations(self, counts):
+        def insert(key):
+            counts[key] = counts.get(key, 0) + 1
+
+        def search(key):
+            return key in counts
+
+        def delete(key):
+            count = counts.get(key)
+            if count == 1:
+                del counts[key]
+            elif count:
+                counts[key] = count - 1
+
+        return insert, search, delete
+
+    def iterate(self, counts):
+        for _ in counts:
+            pass
+
+ENGINES = {engine.name: engine for engine in (TreeEngine(), BisectEngine(), DictEngine())}
+
+# Workloads: each returns (setup, run, ops) where setup() builds fresh state
+# untimed, run(state) performs the timed operations and ops counts them
+
+def mixed_plan(keys, extra, rng):
+    """Half searches, a quarter inserts and a quarter deletes of present keys"""
+    removable = keys[:]
+    rng.shuffle(removable)
+    inserted = deque()
+    plan = []
+    extra = iter(extra)
+    for _ in range(len(keys)):
+        roll = rng.random()
+        if roll < 0.5:
+            plan.append((1, rng.choice(keys)))
+        elif roll < 0.75:
+            key = next(extra)
+            inserted.append(key)
+            plan.append((0, key))
+        elif inserted:
+            plan.append((2, inserted.popleft()))
+        elif removable:
+            plan.append((2, removable.pop()))
+    return plan
+
+def make_workload(workload, engine, keys, rng):
+    if workload == 'insert':
+        def run(state):
+            insert = engine.operations(state)[0]
+            for key in keys:
+                insert(key)
+        return engine.empty, run, len(keys)
+
+    if workload == 'delete':
+        order = keys[:]
+        rng.shuffle(order)
+
+        def run(state):
+            delete = engine.operations(state)[2]
+            for key in order:
+                delete(key)
+        return lambda: engine.build(keys), run, len(order)
+
+    if workload == 'search':
+        probes = rng.choices(keys, k=len(keys))
+        state = engine.build(keys)
+
+        def run(state):
+            search = engine.operations(state)[1]
+            for key in probes:
+                search(key)
+        return lambda: state, run, len(probes)
+
+    if workload == 'iterate':
+        state = engine.build(keys)
+        return lambda: state, engine.iterate, len(keys)
+
+    if workload == 'mixed':
+        extra = [rng.randint(0, 10 * len(keys)) for _ in range(len(keys))]
+        plan = mixed_plan(keys, extra, rng)
+
+        def run(state):
+            ops = engine.operations(state)
+            for op, key in plan:
+                ops[op](key)
+        return lambda: engine.build(keys), run, len(plan)
+
+    raise ValueError(f"Unknown workload: {workload}")
+
+# Measurement
+
+def percentile(sorted_values, fraction):
+    """Linearly interpolated percentile of an already sorted list"""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    position = fraction * (len(sorted_values) - 1)
+    low = int(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+def measure(setup, run, ops, repeat):
+    """Time run() over repeat fresh setups and summarise nanoseconds per operation"""
+    seconds = []
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        seconds.append(time.perf_counter() - start)
+    per_op = sorted(s * 1e9 / max(ops, 1) for s in seconds)
+    median = percentile(per_op, 0.5)
+    return {
+        'ops': ops,
+        'trials': repeat,
+        'seconds': seconds,
+        'ns_per_op': {
+            'min': per_op[0],
+            'p50': median,
+            'p90': percentile(per_op, 0.9),
+            'max': per_op[-1],
+            'mean': sum(per_op) / len(per_op),
+        },
+        'ops_per_sec': 1e9 / median if median else None,
+    }
+
+def run_suite(sizes, patterns, workloads, engines, repeat, seed, log=print):
+    results = []
+    for size in sizes:
+        for pattern in patterns:
+            keys = generate_keys(pattern, size, random.Random(f"{seed}-{pattern}-{size}"))
+            for workload in workloads:
+                for name in engines:
+                    engine = ENGINES[name]
+                    # Same random plan for every engine on a given case
+                    rng = random.Random(f"{seed}-{pattern}-{size}-{workload}")
+                    setup, run, ops = make_workload(workload, engine, keys, rng)
+                    row = {'engine': name, 'workload': workload, 'pattern': pattern, 'size': size}
+                    row.update(measure(setup, run, ops, repeat))
+                    results.append(row)
+                    log(f"{name:>7} {workload:>8} {pattern:>10} {size:>8}: "
+                        f"{row['ns_per_op']['p50']:10.1f} ns/op (p90 {row['ns_per_op']['p90']:.1f})")
+    return results
+
+def compare(old_path, new_path):
+    """Print the p50 ratio (new / old) for every case present in both files"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def case(row):
+        return row['engine'], row['workload'], row['pattern'], row['size']
+
+    before = {case(row): row['ns_per_op']['p50'] for row in old['results']}
+    for row in new['results']:
+        if case(row) in before and before[case(row)]:
+            ratio = row['ns_per_op']['p50'] / before[case(row)]
+            engine, workload, pattern, size = case(row)
+            print(f"{engine:>7} {workload:>8} {pattern:>10} {size:>8}: {ratio:6.2f}x")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Red-Black Tree engine")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--patterns', nargs='+', choices=PATTERNS, default=PATTERNS)
+    parser.add_argument('--workloads', nargs='+', choices=WORKLOADS, default=WORKLOADS)
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), default=list(ENGINES))
+    parser.add_argument('--repeat', type=int, default=5, help="Trials per case")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help="Compare two result files instead of running")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = run_suite(args.sizes, args.patterns, args.workloads, args.engines,
+                        args.repeat, args.seed)
+    report = {
+        'meta': {
+            'python': sys.version,
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+if __name__ == "__main__":
+    main()
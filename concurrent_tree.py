@@ -0,0 +1,131 @@
+import threading
+from persistent import PersistentRedBlackTree, TNULL
+
+class ConcurrentRedBlackTree:
+    """Thread-safe Red-Black Tree with lock-free readers.
+
+    The contents live in an immutable PersistentRedBlackTree version. Writers
+    serialize on one lock, build the next version by path copying and then
+    publish it with a single reference assignment. Readers never lock: they
+    read whichever version is current when they start.
+
+    Consistency model:
+    - Every write and every batch() is atomic and linearizable. Once it
+      returns, all later reads see it, and no read sees part of it.
+    - A read of one key sees the latest published version.
+    - Iteration, irange and snapshot() work on the version current when
+      they start. They see no later writes and are never disturbed by them
+      (snapshot isolation).
+    """
+    def __init__(self, tree=None):
+        self._version = tree if tree is not None else PersistentRedBlackTree()
+        self._write_lock = threading.Lock()
+        self.TNULL = TNULL
+
+    @property
+    def root(self):
+        return self._version.root
+
+    def snapshot(self):
+        """Return the current immutable version for consistent multi-step reads"""
+        return self._version
+
+    # Reads: no locking, each works on one version
+
+    def search(self, key):
+        return self._version.search(key)
+
+    def __contains__(self, key):
+        return key in self._version
+
+    def __getitem__(self, key):
+        return self._version[key]
+
+    def get(self, key, default=None):
+        return self._version.get(key, default)
+
+    def __len__(self):
+        return len(self._version)
+
+    def __iter__(self):
+        return iter(self._version)
+
+    def irange(self, lo=None, hi=None):
+        return self._version.irange(lo, hi)
+
+    def items(self):
+        return self._version.items()
+
+    # Writes: serialized, each publishes one new version
+
+    def insert(self, key, value=None):
+        with self._write_lock:
+            self._version = self._version.insert(key, value)
+
+    def __setitem__(self, key, value):
+        with self._write_lock:
+            self._version = self._version.set(key, value)
+
+    def delete_node(self, key):
+        """Remove one occurrence of key, returning whether it was present"""
+        with self._write_lock:
+            version = self._version.delete(key)
+            removed = version is not self._version
+            self._version = version
+        return removed
+
+    def insert_many(self, keys):
+        """Insert a batch of keys, published atomically as one version"""
+        with self.batch() as batch:
+            for key in keys:
+                batch.insert(key)
+
+    def delete_many(self, keys):
+        """Delete a batch of keys atomically, returning how many were removed"""
+        with self.batch() as batch:
+            return sum(batch.delete_node(key) for key in keys)
+
+    def batch(self):
+        """Group writes so they take the lock once and publish one version.
+
+            with tree.batch() as batch:
+                batch.insert(1)
+                batch.delete_node(2)
+
+        Readers see none of the batch until the block exits, then all of it.
+        If the block raises, nothing is published.
+        """
+        return _Batch(self)
+
+class _Batch:
+    """Write context returned by ConcurrentRedBlackTree.batch()"""
+    def __init__(self, tree):
+        self._tree = tree
+        self.version = None
+
+    def __enter__(self):
+        self._tree._write_lock.acquire()
+        self.version = self._tree._version
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self._tree._version = self.version
+        self._tree._write_lock.release()
+        return False
+
+    def insert(self, key, value=None):
+        self.version = self.version.insert(key, value)
+
+    def __setitem__(self, key, value):
+        self.version = self.version.set(key, value)
+
+    def delete_node(self, key):
+        version = self.version.delete(key)
+        removed = version is not self.version
+        self.version = version
+        return removed
+
+    def search(self, key):
+        """Read inside the batch, including its own uncommitted writes"""
+        return self.version.search(key)
@@ -0,0 +1,331 @@
+"""Write-ahead logging and snapshots for a RedBlackTree.
+
+A durable tree lives in a directory:
+
+    snapshot-<gen>.rbt   the tree as of the start of log <gen> (serialization format)
+    wal-<gen>.log        changes made after that snapshot, in order
+
+Each log record is a payload length and a CRC-32 of the payload (both
+uint32, little-endian), then the payload: an opcode byte and the pickled
+arguments. Recovery loads the newest snapshot and replays the logs from its
+generation on, stopping each log at its first torn or corrupt record.
+"""
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from persistent import PersistentRedBlackTree
+import serialization
+
+OP_INSERT = 1
+OP_DELETE = 2
+
+RECORD = struct.Struct('<II')
+
+SYNC_ALWAYS = 'always'  # A write returns once its record is fsynced (group commit)
+SYNC_BATCH = 'batch'    # Records are fsynced in the background every sync_interval
+SYNC_NONE = 'none'      # Records are written to the OS, which decides when to sync
+
+def _encode(opcode, args):
+    payload = bytes([opcode]) + pickle.dumps(args, pickle.HIGHEST_PROTOCOL)
+    return RECORD.pack(len(payload), zlib.crc32(payload)) + payload
+
+def read_log(path):
+    """Yield (opcode, args) for each intact record, stopping at a torn tail"""
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            length, crc = RECORD.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            yield payload[0], pickle.loads(payload[1:])
+
+def _generations(directory, prefix, suffix):
+    generations = []
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(suffix):
+            number = name[len(prefix):-len(suffix)]
+            if number.isdigit():
+                generations.append(int(number))
+    return sorted(generations)
+
+def _fsync_directory(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class DurableRedBlackTree:
+    """Red-Black Tree whose changes survive crashes.
+
+    The contents are an immutable PersistentRedBlackTree version (tree), as
+    in ConcurrentRedBlackTree. Every insert and delete_node builds the next
+    version and appends its record to the write-ahead log under one lock,
+    then publishes the version; reads take the current version without
+    locking. How soon the record reaches the disk depends on sync:
+
+    - 'always': the call returns after its record is fsynced. Concurrent
+      writers share fsyncs (group commit): whoever syncs first covers every
+      record appended so far, and the others just wait for it.
+    - 'batch': a background thread fsyncs every sync_interval seconds, so a
+      crash loses at most that much acknowledged work.
+    - 'none': records are handed to the OS without fsync.
+
+    Once snapshot_every records have been logged, a snapshot is taken: the
+    log moves to a new generation and a background thread writes out the
+    version current at that point, fsyncs it and renames it into place,
+    then deletes the older logs and snapshots. Versions never change, so
+    the lock is only held to rotate the log and grab the version, and
+    writers carry on while the snapshot is written.
+    """
+    def __init__(self, directory, sync=SYNC_BATCH, sync_interval=0.01, snapshot_every=100000):
+        if sync not in (SYNC_ALWAYS, SYNC_BATCH, SYNC_NONE):
+            raise ValueError(f"Unknown sync mode {sync!r}")
+        self.directory = directory
+        self.sync = sync
+        self.sync_interval = sync_interval
+        self.snapshot_every = snapshot_every
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._synced = threading.Condition(self._lock)
+        self._appended = 0       # Records written to the current log
+        self._durable = 0        # Records of the current log known to be fsynced
+        self._syncing = False    # A group commit fsync is in progress
+        self._since_snapshot = 0
+        self._snapshot_thread = None
+        self._closed = False
+
+        self.replayed = 0  # Log records applied during recovery
+        self.tree, generation = self._recover()
+        self._generation = generation
+        self._log = open(self._path('wal', generation), 'ab')
+        _fsync_directory(directory)
+
+        self._flusher = None
+        if sync == SYNC_BATCH:
+            self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+            self._flusher.start()
+
+    def _path(self, kind, generation):
+        if kind == 'wal':
+            return os.path.join(self.directory, f"wal-{generation:012d}.log")
+        return os.path.join(self.directory, f"snapshot-{generation:012d}.rbt")
+
+    def _recover(self):
+        """Load the newest snapshot, replay newer logs and return (tree, next generation)"""
+        snapshots = _generations(self.directory, 'snapshot-', '.rbt')
+        logs = _generations(self.directory, 'wal-', '.log')
+        start = snapshots[-1] if snapshots else 0
+        keys, values = [], []
+        if snapshots:
+            with open(self._path('snapshot', start), 'rb') as f:
+                # Our own files, whose log records are pickled anyway
+                for key, value in serialization.TreeReader(f, allow_pickle=True).items():
+                    keys.append(key)
+                    values.append(value)
+        tree = PersistentRedBlackTree.from_sorted(keys, values)
+        for generation in logs:
+            if generation < start:
+                continue
+            for opcode, args in read_log(self._path('wal', generation)):
+                tree = self._apply(tree, opcode, args)[0]
+                self.replayed += 1
+        # New records always go to a fresh log, after any torn tail
+        return tree, max([start] + logs) + 1
+
+    @staticmethod
+    def _apply(tree, opcode, args):
+        """Return (the next version, whether the operation changed anything)"""
+        if opcode == OP_INSERT:
+            return tree.insert(*args), True
+        version = tree.delete(args[0])
+        return version, version is not tree
+
+    # Writes
+
+    def insert(self, key, value=None):
+        self._write([(OP_INSERT, (key, value))])
+
+    def delete_node(self, key):
+        """Delete one occurrence of key, returning whether it was present"""
+        return self._write([(OP_DELETE, (key,))])[0]
+
+    def insert_many(self, keys):
+        """Insert a batch of keys under one lock and (with sync='always') one fsync"""
+        self._write([(OP_INSERT, (key, None)) for key in keys])
+
+    def delete_many(self, keys):
+        """Delete a batch of keys, returning how many were removed"""
+        return sum(self._write([(OP_DELETE, (key,)) for key in keys]))
+
+    def _write(self, operations):
+        with self._lock:
+            if self._closed:
+                raise ValueError("Durable tree is closed")
+            results = []
+            records = []
+            tree = self.tree
+            try:
+                for opcode, args in operations:
+                    tree, changed = self._apply(tree, opcode, args)
+                    results.append(changed)
+                    if changed:
+                        records.append(_encode(opcode, args))
+            finally:
+                # Log and publish whatever was applied, even if a later
+                # operation failed
+                if records:
+                    self._log.write(b''.join(records))
+                    self._appended += len(records)
+                    self._since_snapshot += len(records)
+                self.tree = tree
+            generation, target = self._generation, self._appended
+            if self.sync == SYNC_ALWAYS:
+                self._wait_durable(generation, target)
+            if self._since_snapshot >= self.snapshot_every:
+                self._start_snapshot()
+        return results
+
+    def _wait_durable(self, generation, target):
+        """Group commit: block (holding the lock's condition) until target is fsynced"""
+        while self._generation == generation and self._durable < target:
+            if self._syncing:
+                self._synced.wait()
+                continue
+            # Become the leader: fsync everything appended so far, without
+            # holding the lock so other writers can keep appending. Records
+            # still in the file object's buffer must reach the OS first, or
+            # they would count as durable without being in the fsync
+            self._log.flush()
+            self._syncing = True
+            covered = self._appended
+            fd = self._log.fileno()
+            self._lock.release()
+            try:
+                os.fsync(fd)
+            finally:
+                self._lock.acquire()
+                self._syncing = False
+            if self._generation == generation:
+                self._durable = max(self._durable, covered)
+            self._synced.notify_all()
+
+    def sync_now(self):
+        """Flush and fsync every record written so far"""
+        with self._lock:
+            self._wait_durable(self._generation, self._appended)
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.sync_interval)
+            with self._lock:
+                if self._closed:
+                    return
+                if self._durable < self._appended:
+                    self._wait_durable(self._generation, self._appended)
+
+    # Snapshots
+
+    def snapshot(self, wait=True):
+        """Take a snapshot now (and with wait, block until it is on disk)"""
+        with self._lock:
+            self._start_snapshot()
+            thread = self._snapshot_thread
+        if wait and thread is not None:
+            thread.join()
+
+    def _start_snapshot(self):
+        """Rotate the log and hand the current version to a writer thread"""
+        while self._syncing:
+            # A group commit leader is still fsyncing the current log
+            self._synced.wait()
+        if self._snapshot_thread is not None and self._snapshot_thread.is_alive():
+            return
+        # Everything up to here is covered by the snapshot, so the old log
+        # only needs to be durable until the snapshot replaces it
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self._log.close()
+        self._generation += 1
+        self._log = open(self._path('wal', self._generation), 'ab')
+        # Records fsynced to the new log are only durable once its directory
+        # entry is too
+        _fsync_directory(self.directory)
+        self._appended = self._durable = self._since_snapshot = 0
+        self._synced.notify_all()
+
+        self._snapshot_thread = threading.Thread(target=self._write_snapshot,
+                                                 args=(self._generation, self.tree))
+        self._snapshot_thread.start()
+
+    def _write_snapshot(self, generation, tree):
+        path = self._path('snapshot', generation)
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as f:
+            writer = serialization.TreeWriter(f)
+            for key, value in tree.items():
+                writer.write(key, value)
+            writer.close()
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+        _fsync_directory(self.directory)
+        # The new snapshot covers every older log and snapshot
+        for old in _generations(self.directory, 'snapshot-', '.rbt'):
+            if old < generation:
+                os.remove(self._path('snapshot', old))
+        for old in _generations(self.directory, 'wal-', '.log'):
+            if old < generation:
+                os.remove(self._path('wal', old))
+
+    def close(self):
+        """Sync the log, finish any snapshot in progress and stop background work"""
+        with self._lock:
+            if self._closed:
+                return
+            self._wait_durable(self._generation, self._appended)
+            self._closed = True
+            thread = self._snapshot_thread
+        if thread is not None:
+            thread.join()
+        if self._flusher is not None:
+            self._flusher.join()
+        self._log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
+
+    # Reads: no locking, each works on the version current when it starts
+
+    def search(self, key):
+        return self.tree.search(key)
+
+    def __contains__(self, key):
+        return key in self.tree
+
+    def get(self, key, default=None):
+        return self.tree.get(key, default)
+
+    def __len__(self):
+        return len(self.tree)
+
+    def irange(self, lo=None, hi=None):
+        """Return the keys with lo <= key <= hi as a list"""
+        return list(self.tree.irange(lo, hi))
+
+    def __iter__(self):
+        return iter(self.irange())
+
+    def items(self):
+        return list(self.tree.items())
@@ -0,0 +1,220 @@
+"""Operation history that rebuilds past tree states on demand.
+
+Instead of a snapshot per step, OperationHistory keeps the log of inserts
+and deletes applied to the tree plus a checkpoint every checkpoint_every
+operations. A checkpoint is the tree saved with its exact shape (see
+serialization.save with shape=True), so replaying the logged operations
+from it reproduces every later tree node for node. A step is just a
+position in the log; its tree is rebuilt from the nearest checkpoint when
+someone asks for it.
+
+Steps recorded from a traced operation (the rotations and recolors inside
+an insert or delete) point at one of that operation's trace steps, and are
+rebuilt by replaying the operation traced up to that step.
+
+Memory stays within memory_budget: once over it, the oldest checkpoint is
+dropped together with the operations and steps only it could rebuild.
+"""
+import io
+import time
+from bisect import bisect_right
+from algorithm import Tracer
+import serialization
+
+OP_INSERT = 1
+OP_DELETE = 2
+OP_RESET = 3  # The tree was changed outside the history; a checkpoint follows
+
+HISTORY_MEMORY_BYTES = 8 * 1024 * 1024
+CHECKPOINT_EVERY = 50
+# Rough per-entry costs, for the memory budget
+OP_BYTES = 72     # Log tuple and list slot
+STEP_BYTES = 512  # Step dict with its description
+
+class _StepRecorder(Tracer):
+    """Collects the explained steps of one operation, optionally snapshotting one of them"""
+    def __init__(self, capture=None):
+        self.steps = []
+        self.capture = capture
+        self.captured = None
+
+    def step(self, tree, description, step_type):
+        if len(self.steps) == self.capture:
+            self.captured = tree.snapshot()
+        self.steps.append((description, step_type))
+
+class OperationHistory:
+    """Steps of a tree's operations, stored as a log with periodic checkpoints.
+
+    Change the tree through insert/delete (or apply, to trace the
+    operation) and mark steps with record. Changes made to the tree any
+    other way are noticed through its (uid, version) and covered by a new
+    checkpoint. Each entry of steps is a dict with description, step_type
+    and timestamp; state(step) returns its tree as a TreeSnapshot.
+    """
+    def __init__(self, memory_budget=HISTORY_MEMORY_BYTES, checkpoint_every=CHECKPOINT_EVERY):
+        self.memory_budget = memory_budget
+        self.checkpoint_every = checkpoint_every
+        self.clear()
+
+    def clear(self):
+        self.steps = []
+        self.dropped = 0         # Steps discarded to stay within the budget
+        self._ops = []           # Logged operations from position self._first on
+        self._first = 0
+        self._checkpoints = []   # (position, saved tree) in position order
+        self._checkpoint_bytes = 0
+        self._synced = None      # (uid, version) of the tree after the last logged change
+        self._traced = None      # Position of the last traced operation
+        self._viewed = None      # ((position, trace), TreeSnapshot) last rebuilt
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __getitem__(self, index):
+        return self.steps[index]
+
+    def __iter__(self):
+        return iter(self.steps)
+
+    @property
+    def position(self):
+        """Number of operations logged so far (the current state)"""
+        return self._first + len(self._ops)
+
+    @property
+    def bytes(self):
+        """Approximate memory held by checkpoints, log and steps"""
+        return self._checkpoint_bytes + len(self._ops) * OP_BYTES + len(self.steps) * STEP_BYTES
+
+    # Recording
+
+    def insert(self, tree, key):
+        self.apply(tree, OP_INSERT, key)
+
+    def delete(self, tree, key):
+        """Delete key from tree, returning whether it was present"""
+        return self.apply(tree, OP_DELETE, key)
+
+    def apply(self, tree, opcode, key, trace=False):
+        """Apply and log one operation.
+
+        Returns whether it changed the tree, or with trace=True the
+        (description, step_type) pairs of its explained steps, which
+        record(..., trace=i) can then turn into history steps.
+        """
+        self._sync(tree)
+        due = self.position + 1 - self._checkpoints[-1][0] >= self.checkpoint_every
+        if trace and due:
+            # Checkpoint before a traced operation rather than after it, so its
+            # steps can be rebuilt from the newest checkpoint, which _trim keeps
+            self._checkpoint(tree)
+        if trace:
+            recorder = _StepRecorder()
+            previous, tree.tracer = tree.tracer, recorder
+            try:
+                self._apply(tree, opcode, key)
+            finally:
+                tree.tracer = previous
+            self._traced = self.position
+        else:
+            changed = self._apply(tree, opcode, key)
+        self._ops.append((opcode, key))
+        self._synced = (tree.uid, tree.version)
+        if due and not trace:
+            self._checkpoint(tree)
+        self._trim()
+        return recorder.steps if trace else changed
+
+    def record(self, tree, description, step_type="operation", trace=None):
+        """Add a step showing the tree as it is now, or (with trace) at the
+        trace-th explained step of the last traced operation"""
+        if trace is None:
+            self._sync(tree)
+            position = self.position
+        else:
+            if self._traced is None or self._traced < self._first:
+                raise ValueError("No traced operation to take the step from")
+            position = self._traced
+        self.steps.append({
+            'description': description,
+            'step_type': step_type,
+            'timestamp': time.time(),
+            'position': position,
+            'trace': trace,
+        })
+        self._trim()
+
+    def _sync(self, tree):
+        """Checkpoint the tree if it changed without going through the history"""
+        if self._synced == (tree.uid, tree.version):
+            return
+        if self._checkpoints:
+            # Steps before this point cannot be replayed past the change
+            self._ops.append((OP_RESET, None))
+        self._synced = (tree.uid, tree.version)
+        self._checkpoint(tree)
+
+    def _checkpoint(self, tree):
+        buffer = io.BytesIO()
+        serialization.save(tree, buffer, shape=True)
+        data = buffer.getvalue()
+        self._checkpoints.append((self.position, data))
+        self._checkpoint_bytes += len(data)
+
+    def _trim(self):
+        """Drop the oldest checkpoints (and what depends on them) while over budget"""
+        while self.bytes > self.memory_budget and len(self._checkpoints) > 1:
+            _, data = self._checkpoints.pop(0)
+            self._checkpoint_bytes -= len(data)
+            first = self._checkpoints[0][0]
+            del self._ops[:first - self._first]
+            self._first = first
+            kept = [step for step in self.steps if step['position'] >= first]
+            self.dropped += len(self.steps) - len(kept)
+            self.steps = kept
+
+    # Rebuilding
+
+    @staticmethod
+    def _apply(tree, opcode, key):
+        if opcode == OP_INSERT:
+            tree.insert(key)
+            return True
+        z = tree._find_for_delete(key)
+        if z is tree.TNULL:
+            return False
+        tree._delete(z)
+        return True
+
+    def state(self, step, tree=None):
+        """Return the TreeSnapshot for a step, rebuilding it if needed.
+
+        Pass the live tree to skip the rebuild for steps at the current
+        state. The last rebuilt state is kept, so rendering the same step
+        again (on every Streamlit rerun) costs nothing.
+        """
+        position, trace = step['position'], step['trace']
+        if position < self._first:
+            raise ValueError("Step was dropped from the history")
+        if trace is None and tree is not None and position == self.position \
+                and self._synced == (tree.uid, tree.version):
+            return tree.snapshot()
+        if self._viewed is not None and self._viewed[0] == (position, trace):
+            return self._viewed[1]
+
+        index = bisect_right([start for start, _ in self._checkpoints], position) - 1
+        start, data = self._checkpoints[index]
+        rebuilt = serialization.load(io.BytesIO(data), allow_pickle=True)
+        for opcode, key in self._ops[start - self._first:position - self._first]:
+            self._apply(rebuilt, opcode, key)
+        if trace is None:
+            snapshot = rebuilt.snapshot()
+        else:
+            recorder = _StepRecorder(capture=trace)
+            rebuilt.tracer = recorder
+            opcode, key = self._ops[position - self._first]
+            self._apply(rebuilt, opcode, key)
+            snapshot = recorder.captured
+        self._viewed = ((position, trace), snapshot)
+        return snapshot
@@ -0,0 +1,219 @@
+"""Tidy tree layout and SVG output without Graphviz.
+
+layout_tree places the nodes with the Reingold-Tilford algorithm for binary
+trees (Reingold & Tilford, "Tidier Drawings of Trees", 1981): each parent
+is centered over its children, subtrees are pushed apart only as far as
+their facing contours require, and contours are followed through threads,
+so the layout takes O(n) time. Both passes are iterative, so tree depth is
+never limited by the recursion limit. tree_to_svg draws the result.
+
+Works with anything exposing root/TNULL and nodes with key/red/left/right:
+RedBlackTree, TreeSnapshot and PersistentRedBlackTree.
+"""
+from html import escape
+
+try:
+    import numpy as np
+except ImportError:  # Optional: only used to vectorize the coordinate pass
+    np = None
+
+MIN_SEPARATION = 2  # Horizontal layout units between neighbouring nodes
+
+class TreeLayout:
+    """Node positions from layout_tree, indexed in preorder (0 is the root).
+
+    x is in layout units (MIN_SEPARATION between neighbours on a level),
+    depth is the level, and parent[i] is the index of node i's parent (-1
+    for the root).
+    """
+    def __init__(self, keys, red, parent, depth, x):
+        self.keys = keys
+        self.red = red
+        self.parent = parent
+        self.depth = depth
+        self.x = x
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def width(self):
+        return max(self.x) - min(self.x) if self.x else 0
+
+    @property
+    def height(self):
+        return max(self.depth) + 1 if self.depth else 0
+
+def _flatten(tree):
+    """Number the nodes in preorder and return their fields and child links"""
+    keys, red, parent, depth, left, right = [], [], [], [], [], []
+    TNULL = tree.TNULL
+    if tree.root is TNULL:
+        return keys, red, parent, depth, left, right
+    stack = [(tree.root, -1, 0, None)]
+    while stack:
+        node, up, level, side = stack.pop()
+        i = len(keys)
+        keys.append(node.key)
+        red.append(node.red)
+        parent.append(up)
+        depth.append(level)
+        left.append(-1)
+        right.append(-1)
+        if side is not None:
+            side[up] = i
+        # Right pushed first so the left subtree is numbered first (preorder)
+        if node.right is not TNULL:
+            stack.append((node.right, i, level + 1, right))
+        if node.left is not TNULL:
+            stack.append((node.left, i, level + 1, left))
+    return keys, red, parent, depth, left, right
+
+def layout_tree(tree, min_separation=MIN_SEPARATION):
+    """Return a TreeLayout for the tree in O(n) time"""
+    keys, red, parent, depth, left, right = _flatten(tree)
+    n = len(keys)
+    if n == 0:
+        return TreeLayout(keys, red, parent, depth, [])
+
+    # Links that the contour walk may follow; threads are added to leaves
+    llink = left[:]
+    rlink = right[:]
+    offset = [0] * n  # Distance from a node to each of its children (or along its thread)
+    # Extreme nodes on the deepest level of each subtree: (node, level, x offset from subtree root)
+    lmost = [None] * n
+    rmost = [None] * n
+
+    # Preorder reversed visits children before parents (the setup pass)
+    for t in range(n - 1, -1, -1):
+        lc, rc = left[t], right[t]
+        if lc < 0 and rc < 0:
+            lmost[t] = rmost[t] = (t, depth[t], 0)
+            continue
+
+        # Walk the right contour of the left subtree and the left contour of
+        # the right subtree together, widening rootsep wherever they get closer
+        # than min_separation
+        l, r = lc, rc
+        cursep = rootsep = min_separation
+        loffsum = roffsum = 0
+        while l >= 0 and r >= 0:
+            if cursep < min_separation:
+                rootsep += min_separation - cursep
+                cursep = min_separation
+            if rlink[l] >= 0:
+                loffsum += offset[l]
+                cursep -= offset[l]
+                l = rlink[l]
+            else:
+                loffsum -= offset[l]
+                cursep += offset[l]
+                l = llink[l]
+            if llink[r] >= 0:
+                roffsum -= offset[r]
+                cursep -= offset[r]
+                r = llink[r]
+            else:
+                roffsum += offset[r]
+                cursep += offset[r]
+                r = rlink[r]
+
+        offset[t] = rootsep / 2
+        loffsum -= offset[t]
+        roffsum += offset[t]
+
+        ll = lmost[lc] if lc >= 0 else None
+        lr = rmost[lc] if lc >= 0 else None
+        rl = lmost[rc] if rc >= 0 else None
+        rr = rmost[rc] if rc >= 0 else None
+        if lc < 0 or (rl is not None and rl[1] > ll[1]):
+            lmost[t] = (rl[0], rl[1], rl[2] + offset[t])
+        else:
+            lmost[t] = (ll[0], ll[1], ll[2] - offset[t])
+        if rc < 0 or (lr is not None and lr[1] > rr[1]):
+            rmost[t] = (lr[0], lr[1], lr[2] - offset[t])
+        else:
+            rmost[t] = (rr[0], rr[1], rr[2] + offset[t])
+
+        # Thread the shorter subtree's outer contour on into the taller one
+        if l >= 0 and l != lc:
+            node, _, node_off = rr
+            offset[node] = abs(node_off + offset[t] - loffsum)
+            if loffsum - offset[t] <= node_off:
+                llink[node] = l
+            else:
+                rlink[node] = l
+        elif r >= 0 and r != rc:
+            node, _, node_off = ll
+            offset[node] = abs(node_off - offset[t] - roffsum)
+            if roffsum + offset[t] >= node_off:
+                rlink[node] = r
+            else:
+                llink[node] = r
+
+    return TreeLayout(keys, red, parent, depth, _absolute_x(left, parent, depth, offset))
+
+def _absolute_x(left, parent, depth, offset):
+    """Turn parent-relative offsets into x coordinates (the petrify pass)"""
+    n = len(parent)
+    if np is not None and n > 1:
+        # One vectorized step per level: x = x[parent] -/+ offset[parent]
+        parents = np.array(parent)
+        levels = np.array(depth)
+        offsets = np.array(offset, dtype=float)
+        is_left = np.zeros(n, dtype=bool)
+        left_children = np.array(left)
+        is_left[left_children[left_children >= 0]] = True
+        signs = np.where(is_left, -1.0, 1.0)
+        x = np.zeros(n)
+        order = np.argsort(levels, kind='stable')
+        boundaries = np.searchsorted(levels[order], np.arange(1, levels.max() + 1))
+        for level_nodes in np.split(order, boundaries)[1:]:
+            up = parents[level_nodes]
+            x[level_nodes] = x[up] + signs[level_nodes] * offsets[up]
+        return x.tolist()
+    x = [0.0] * n
+    # Preorder: every parent comes before its children
+    for i in range(1, n):
+        up = parent[i]
+        x[i] = x[up] - offset[up] if left[up] == i else x[up] + offset[up]
+    return x
+
+def tree_to_svg(tree, unit=12, level_height=40, radius=None, font_size=None, margin=20):
+    """Draw the tree as an SVG document string.
+
+    unit is the width in pixels of one layout unit, so neighbouring nodes
+    are MIN_SEPARATION * unit apart. Labels are left out once they would be
+    smaller than 4px.
+    """
+    layout = layout_tree(tree)
+    if not len(layout):
+        return None
+    radius = radius if radius is not None else unit * 0.8
+    font_size = font_size if font_size is not None else radius * 0.9
+    left_edge = min(layout.x)
+    xs = [margin + radius + (x - left_edge) * unit for x in layout.x]
+    ys = [margin + radius + d * level_height for d in layout.depth]
+    width = layout.width * unit + 2 * (margin + radius)
+    height = (layout.height - 1) * level_height + 2 * (margin + radius)
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height:.0f}" '
+             f'viewBox="0 0 {width:.0f} {height:.0f}">',
+             '<g stroke="#555" stroke-width="1">']
+    for i, up in enumerate(layout.parent):
+        if up >= 0:
+            parts.append(f'<line x1="{xs[up]:.1f}" y1="{ys[up]:.1f}" '
+                         f'x2="{xs[i]:.1f}" y2="{ys[i]:.1f}"/>')
+    parts.append('</g><g stroke="#222" stroke-width="0.5">')
+    for i in range(len(layout)):
+        fill = '#d62728' if layout.red[i] else '#111'
+        parts.append(f'<circle cx="{xs[i]:.1f}" cy="{ys[i]:.1f}" r="{radius:.1f}" fill="{fill}"/>')
+    parts.append('</g>')
+    if font_size >= 4:
+        parts.append(f'<g fill="white" font-family="sans-serif" font-size="{font_size:.1f}" '
+                     f'text-anchor="middle" dominant-baseline="central">')
+        for i, key in enumerate(layout.keys):
+            parts.append(f'<text x="{xs[i]:.1f}" y="{ys[i]:.1f}">{escape(str(key))}</text>')
+        parts.append('</g>')
+    parts.append('</svg>')
+    return '\n'.join(parts)
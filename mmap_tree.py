@@ -0,0 +1,146 @@
+import mmap
+import os
+import struct
+from array_tree import ArrayRedBlackTree
+
+MAGIC = b'RBTMMAP1'
+# Header: magic, then int64 fields key typecode, capacity, root, free list head, count
+HEADER = struct.Struct('<8s5q')
+HEADER_SIZE = 64
+# Record fields, one int64 (or float64 key) each: key, left, right, parent, red
+RECORD_FIELDS = 5
+RECORD_SIZE = 8 * RECORD_FIELDS
+INITIAL_CAPACITY = 1024
+
+class MmapRedBlackTree(ArrayRedBlackTree):
+    """ArrayRedBlackTree whose nodes live in fixed-size records of a mapped file.
+
+    Record i starts at HEADER_SIZE + i * RECORD_SIZE and holds the node's
+    key, left, right and parent (record numbers, 0 being TNULL) and color.
+    keys, left, right, parent and red are strided views over the mapping, so
+    the inherited algorithms run unchanged while the OS page cache keeps
+    the hot nodes (the upper levels) in memory and the rest on disk. Root,
+    free list and count live in the file header, so the tree is persistent:
+    reopening the same path continues where the last session stopped.
+
+    Keys are int64 ('q') or float64 ('d'). The file grows by doubling; deleted
+    records go on the free list and are reused. Changes reach the file when
+    the OS writes the pages back; call flush() to force it.
+    """
+    def __init__(self, path, typecode='q'):
+        if typecode not in ('q', 'd'):
+            raise ValueError("Keys must be int64 ('q') or float64 ('d')")
+        self.path = path
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, 'r+b' if exists else 'w+b')
+        if exists:
+            magic, stored_typecode = HEADER.unpack(self._file.read(HEADER.size))[:2]
+            if magic != MAGIC:
+                self._file.close()
+                raise ValueError(f"{path} is not a memory-mapped tree file")
+            typecode = chr(stored_typecode)
+        else:
+            self._file.truncate(HEADER_SIZE + INITIAL_CAPACITY * RECORD_SIZE)
+            self._file.write(HEADER.pack(MAGIC, ord(typecode), INITIAL_CAPACITY, 0, 0, 0))
+            self._file.flush()
+        self.typecode = typecode
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._map_views()
+
+    def _map_views(self):
+        records = memoryview(self._map)[HEADER_SIZE:]
+        words = records.cast('q')
+        self._header = memoryview(self._map)[8:HEADER.size].cast('q')
+        self.keys = records.cast(self.typecode)[0::RECORD_FIELDS]
+        self.left = words[1::RECORD_FIELDS]
+        self.right = words[2::RECORD_FIELDS]
+        self.parent = words[3::RECORD_FIELDS]
+        self.red = words[4::RECORD_FIELDS]
+
+    def _release_views(self):
+        for view in (self.keys, self.left, self.right, self.parent, self.red, self._header):
+            view.release()
+
+    # Tree state kept in the file header
+
+    @property
+    def capacity(self):
+        return self._header[1]
+
+    @property
+    def root(self):
+        return self._header[2]
+
+    @root.setter
+    def root(self, node):
+        self._header[2] = node
+
+    @property
+    def _free(self):
+        return self._header[3]
+
+    @_free.setter
+    def _free(self, node):
+        self._header[3] = node
+
+    @property
+    def _count(self):
+        return self._header[4]
+
+    @_count.setter
+    def _count(self, count):
+        self._header[4] = count
+
+    def _reserve(self):
+        """Grow the file (doubling) if no record is free for the next insert"""
+        if self._free or self._count + 1 < self.capacity:
+            return
+        capacity = self.capacity * 2
+        self._release_views()
+        self._map.resize(HEADER_SIZE + capacity * RECORD_SIZE)
+        self._map_views()
+        self._header[1] = capacity
+
+    def _new_node(self, key):
+        """Allocate a record, reusing a freed one when possible"""
+        node = self._free
+        if node:
+            self._free = self.right[node]
+        else:
+            # Records 1..count are in use when the free list is empty
+            node = self._count + 1
+        self.keys[node] = key
+        self.red[node] = 1
+        self.left[node] = 0
+        self.right[node] = 0
+        self.parent[node] = 0
+        self._count += 1
+        return node
+
+    def insert(self, key):
+        # Grow before the inherited insert caches the views in locals
+        self._reserve()
+        super().insert(key)
+
+    def flush(self):
+        """Write changed pages back to the file"""
+        self._map.flush()
+
+    def close(self):
+        if self._map.closed:
+            return
+        self.flush()
+        self._release_views()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
+
+    def memory_usage(self):
+        """Bytes in the mapped file (resident memory is up to the OS)"""
+        return len(self._map)
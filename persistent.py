@@ -0,0 +1,303 @@
+class PersistentNode:
+    """Immutable Red-Black Tree node, shared between tree versions.
+
+    Nodes are never modified after construction, so any number of versions
+    (and threads) can read them without locks.
+    """
+    # __weakref__ lets render caches key on a version without keeping it alive
+    __slots__ = ('key', 'value', 'red', 'left', 'right', 'size', '__weakref__')
+
+    def __init__(self, red, left, key, value, right):
+        self.key = key
+        self.value = value
+        self.red = red
+        self.left = left
+        self.right = right
+        self.size = left.size + right.size + 1
+
+    @property
+    def color(self):
+        return "RED" if self.red else "BLACK"
+
+class _Null:
+    """Black empty leaf shared by every persistent tree"""
+    __slots__ = ()
+    key = 0
+    value = None
+    red = False
+    left = None
+    right = None
+    size = 0
+    color = "BLACK"
+
+TNULL = _Null()
+
+def _red(left, key, value, right):
+    return PersistentNode(True, left, key, value, right)
+
+def _black(left, key, value, right):
+    return PersistentNode(False, left, key, value, right)
+
+def _balance(a, key, value, b):
+    """Build a black node over a and b, resolving a red-red pair below it"""
+    if a.red and b.red:
+        return _red(_black(a.left, a.key, a.value, a.right), key, value,
+                    _black(b.left, b.key, b.value, b.right))
+    if a.red:
+        if a.left.red:
+            ll = a.left
+            return _red(_black(ll.left, ll.key, ll.value, ll.right), a.key, a.value,
+                        _black(a.right, key, value, b))
+        if a.right.red:
+            lr = a.right
+            return _red(_black(a.left, a.key, a.value, lr.left), lr.key, lr.value,
+                        _black(lr.right, key, value, b))
+    if b.red:
+        if b.right.red:
+            rr = b.right
+            return _red(_black(a, key, value, b.left), b.key, b.value,
+                        _black(rr.left, rr.key, rr.value, rr.right))
+        if b.left.red:
+            rl = b.left
+            return _red(_black(a, key, value, rl.left), rl.key, rl.value,
+                        _black(rl.right, b.key, b.value, b.right))
+    return _black(a, key, value, b)
+
+def _insert(node, key, value):
+    """Return a copy of node's subtree with key added (path copying)"""
+    if node is TNULL:
+        return _red(TNULL, key, value, TNULL)
+    if key < node.key:
+        left, right = _insert(node.left, key, value), node.right
+    else:
+        left, right = node.left, _insert(node.right, key, value)
+    if node.red:
+        return _red(left, node.key, node.value, right)
+    return _balance(left, node.key, node.value, right)
+
+def _replace(node, key, value):
+    """Return a copy of node's subtree with the first node holding key given value"""
+    if key == node.key:
+        return PersistentNode(node.red, node.left, key, value, node.right)
+    if key < node.key:
+        return PersistentNode(node.red, _replace(node.left, key, value), node.key, node.value, node.right)
+    return PersistentNode(node.red, node.left, node.key, node.value, _replace(node.right, key, value))
+
+# Deletion follows Kahrs, "Red-black trees with types" (JFP 2001): removing a
+# node from a black subtree shortens it by one black level, which the
+# balance_left/balance_right helpers absorb on the way back up.
+
+def _redden(node):
+    """Recolor a black node red (its subtree loses one black level)"""
+    return _red(node.left, node.key, node.value, node.right)
+
+def _balance_left(left, key, value, right):
+    """Rebuild a node whose left subtree is one black level short"""
+    if left.red:
+        return _red(_black(left.left, left.key, left.value, left.right), key, value, right)
+    if not right.red:
+        return _balance(left, key, value, _redden(right))
+    # right is red with a black left child
+    rl = right.left
+    return _red(_black(left, key, value, rl.left), rl.key, rl.value,
+                _balance(rl.right, right.key, right.value, _redden(right.right)))
+
+def _balance_right(left, key, value, right):
+    """Rebuild a node whose right subtree is one black level short"""
+    if right.red:
+        return _red(left, key, value, _black(right.left, right.key, right.value, right.right))
+    if not left.red:
+        return _balance(_redden(left), key, value, right)
+    # left is red with a black right child
+    lr = left.right
+    return _red(_balance(_redden(left.left), left.key, left.value, lr.left), lr.key, lr.value,
+                _black(lr.right, key, value, right))
+
+def _append(a, b):
+    """Concatenate two subtrees of equal black height (all of a <= all of b)"""
+    if a is TNULL:
+        return b
+    if b is TNULL:
+        return a
+    if a.red and b.red:
+        middle = _append(a.right, b.left)
+        if middle.red:
+            return _red(_red(a.left, a.key, a.value, middle.left), middle.key, middle.value,
+                        _red(middle.right, b.key, b.value, b.right))
+        return _red(a.left, a.key, a.value, _red(middle, b.key, b.value, b.right))
+    if not a.red and not b.red:
+        middle = _append(a.right, b.left)
+        if middle.red:
+            return _red(_black(a.left, a.key, a.value, middle.left), middle.key, middle.value,
+                        _black(middle.right, b.key, b.value, b.right))
+        return _balance_left(a.left, a.key, a.value, _black(middle, b.key, b.value, b.right))
+    if b.red:
+        return _red(_append(a, b.left), b.key, b.value, b.right)
+    return _red(a.left, a.key, a.value, _append(a.right, b))
+
+def _delete(node, key):
+    """Return a copy of node's subtree without one node holding key (which must exist)"""
+    if key < node.key:
+        left = _delete(node.left, key)
+        if node.left.red:
+            return _red(left, node.key, node.value, node.right)
+        return _balance_left(left, node.key, node.value, node.right)
+    if key > node.key:
+        right = _delete(node.right, key)
+        if node.right.red:
+            return _red(node.left, node.key, node.value, right)
+        return _balance_right(node.left, node.key, node.value, right)
+    return _append(node.left, node.right)
+
+def _blacken(node):
+    if node.red:
+        return _black(node.left, node.key, node.value, node.right)
+    return node
+
+class PersistentRedBlackTree:
+    """Immutable Red-Black Tree where every update returns a new version.
+
+    insert, set and delete copy only the O(log n) nodes on the search path
+    and share every other node with the previous version, which stays valid.
+    Versions never change, so they can be read from any thread without
+    locks, and snapshot() is free. The root/TNULL/left/right/color shape
+    matches RedBlackTree, so versions can be visualized directly.
+    """
+    TNULL = TNULL
+
+    def __init__(self, root=TNULL, version=0):
+        self.root = root
+        self.version = version  # Number of updates since the empty tree
+
+    @classmethod
+    def from_sorted(cls, keys, values=None):
+        """Build a tree from keys in ascending order in O(n) time"""
+        n = len(keys)
+        if values is not None and len(values) != n:
+            raise ValueError("keys and values must have the same length")
+        for i in range(1, n):
+            if keys[i] < keys[i - 1]:
+                raise ValueError("keys must be sorted in ascending order")
+        # Midpoint splits leave every nil link on the last two levels, so
+        # only an incomplete deepest level needs to be red
+        red_depth = n.bit_length() - 1 if n & (n + 1) else -1
+
+        def build(lo, hi, depth):
+            if lo > hi:
+                return TNULL
+            mid = (lo + hi) // 2
+            return PersistentNode(depth == red_depth, build(lo, mid - 1, depth + 1), keys[mid],
+                                  None if values is None else values[mid],
+                                  build(mid + 1, hi, depth + 1))
+
+        return cls(build(0, n - 1, 0))
+
+    def insert(self, key, value=None):
+        """Return a new version with key added (duplicates are kept, like RedBlackTree)"""
+        return PersistentRedBlackTree(_blacken(_insert(self.root, key, value)), self.version + 1)
+
+    def set(self, key, value):
+        """Return a new version mapping key to value, replacing an existing entry"""
+        if self.search(key) is TNULL:
+            return self.insert(key, value)
+        return PersistentRedBlackTree(_replace(self.root, key, value), self.version + 1)
+
+    def delete(self, key):
+        """Return a new version without one occurrence of key (self if key is missing)"""
+        if self.search(key) is TNULL:
+            return self
+        return PersistentRedBlackTree(_blacken(_delete(self.root, key)), self.version + 1)
+
+    def snapshot(self):
+        return self
+
+    def search(self, key):
+        """Return the node holding key, or TNULL"""
+        node = self.root
+        while node is not TNULL and key != node.key:
+            if key < node.key:
+                node = node.left
+            else:
+                node = node.right
+        return node
+
+    def __len__(self):
+        return self.root.size
+
+    def __contains__(self, key):
+        return self.search(key) is not TNULL
+
+    def __getitem__(self, key):
+        node = self.search(key)
+        if node is TNULL:
+            raise KeyError(key)
+        return node.value
+
+    def get(self, key, default=None):
+        node = self.search(key)
+        return default if node is TNULL else node.value
+
+    def select(self, k):
+        """Return the k-th smallest key (0-based)"""
+        if not 0 <= k < self.root.size:
+            raise IndexError("select index out of range")
+        node = self.root
+        while True:
+            left_size = node.left.size
+            if k < left_size:
+                node = node.left
+            elif k == left_size:
+                return node.key
+            else:
+                k -= left_size + 1
+                node = node.right
+
+    def rank(self, key):
+        """Return the number of keys strictly less than key"""
+        rank = 0
+        node = self.root
+        while node is not TNULL:
+            if node.key < key:
+                rank += node.left.size + 1
+                node = node.right
+            else:
+                node = node.left
+        return rank
+
+    def _iter_nodes(self, lo=None, hi=None):
+        """Yield nodes with lo <= key <= hi in order"""
+        stack = []
+        node = self.root
+        while stack or node is not TNULL:
+            while node is not TNULL:
+                if lo is not None and node.key < lo:
+                    node = node.right
+                else:
+                    stack.append(node)
+                    node = node.left
+            if not stack:
+                return
+            node = stack.pop()
+            if hi is not None and node.key > hi:
+                return
+            yield node
+            node = node.right
+
+    def irange(self, lo=None, hi=None):
+        """Yield keys with lo <= key <= hi in order"""
+        for node in self._iter_nodes(lo, hi):
+            yield node.key
+
+    def __iter__(self):
+        return self.irange()
+
+    def keys(self):
+        return self.irange()
+
+    def values(self):
+        for node in self._iter_nodes():
+            yield node.value
+
+    def items(self):
+        for node in self._iter_nodes():
+            yield node.key, node.value
@@ -0,0 +1,76 @@
+"""Memory-bounded cache for tree renders.
+
+Rendering a large tree (building the DOT source, laying it out, writing
+SVG) costs far more than looking it up, and Streamlit reruns the app on
+every interaction, so renders are cached under a key that changes whenever
+the tree does (see render_key).
+"""
+import weakref
+from collections import OrderedDict
+
+# Memory budget for cached renders (DOT sources and SVGs), shared by every
+# session of the app since this module is imported once per process
+RENDER_CACHE_BYTES = 32 * 1024 * 1024
+RENDER_CACHE_ENTRIES = 512
+
+class RenderCache:
+    """LRU cache of renders keyed by tree contents, within a byte budget.
+
+    Entries are evicted least recently used first once either the total
+    size or the entry count goes over its limit. Values larger than the
+    whole budget are returned but never stored.
+    """
+    def __init__(self, max_bytes=RENDER_CACHE_BYTES, max_entries=RENDER_CACHE_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, size):
+        if key in self._entries:
+            self.bytes -= self._entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes or len(self._entries) > self.max_entries:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+render_cache = RenderCache()
+
+def render_key(tree):
+    """Return a hashable key that changes whenever the tree's structure may have.
+
+    Mutable trees carry (uid, version). Snapshots and persistent versions
+    never change, so their root node identifies them. The key holds only a
+    weak reference to it: caching a render must not keep a whole tree alive
+    outside the byte budget. Once the tree is collected its entries can no
+    longer match (a dead reference only equals itself) and age out.
+    """
+    uid = getattr(tree, 'uid', None)
+    if uid is not None:
+        return uid, tree.version
+    if tree.root is tree.TNULL:
+        return None  # Every empty tree renders alike
+    key = weakref.ref(tree.root)
+    hash(key)  # A weak reference can only be hashed while its target is alive
+    return key
@@ -0,0 +1,293 @@
+"""Compact binary save/load for RedBlackTree.
+
+File layout (all integers little-endian):
+
+    header   magic b'RBT\\0', format version (uint16), flags (uint16)
+    chunk*   count (uint32), chunk flags (uint8), then
+             keys     count int64s, count float64s, strings (count uint32
+                      byte lengths, then the UTF-8 or raw bytes one after
+                      another), or a pickled list (length-prefixed), per
+                      the chunk flags
+             shape    (if FLAG_SHAPE) red bitmap, one bit per node (LSB
+                      first), then each node's depth as one byte
+             values   (if the chunk has values) a length-prefixed pickled list
+    end      a chunk with count 0
+
+Entries are written in key order, chunk by chunk, so neither writing nor
+reading ever holds more than one chunk plus the tree being built. Loading
+rebuilds the tree with the linear-time sorted build; files written with
+shape=True are instead restored node for node (same shape and colors).
+
+Int, float, str and bytes keys are stored natively. Other keys and any
+values are pickled, and unpickling runs whatever code the file asks for,
+so only load files you trust: readers refuse pickled chunks unless given
+allow_pickle=True.
+"""
+import pickle
+import struct
+import sys
+from array import array
+from algorithm import RedBlackTree
+
+MAGIC = b'RBT\0'
+FORMAT_VERSION = 2  # 2 added KEYS_STRINGS
+CHUNK_SIZE = 65536
+
+# File flags
+FLAG_SHAPE = 1  # Every chunk carries colors and depths
+
+# Chunk flags
+KEYS_INT64 = 0
+KEYS_FLOAT64 = 1
+KEYS_PICKLED = 2
+KEYS_STRINGS = 3
+KEYS_MASK = 3
+CHUNK_VALUES = 4  # The chunk carries values (omitted when all are None)
+STRINGS_BYTES = 8  # With KEYS_STRINGS: the keys are bytes, not str
+
+HEADER = struct.Struct('<4sHH')
+CHUNK = struct.Struct('<IB')
+LENGTH = struct.Struct('<I')
+INT64_RANGE = (-2 ** 63, 2 ** 63 - 1)
+
+def _key_encoding(keys):
+    if all(type(key) is int for key in keys) and \
+            INT64_RANGE[0] <= min(keys) and max(keys) <= INT64_RANGE[1]:
+        return KEYS_INT64
+    if all(type(key) is float for key in keys):
+        return KEYS_FLOAT64
+    if all(type(key) is str for key in keys):
+        return KEYS_STRINGS
+    if all(type(key) is bytes for key in keys):
+        return KEYS_STRINGS | STRINGS_BYTES
+    return KEYS_PICKLED
+
+def _pack_numbers(typecode, numbers):
+    packed = array(typecode, numbers)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+def _unpack_numbers(typecode, data):
+    numbers = array(typecode)
+    numbers.frombytes(data)
+    if sys.byteorder == 'big':
+        numbers.byteswap()
+    return numbers.tolist()
+
+def _pack_strings(keys, raw):
+    # surrogatepass lets any str round-trip, lone surrogates included
+    data = keys if raw else [key.encode('utf-8', 'surrogatepass') for key in keys]
+    return struct.pack(f'<{len(data)}I', *map(len, data)) + b''.join(data)
+
+class TreeWriter:
+    """Streams sorted (key, value) entries to a binary file in chunks.
+
+        with open(path, 'wb') as f, TreeWriter(f) as writer:
+            for key, value in source:
+                writer.write(key, value)
+
+    With shape=True every entry also needs its color and depth; see
+    write_node. close() (or leaving the with block) writes the end marker.
+    """
+    def __init__(self, file, shape=False, chunk_size=CHUNK_SIZE):
+        self.file = file
+        self.shape = shape
+        self.chunk_size = chunk_size
+        self.count = 0
+        self._last_key = None
+        self._keys = []
+        self._values = []
+        self._reds = []
+        self._depths = []
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, FLAG_SHAPE if shape else 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        return False
+
+    def write(self, key, value=None):
+        if self.shape:
+            raise ValueError("A shape writer needs write_node")
+        self._append(key, value)
+
+    def write_node(self, key, value, red, depth):
+        """Write an entry together with its node's color and depth"""
+        if not self.shape:
+            raise ValueError("write_node requires shape=True")
+        if not 0 <= depth < 256:
+            raise ValueError(f"Node depth {depth} does not fit the format")
+        self._reds.append(red)
+        self._depths.append(depth)
+        self._append(key, value)
+
+    def _append(self, key, value):
+        if self.count and key < self._last_key:
+            raise ValueError("Entries must be written in ascending key order")
+        self._last_key = key
+        self.count += 1
+        self._keys.append(key)
+        self._values.append(value)
+        if len(self._keys) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered entries as one chunk"""
+        keys = self._keys
+        if not keys:
+            return
+        encoding = _key_encoding(keys)
+        has_values = any(value is not None for value in self._values)
+        parts = [CHUNK.pack(len(keys), encoding | (CHUNK_VALUES if has_values else 0))]
+        if encoding == KEYS_PICKLED:
+            data = pickle.dumps(keys, pickle.HIGHEST_PROTOCOL)
+            parts += [LENGTH.pack(len(data)), data]
+        elif encoding & KEYS_MASK == KEYS_STRINGS:
+            parts.append(_pack_strings(keys, encoding & STRINGS_BYTES))
+        else:
+            parts.append(_pack_numbers('q' if encoding == KEYS_INT64 else 'd', keys))
+        if self.shape:
+            bitmap = bytearray((len(keys) + 7) // 8)
+            for i, red in enumerate(self._reds):
+                if red:
+                    bitmap[i >> 3] |= 1 << (i & 7)
+            parts += [bytes(bitmap), bytes(self._depths)]
+        if has_values:
+            data = pickle.dumps(self._values, pickle.HIGHEST_PROTOCOL)
+            parts += [LENGTH.pack(len(data)), data]
+        self.file.write(b''.join(parts))
+        self._keys, self._values, self._reds, self._depths = [], [], [], []
+
+    def close(self):
+        self.flush()
+        self.file.write(CHUNK.pack(0, 0))
+
+class TreeReader:
+    """Reads a file written by TreeWriter one chunk at a time.
+
+    Chunks with pickled keys or values raise ValueError unless allow_pickle
+    is set, since unpickling an untrusted file can run arbitrary code.
+    """
+    def __init__(self, file, allow_pickle=False):
+        self.file = file
+        self.allow_pickle = allow_pickle
+        magic, version, flags = HEADER.unpack(self._read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("Not a Red-Black Tree file")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"Unsupported format version {version}")
+        self.version = version
+        self.shape = bool(flags & FLAG_SHAPE)
+
+    def _read(self, size):
+        data = self.file.read(size)
+        if len(data) != size:
+            raise ValueError("Truncated Red-Black Tree file")
+        return data
+
+    def _unpickle(self, what):
+        if not self.allow_pickle:
+            raise ValueError(f"File has pickled {what}; load it with allow_pickle=True "
+                             "only if it comes from a trusted source")
+        (length,) = LENGTH.unpack(self._read(LENGTH.size))
+        return pickle.loads(self._read(length))
+
+    def _read_strings(self, count, raw):
+        lengths = struct.unpack(f'<{count}I', self._read(4 * count))
+        data = self._read(sum(lengths))
+        strings = []
+        start = 0
+        for length in lengths:
+            strings.append(data[start:start + length])
+            start += length
+        if raw:
+            return strings
+        return [string.decode('utf-8', 'surrogatepass') for string in strings]
+
+    def chunks(self):
+        """Yield (keys, values, reds, depths) lists per chunk.
+
+        values is None when the chunk has no values, and reds and depths
+        are None unless the file was written with shape=True.
+        """
+        while True:
+            count, flags = CHUNK.unpack(self._read(CHUNK.size))
+            if count == 0:
+                return
+            encoding = flags & KEYS_MASK
+            if encoding == KEYS_PICKLED:
+                keys = self._unpickle("keys")
+            elif encoding == KEYS_STRINGS:
+                keys = self._read_strings(count, flags & STRINGS_BYTES)
+            elif encoding in (KEYS_INT64, KEYS_FLOAT64):
+                keys = _unpack_numbers('q' if encoding == KEYS_INT64 else 'd', self._read(8 * count))
+            else:
+                raise ValueError(f"Unknown key encoding {encoding}")
+            if len(keys) != count:
+                raise ValueError("Chunk key count does not match its header")
+            reds = depths = None
+            if self.shape:
+                bitmap = self._read((count + 7) // 8)
+                reds = [bool(bitmap[i >> 3] >> (i & 7) & 1) for i in range(count)]
+                depths = list(self._read(count))
+            values = None
+            if flags & CHUNK_VALUES:
+                values = self._unpickle("values")
+            yield keys, values, reds, depths
+
+    def items(self):
+        """Yield every (key, value) pair in key order"""
+        for keys, values, _, _ in self.chunks():
+            if values is None:
+                values = [None] * len(keys)
+            yield from zip(keys, values)
+
+def save(tree, file, shape=False, chunk_size=CHUNK_SIZE):
+    """Write tree to a path or binary file object.
+
+    shape=True also stores each node's color and depth, so load() restores
+    the exact tree instead of rebuilding a balanced one.
+    """
+    if isinstance(file, str):
+        with open(file, 'wb') as f:
+            return save(tree, f, shape, chunk_size)
+    writer = TreeWriter(file, shape, chunk_size)
+    if shape:
+        for node, depth in tree._iter_depths():
+            writer.write_node(node.key, node.value, node.red, depth)
+    else:
+        for key, value in tree.items():
+            writer.write(key, value)
+    writer.close()
+
+def load(file, tracer=None, allow_pickle=False):
+    """Read a tree from a path or binary file object in O(n) time.
+
+    Trees whose values, or keys other than int, float, str and bytes, were
+    pickled only load with allow_pickle=True. Unpickling runs arbitrary
+    code, so set it only for files from a trusted source.
+    """
+    if isinstance(file, str):
+        with open(file, 'rb') as f:
+            return load(f, tracer, allow_pickle)
+    reader = TreeReader(file, allow_pickle)
+    keys, values, reds, depths = [], [], [], []
+    has_values = False
+    for chunk_keys, chunk_values, chunk_reds, chunk_depths in reader.chunks():
+        keys.extend(chunk_keys)
+        if chunk_values is not None:
+            has_values = True
+            values.extend(chunk_values)
+        else:
+            values.extend([None] * len(chunk_keys))
+        if reader.shape:
+            reds.extend(chunk_reds)
+            depths.extend(chunk_depths)
+    values = values if has_values else None
+    if reader.shape:
+        return RedBlackTree.from_shape(keys, values, reds, depths, tracer)
+    return RedBlackTree.from_sorted(keys, values, tracer)
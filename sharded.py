@@ -0,0 +1,384 @@
+import bisect
+import itertools
+import random
+from concurrent.futures import Future, ProcessPoolExecutor
+from operator import itemgetter
+from algorithm import RedBlackTree
+
+# rebalance() runs automatically after a write once the largest shard holds
+# this many times the average shard size (and the tree is not tiny)
+REBALANCE_RATIO = 2
+REBALANCE_MIN_KEYS = 1000
+# bulk_load picks boundaries from a sample of this many keys per shard, so
+# only the sample is sorted here and each worker sorts its own share
+SAMPLE_PER_SHARD = 4096
+# Keys per message when a range scan streams results back from a shard
+SCAN_CHUNK = 10000
+
+# Shard trees by shard id. In process mode each worker process holds only
+# its own shard; in local mode every shard lives here in the caller.
+_SHARDS = {}
+
+# Shard-side operations. These run in the worker that owns the shard and
+# only exchange plain keys and values with the caller.
+
+def _shard_reset(shard_id, keys, values):
+    _SHARDS[shard_id] = RedBlackTree.from_sorted(keys, values)
+    return len(keys)
+
+def _shard_load(shard_id, keys, values):
+    """Sort keys (and values, by key) and make them the shard's contents"""
+    if values is None:
+        keys = sorted(keys)
+    else:
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        keys = [keys[i] for i in order]
+        values = [values[i] for i in order]
+    return _shard_reset(shard_id, keys, values)
+
+def _shard_drop(shard_id):
+    _SHARDS.pop(shard_id, None)
+
+def _shard_size(shard_id):
+    return len(_SHARDS[shard_id])
+
+def _shard_insert_many(shard_id, items):
+    """Insert (key, value) pairs and return the new shard size"""
+    tree = _SHARDS[shard_id]
+    if items and all(value is None for _, value in items):
+        tree.insert_many([key for key, _ in items])
+    else:
+        for key, value in items:
+            tree.insert(key, value)
+    return len(tree)
+
+def _shard_delete_many(shard_id, keys):
+    """Delete keys and return (number removed, new shard size)"""
+    tree = _SHARDS[shard_id]
+    removed = tree.delete_many(keys)
+    return removed, len(tree)
+
+def _shard_get_many(shard_id, keys, default):
+    tree = _SHARDS[shard_id]
+    results = []
+    for key in keys:
+        node = tree.search(key)
+        results.append(default if node is tree.TNULL else node.value)
+    return results
+
+def _shard_contains_many(shard_id, keys):
+    tree = _SHARDS[shard_id]
+    return [tree.search(key) is not tree.TNULL for key in keys]
+
+def _shard_select(shard_id, k):
+    return _SHARDS[shard_id].select(k).key
+
+def _shard_scan(shard_id, lo, skip, count, hi):
+    """Return up to count (key, value) pairs with lo <= key <= hi, skipping the first skip"""
+    tree = _SHARDS[shard_id]
+    nodes = itertools.islice(tree._iter_nodes(lo, hi), skip, skip + count)
+    return [(node.key, node.value) for node in nodes]
+
+def _shard_extract(shard_id, lo, hi):
+    """Remove and return the items outside [lo, hi) (None leaves a side open)"""
+    tree = _SHARDS[shard_id]
+    below = above = RedBlackTree()
+    if lo is not None:
+        below, tree = tree.split(lo)
+    if hi is not None:
+        tree, above = tree.split(hi)
+    _SHARDS[shard_id] = tree
+    return list(below.items()), list(above.items())
+
+def _shard_absorb(shard_id, items):
+    """Add items whose keys do not overlap the shard's range"""
+    if not items:
+        return len(_SHARDS[shard_id])
+    items.sort(key=itemgetter(0))
+    incoming = RedBlackTree.from_sorted([key for key, _ in items], [value for _, value in items])
+    tree = _SHARDS[shard_id].union(incoming)
+    _SHARDS[shard_id] = tree
+    return len(tree)
+
+class _LocalExecutor:
+    """Executor stand-in that runs each call immediately in this process"""
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+class ShardedRedBlackTree:
+    """Red-Black Tree partitioned into key-range shards.
+
+    Shard i holds the keys k with boundaries[i-1] <= k < boundaries[i], so
+    equal keys always share a shard and concatenating the shards gives key
+    order. With processes=True each shard is a RedBlackTree inside its own
+    single-worker ProcessPoolExecutor. Batched operations send one message
+    per shard and run on all shards at once, so bulk work scales with
+    cores. With processes=False the shards live in this process (useful
+    for tests and small trees).
+
+    Only plain keys and values cross the process boundary; nodes never do.
+    Call close() (or use the tree as a context manager) to stop the workers.
+    """
+    _ids = itertools.count()
+
+    def __init__(self, shards=4, boundaries=None, processes=True):
+        if boundaries is not None:
+            shards = len(boundaries) + 1
+        if shards < 1:
+            raise ValueError("A sharded tree needs at least one shard")
+        self.boundaries = list(boundaries) if boundaries is not None else []
+        if self.boundaries != sorted(self.boundaries):
+            raise ValueError("Shard boundaries must be sorted")
+        tree_id = next(self._ids)
+        self._shard_ids = [(tree_id, i) for i in range(shards)]
+        if processes:
+            self._executors = [ProcessPoolExecutor(max_workers=1) for _ in range(shards)]
+        else:
+            self._executors = [_LocalExecutor() for _ in range(shards)]
+        # With no boundaries yet everything goes to shard 0 until bulk_load
+        # or rebalance chooses them
+        self._sizes = self._map(_shard_reset, [([], None)] * shards)
+        # Keys to write before the next automatic rebalance may run
+        self._rebalance_backoff = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        """Drop the shards and shut down the worker processes"""
+        self._map(_shard_drop, [()] * len(self._shard_ids))
+        for executor in self._executors:
+            executor.shutdown()
+
+    @property
+    def shard_count(self):
+        return len(self._shard_ids)
+
+    def shard_sizes(self):
+        return list(self._sizes)
+
+    def __len__(self):
+        return sum(self._sizes)
+
+    def _shard_for(self, key):
+        return bisect.bisect_right(self.boundaries, key)
+
+    def _map(self, fn, args_per_shard, shards=None):
+        """Run fn on each shard in parallel and return the results in shard order"""
+        shards = range(self.shard_count) if shards is None else shards
+        futures = [self._executors[i].submit(fn, self._shard_ids[i], *args)
+                   for i, args in zip(shards, args_per_shard)]
+        return [future.result() for future in futures]
+
+    def _partition(self, keys):
+        """Group keys by shard, remembering each key's position in the input"""
+        groups = [[] for _ in range(self.shard_count)]
+        positions = [[] for _ in range(self.shard_count)]
+        for position, key in enumerate(keys):
+            shard = self._shard_for(key)
+            groups[shard].append(key)
+            positions[shard].append(position)
+        return groups, positions
+
+    # Bulk operations
+
+    def bulk_load(self, keys, values=None):
+        """Replace the contents with keys (and values), split about evenly across shards.
+
+        Boundaries come from a sorted sample of the keys (all of them when
+        there are few), and each shard sorts and builds its part in parallel.
+        """
+        keys = list(keys)
+        values = None if values is None else list(values)
+        sample = keys
+        if len(keys) > SAMPLE_PER_SHARD * self.shard_count:
+            sample = random.Random(len(keys)).sample(keys, SAMPLE_PER_SHARD * self.shard_count)
+        sample = sorted(sample)
+        n = len(sample)
+        cuts = [n * i // self.shard_count for i in range(1, self.shard_count)]
+        # Move each cut forward past duplicates so equal keys share a shard
+        boundaries = []
+        for cut in cuts:
+            while 0 < cut < n and sample[cut] == sample[cut - 1]:
+                cut += 1
+            if 0 < cut < n and (not boundaries or sample[cut] > boundaries[-1]):
+                boundaries.append(sample[cut])
+        # Shards beyond the distinct boundaries stay empty but keep their place
+        while len(boundaries) < self.shard_count - 1:
+            boundaries.append(boundaries[-1] if boundaries else (sample[-1] if sample else 0))
+        self.boundaries = boundaries
+
+        groups, positions = self._partition(keys)
+        if values is None:
+            parts = [(group, None) for group in groups]
+        else:
+            parts = [(group, [values[p] for p in group_positions])
+                     for group, group_positions in zip(groups, positions)]
+        self._sizes = self._map(_shard_load, parts)
+        self._rebalance_backoff = 0
+
+    def insert(self, key, value=None):
+        self.insert_many([key], None if value is None else [value])
+
+    def insert_many(self, keys, values=None):
+        """Insert a batch, with each shard applying its part in parallel"""
+        keys = list(keys)
+        values = [None] * len(keys) if values is None else list(values)
+        groups, positions = self._partition(keys)
+        shards = [i for i in range(self.shard_count) if groups[i]]
+        sizes = self._map(_shard_insert_many,
+                          [([(key, values[p]) for key, p in zip(groups[i], positions[i])],)
+                           for i in shards], shards)
+        for i, size in zip(shards, sizes):
+            self._sizes[i] = size
+        self._maybe_rebalance(len(keys))
+
+    def delete_node(self, key):
+        """Delete one occurrence of key, returning whether it was present"""
+        return self.delete_many([key]) == 1
+
+    def delete_many(self, keys):
+        """Delete a batch in parallel across shards, returning how many were removed"""
+        keys = list(keys)
+        groups, _ = self._partition(keys)
+        shards = [i for i in range(self.shard_count) if groups[i]]
+        removed = 0
+        for i, (count, size) in zip(shards, self._map(_shard_delete_many,
+                                                      [(groups[i],) for i in shards], shards)):
+            removed += count
+            self._sizes[i] = size
+        self._maybe_rebalance(len(keys))
+        return removed
+
+    def get_many(self, keys, default=None):
+        """Look up a batch of keys in parallel, returning values in input order"""
+        keys = list(keys)
+        groups, positions = self._partition(keys)
+        shards = [i for i in range(self.shard_count) if groups[i]]
+        results = [default] * len(keys)
+        for i, values in zip(shards, self._map(_shard_get_many,
+                                               [(groups[i], default) for i in shards], shards)):
+            for position, value in zip(positions[i], values):
+                results[position] = value
+        return results
+
+    def search_many(self, keys):
+        """Return whether each key is present, in input order"""
+        keys = list(keys)
+        groups, positions = self._partition(keys)
+        shards = [i for i in range(self.shard_count) if groups[i]]
+        results = [False] * len(keys)
+        for i, found in zip(shards, self._map(_shard_contains_many,
+                                              [(groups[i],) for i in shards], shards)):
+            for position, present in zip(positions[i], found):
+                results[position] = present
+        return results
+
+    def __contains__(self, key):
+        return self.search_many([key])[0]
+
+    def get(self, key, default=None):
+        return self.get_many([key], default)[0]
+
+    def irange_items(self, lo=None, hi=None, chunk_size=SCAN_CHUNK):
+        """Yield (key, value) pairs with lo <= key <= hi in key order.
+
+        Every overlapping shard starts scanning at once; results stream back
+        chunk by chunk, and shards are yielded in order, which is key order.
+        """
+        first = 0 if lo is None else self._shard_for(lo)
+        last = self.shard_count - 1 if hi is None else self._shard_for(hi)
+        pending = {i: self._executors[i].submit(_shard_scan, self._shard_ids[i], lo, 0, chunk_size, hi)
+                   for i in range(first, last + 1)}
+        for i in range(first, last + 1):
+            start, skip = lo, 0
+            while True:
+                chunk = pending[i].result()
+                if len(chunk) == chunk_size:
+                    # Resume after the last key, skipping its copies already
+                    # sent, and ask for the next chunk before handing this one out
+                    last_key = chunk[-1][0]
+                    same = sum(1 for _ in itertools.takewhile(lambda item: item[0] == last_key,
+                                                              reversed(chunk)))
+                    skip = skip + same if same == len(chunk) and start == last_key else same
+                    start = last_key
+                    pending[i] = self._executors[i].submit(_shard_scan, self._shard_ids[i],
+                                                           start, skip, chunk_size, hi)
+                yield from chunk
+                if len(chunk) < chunk_size:
+                    break
+
+    def irange(self, lo=None, hi=None, chunk_size=SCAN_CHUNK):
+        """Yield keys with lo <= key <= hi in key order"""
+        for key, _ in self.irange_items(lo, hi, chunk_size):
+            yield key
+
+    def __iter__(self):
+        return self.irange()
+
+    def items(self):
+        return self.irange_items()
+
+    # Shard balancing
+
+    def _skewed(self):
+        total = len(self)
+        return self.shard_count > 1 and total >= REBALANCE_MIN_KEYS and \
+            max(self._sizes) * self.shard_count > REBALANCE_RATIO * total
+
+    def _maybe_rebalance(self, written):
+        self._rebalance_backoff -= written
+        if self._rebalance_backoff > 0 or not self._skewed():
+            return
+        self.rebalance()
+        if self._skewed():
+            # Copies of one key outweigh a fair share and no boundary can
+            # split them, so wait for a shard's worth of writes to try again
+            self._rebalance_backoff = len(self) // self.shard_count
+
+    def rebalance(self):
+        """Move shard boundaries so every shard holds about the same number of keys.
+
+        New boundaries are read from the shards with select(), then each
+        shard splits off the items that now belong to a neighbour, and the
+        neighbour joins them in with union(). Only the moved items travel.
+        """
+        total = len(self)
+        if self.shard_count == 1 or total == 0:
+            return
+        prefix = list(itertools.accumulate(self._sizes))
+        boundaries = []
+        for i in range(1, self.shard_count):
+            rank = total * i // self.shard_count
+            shard = bisect.bisect_right(prefix, rank)
+            local = rank - (prefix[shard - 1] if shard else 0)
+            boundaries.append(self._executors[shard].submit(
+                _shard_select, self._shard_ids[shard], local).result())
+        # Fewer distinct keys than shards leaves some boundaries equal (empty shards)
+        for i in range(1, len(boundaries)):
+            boundaries[i] = max(boundaries[i], boundaries[i - 1])
+        if boundaries == self.boundaries:
+            return
+
+        bounds = [None] + boundaries + [None]
+        extracted = self._map(_shard_extract, [(bounds[i], bounds[i + 1])
+                                               for i in range(self.shard_count)])
+        self.boundaries = boundaries
+        incoming = [[] for _ in range(self.shard_count)]
+        for below, above in extracted:
+            for key, value in below + above:
+                incoming[self._shard_for(key)].append((key, value))
+        # Each shard sorts what it receives
+        self._sizes = self._map(_shard_absorb, [(items,) for items in incoming])
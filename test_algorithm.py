@@ -1,4 +1,44 @@
-from algorithm import RedBlackTree
+import random
+import tracemalloc
+from algorithm import RedBlackTree, Node, Tracer, HistoryTracer, ValidatingTracer, InvariantViolation
+
+def assert_valid(rbt):
+    """Assert BST order, parent links, maintained sizes and black height, and
+    all Red-Black properties"""
+    assert not rbt.root.red
+    assert rbt.root == rbt.TNULL or rbt.root.parent is None
+
+    def walk(node, low, high):
+        if node == rbt.TNULL:
+            return 1
+        assert low is None or node.key >= low
+        assert high is None or node.key <= high
+        for child in (node.left, node.right):
+            if child != rbt.TNULL:
+                assert child.parent is node
+                assert not (node.red and child.red)
+        left_height = walk(node.left, low, node.key)
+        assert left_height == walk(node.right, node.key, high)
+        assert node.size == node.left.size + node.right.size + 1
+        return left_height + (0 if node.red else 1)
+
+    # walk counts the black TNULL leaf as well
+    assert walk(rbt.root, None, None) - 1 == rbt.black_height
+    assert rbt.TNULL.size == 0
+    assert rbt.TNULL.parent is None and not rbt.TNULL.red
+
+def inorder_keys(rbt):
+    keys = []
+    stack = []
+    node = rbt.root
+    while stack or node != rbt.TNULL:
+        while node != rbt.TNULL:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        keys.append(node.key)
+        node = node.right
+    return keys
 
 def test_insert():
     print("Testing insertion...")
@@ -61,6 +101,27 @@ def test_delete():
     assert rbt.root.right.left == rbt.TNULL
     print("✅ Deletion test passed!")
 
+def test_delete_fixup_mirror_case_3():
+    print("Testing delete fix-up with a left sibling's inner child red...")
+    #       20          Deleting 30 leaves a black deficit on the right of 20.
+    #      /  \         Its sibling 10 is black with only its inner (right)
+    #    10    30       child red, which is the mirror case 3: recolor and
+    #      \            rotate 10 left before the case 4 rotation
+    #      15(R)
+    tree = RedBlackTree.from_shape([10, 15, 20, 30], None, [False, True, False, False], [1, 2, 0, 1])
+    tree.tracer = HistoryTracer()
+    tree.delete_node(30)
+    tree.tracer = None
+    steps = {step['description']: step['tree_state'] for step in tree.operation_history}
+    # After case 3, 15 is the new black sibling and 10 its red outer child
+    after_case_3 = steps["Case 4: Right rotation on parent"].root.left
+    assert after_case_3.key == 15 and not after_case_3.red
+    assert after_case_3.left.key == 10 and after_case_3.left.red
+    assert_valid(tree)
+    assert inorder_keys(tree) == [10, 15, 20]
+    assert tree.root.key == 15 and not tree.root.left.red and not tree.root.right.red
+    print("✅ Delete fix-up mirror case 3 test passed!")
+
 def test_red_black_properties():
     print("Testing Red-Black properties...")
     rbt = RedBlackTree()
@@ -149,6 +210,509 @@ def test_edge_cases():
     
     print("✅ Edge cases test passed!")
 
+def test_operation_snapshots():
+    print("Testing operation history snapshots...")
+    rbt = RedBlackTree(tracer=HistoryTracer())
+    for node in [10, 20, 5, 15, 25, 30, 1, 7]:
+        rbt.insert(node)
+
+    # The first step was recorded before anything was inserted
+    first = rbt.operation_history[0]['tree_state']
+    assert first.root == first.TNULL
+
+    # Snapshots never carry the history along
+    for step in rbt.operation_history:
+        assert not hasattr(step['tree_state'], 'operation_history')
+
+    # Snapshots match the tree they were taken from
+    def dump(node, nil):
+        if node == nil:
+            return None
+        return (node.key, node.color, dump(node.left, nil), dump(node.right, nil))
+
+    before = rbt.snapshot()
+    assert dump(before.root, before.TNULL) == dump(rbt.root, rbt.TNULL)
+
+    # A change on the right leaves the left subtree shared between snapshots
+    rbt.insert(40)
+    after = rbt.snapshot()
+    assert after.root.left is before.root.left
+    assert after.root.right is not before.root.right
+    assert dump(after.root, after.TNULL) == dump(rbt.root, rbt.TNULL)
+    print("✅ Operation snapshot test passed!")
+
+def test_tracing():
+    print("Testing opt-in tracing...")
+    # Untraced trees record nothing
+    rbt = RedBlackTree()
+    for node in [10, 20, 5, 15, 25, 30, 1, 7]:
+        rbt.insert(node)
+    rbt.delete_node(20)
+    assert rbt.operation_history == []
+
+    # Custom tracers receive every step
+    class StepCollector(Tracer):
+        def __init__(self):
+            self.steps = []
+
+        def step(self, tree, description, step_type):
+            self.steps.append(step_type)
+
+    collector = StepCollector()
+    rbt.tracer = collector
+    rbt.insert(40)
+    assert collector.steps[0] == "start"
+    assert "insert" in collector.steps
+    collector.steps.clear()
+    rbt.delete_node(5)
+    assert collector.steps[0] == "start"
+    assert "delete" in collector.steps
+    assert rbt.operation_history == []
+
+    # Snapshots stay correct after untraced changes
+    rbt.tracer = None
+    rbt.insert(50)
+    snap = rbt.snapshot()
+    assert snap.root.key == rbt.root.key
+    print("✅ Tracing test passed!")
+
+def test_node_memory():
+    print("Testing node memory footprint...")
+    node = Node(1)
+    assert not hasattr(node, '__dict__')
+    assert node.color == "RED" and node.red
+    node.color = "BLACK"
+    assert node.color == "BLACK" and not node.red
+    for invalid in (lambda: setattr(node, 'color', "GREEN"), lambda: Node(2, "GREEN")):
+        try:
+            invalid()
+            assert False, "invalid colors must be rejected"
+        except ValueError:
+            pass
+
+    # Keys are allocated up front so only the nodes themselves are measured
+    count = 100000
+    keys = list(range(count))
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    nodes = [Node(key) for key in keys]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    per_node = (after - before - 8 * len(nodes)) / count
+    print(f"   Memory per node: {per_node:.1f} bytes")
+    assert per_node < 100
+    print("✅ Node memory test passed!")
+
+def test_bulk_construction():
+    print("Testing bulk construction...")
+    for count in range(70):
+        keys = list(range(count))
+        rbt = RedBlackTree.from_sorted(keys)
+        assert_valid(rbt)
+        assert inorder_keys(rbt) == keys
+
+    # Built trees keep working with the regular operations
+    rbt = RedBlackTree.from_sorted(range(0, 200, 2))
+    for key in range(1, 200, 10):
+        rbt.insert(key)
+    for key in range(0, 200, 6):
+        rbt.delete_node(key)
+    assert_valid(rbt)
+
+    values = [5, 3, 9, 3, 1, 7]
+    rbt = RedBlackTree.bulk_load(values)
+    assert_valid(rbt)
+    assert inorder_keys(rbt) == sorted(values)
+
+    try:
+        RedBlackTree.from_sorted(values)
+        assert False, "unsorted input must be rejected"
+    except ValueError:
+        pass
+    print("✅ Bulk construction test passed!")
+
+def test_batch_operations():
+    print("Testing batched insert/delete...")
+    random.seed(6)
+    expected = []
+    rbt = RedBlackTree()
+    # Mix small batches (finger inserts) with large ones (merge and rebuild)
+    for size in [50, 5, 400, 20, 3000, 100]:
+        batch = [random.randint(0, 1000) for _ in range(size)]
+        rbt.insert_many(batch)
+        expected.extend(batch)
+        assert_valid(rbt)
+        assert inorder_keys(rbt) == sorted(expected)
+
+    for size in [10, 200, 3000]:
+        batch = random.sample(expected, min(size, len(expected))) + [-1]
+        removed = rbt.delete_many(batch)
+        assert removed == len(batch) - 1
+        for key in batch[:-1]:
+            expected.remove(key)
+        assert_valid(rbt)
+        assert inorder_keys(rbt) == sorted(expected)
+
+    # Traced trees apply the batch key by key so every step is recorded
+    rbt = RedBlackTree(tracer=HistoryTracer())
+    rbt.insert_many([3, 1, 2])
+    assert inorder_keys(rbt) == [1, 2, 3]
+    assert len(rbt.operation_history) > 3
+    print("✅ Batch operations test passed!")
+
+def test_order_statistics():
+    print("Testing order statistics...")
+    random.seed(7)
+    rbt = RedBlackTree()
+    expected = []
+    for _ in range(1500):
+        if expected and random.random() < 0.4:
+            key = random.choice(expected)
+            expected.remove(key)
+            rbt.delete_node(key)
+        else:
+            key = random.randint(0, 300)
+            expected.append(key)
+            rbt.insert(key)
+    assert_valid(rbt)
+    expected.sort()
+    assert len(rbt) == len(expected)
+
+    for k in range(len(expected)):
+        assert rbt.select(k).key == expected[k]
+    for key in range(-1, 302):
+        assert rbt.rank(key) == sum(1 for e in expected if e < key)
+    try:
+        rbt.select(len(expected))
+        assert False, "select past the end must raise"
+    except IndexError:
+        pass
+
+    assert len(RedBlackTree()) == 0
+    assert len(RedBlackTree.from_sorted(range(10))) == 10
+    print("✅ Order statistics test passed!")
+
+def test_incomparable_insert():
+    print("Testing inserts of keys that cannot be compared...")
+    rbt = RedBlackTree()
+    for key in [1, 2, 3]:
+        rbt.insert(key)
+    version = rbt.version
+    for bad in (lambda: rbt.insert('x'), lambda: rbt.insert_many(['a', 'b'])):
+        try:
+            bad()
+            assert False, "incomparable keys must raise TypeError"
+        except TypeError:
+            pass
+    # The failed inserts left no trace in the subtree sizes
+    assert rbt.version == version
+    assert_valid(rbt)
+    assert len(rbt) == 3 and list(rbt) == [1, 2, 3]
+    assert [rbt.select(k).key for k in range(3)] == [1, 2, 3]
+    assert [rbt.rank(key) for key in [1, 2, 3, 4]] == [0, 1, 2, 3]
+    rbt.insert_many(range(10, 100))
+    assert len(rbt) == 93 and rbt.select(92).key == 99
+    print("✅ Incomparable insert test passed!")
+
+def test_ordered_iteration():
+    print("Testing ordered iteration and range queries...")
+    random.seed(8)
+    keys = [random.randint(0, 200) for _ in range(300)]
+    rbt = RedBlackTree()
+    for key in keys:
+        rbt.insert(key)
+    keys.sort()
+
+    assert list(rbt) == keys
+    assert list(reversed(rbt)) == keys[::-1]
+    assert list(RedBlackTree()) == []
+
+    for lo, hi in [(None, None), (50, 120), (None, 30), (180, None), (77, 77), (120, 50)]:
+        expected = [k for k in keys if (lo is None or k >= lo) and (hi is None or k <= hi)]
+        assert list(rbt.irange(lo, hi)) == expected
+        assert list(rbt.irange(lo, hi, reverse=True)) == expected[::-1]
+
+    for key in range(-5, 206):
+        below = [k for k in keys if k <= key]
+        above = [k for k in keys if k >= key]
+        floor = rbt.floor(key)
+        ceiling = rbt.ceiling(key)
+        assert (floor.key if floor != rbt.TNULL else None) == (below[-1] if below else None)
+        assert (ceiling.key if ceiling != rbt.TNULL else None) == (above[0] if above else None)
+
+    # Walking successors/predecessors visits every key
+    node = rbt.minimum(rbt.root)
+    walked = []
+    while node != rbt.TNULL:
+        walked.append(node.key)
+        node = rbt.successor(node)
+    assert walked == keys
+    node = rbt.maximum(rbt.root)
+    walked = []
+    while node != rbt.TNULL:
+        walked.append(node.key)
+        node = rbt.predecessor(node)
+    assert walked == keys[::-1]
+    print("✅ Ordered iteration test passed!")
+
+def test_mapping_interface():
+    print("Testing mapping interface...")
+    rbt = RedBlackTree()
+    for key in [30, 10, 20, 40]:
+        rbt[key] = f"v{key}"
+    assert rbt[20] == "v20"
+    assert 40 in rbt and 50 not in rbt
+    assert rbt.get(50) is None and rbt.get(50, "x") == "x"
+
+    # Upserts update the existing node instead of adding a duplicate
+    node = rbt.search(20)
+    rbt[20] = "updated"
+    assert rbt.search(20) is node
+    assert len(rbt) == 4 and rbt[20] == "updated"
+
+    assert list(rbt.items()) == [(10, "v10"), (20, "updated"), (30, "v30"), (40, "v40")]
+    assert list(rbt.keys()) == [10, 20, 30, 40]
+    assert list(rbt.values()) == ["v10", "updated", "v30", "v40"]
+
+    assert rbt.pop(10) == "v10"
+    assert rbt.pop(10, None) is None
+    del rbt[30]
+    assert list(rbt.items()) == [(20, "updated"), (40, "v40")]
+    for missing in (lambda: rbt[99], lambda: rbt.pop(99)):
+        try:
+            missing()
+            assert False, "missing keys must raise KeyError"
+        except KeyError:
+            pass
+    try:
+        del rbt[99]
+        assert False, "missing keys must raise KeyError"
+    except KeyError:
+        pass
+    assert_valid(rbt)
+
+    # Values survive bulk construction and batch rebuilds
+    rbt = RedBlackTree.bulk_load([3, 1, 2], values=["c", "a", "b"])
+    assert list(rbt.items()) == [(1, "a"), (2, "b"), (3, "c")]
+    rbt.insert_many(range(100, 120))
+    assert rbt[2] == "b" and rbt[105] is None
+    rbt.delete_many(range(100, 120))
+    assert list(rbt.items()) == [(1, "a"), (2, "b"), (3, "c")]
+    print("✅ Mapping interface test passed!")
+
+def test_maintained_statistics():
+    print("Testing maintained statistics...")
+    random.seed(10)
+    rbt = RedBlackTree()
+    expected = []
+    for _ in range(2000):
+        if expected and random.random() < 0.45:
+            key = random.choice(expected)
+            expected.remove(key)
+            rbt.delete_node(key)
+        else:
+            key = random.randint(0, 400)
+            expected.append(key)
+            rbt.insert(key)
+        if len(expected) % 50 == 0:
+            assert_valid(rbt)
+    assert_valid(rbt)
+    assert rbt.rotations > 0 and rbt.recolors > 0
+
+    # Emptying the tree brings the black height back to zero
+    for key in list(expected):
+        rbt.delete_node(key)
+    assert len(rbt) == 0 and rbt.black_height == 0
+
+    for count in [0, 1, 2, 3, 7, 8, 100]:
+        assert_valid(RedBlackTree.from_sorted(range(count)))
+    print("✅ Maintained statistics test passed!")
+
+def test_validating_tracer():
+    print("Testing incremental invariant checking...")
+    random.seed(11)
+    history = HistoryTracer()
+    rbt = RedBlackTree(tracer=ValidatingTracer(history))
+    keys = []
+    for _ in range(1500):
+        if keys and random.random() < 0.45:
+            key = keys.pop(random.randrange(len(keys)))
+            rbt.delete_node(key)
+        else:
+            key = random.randint(0, 300)
+            keys.append(key)
+            rbt.insert(key)
+    assert_valid(rbt)
+    assert inorder_keys(rbt) == sorted(keys)
+    # The wrapped tracer still sees every step
+    assert rbt.operation_history
+
+    # A broken subtree size on the insert path is reported
+    rbt = RedBlackTree.from_sorted(list(range(0, 200, 2)), tracer=ValidatingTracer())
+    rbt.root.right.size += 1
+    try:
+        rbt.insert(151)
+        assert False, "Expected an invariant violation"
+    except InvariantViolation as e:
+        assert "size" in str(e)
+
+    # So is a black-height mismatch left behind by a color change
+    rbt = RedBlackTree.from_sorted(list(range(0, 200, 2)))
+    rbt.tracer = ValidatingTracer()
+    rbt.root.left.red = not rbt.root.left.red
+    try:
+        rbt.delete_node(rbt.root.left.key)
+        assert False, "Expected an invariant violation"
+    except InvariantViolation as e:
+        assert "black height" in str(e)
+    print("✅ Validating tracer test passed!")
+
+def test_metrics():
+    print("Testing hot-path metrics...")
+    rbt = RedBlackTree()
+    assert rbt.metrics() is None
+    rbt.enable_metrics()
+    for key in range(1, 101):
+        rbt.insert(key)
+    for key in range(1, 101, 3):
+        rbt.delete_node(key)
+    for key in range(50):
+        rbt.search(key)
+    assert_valid(rbt)
+
+    metrics = rbt.metrics()
+    assert metrics['allocations'] == 100
+    assert metrics['operations'] == {'insert': 100, 'delete': 34, 'search': 50}
+    assert metrics['rotations_left'] + metrics['rotations_right'] == rbt.rotations
+    assert metrics['recolors'] == rbt.recolors
+    assert metrics['comparisons'] > 0
+    assert sum(metrics['fixup_depth']['insert'].values()) == 100
+    assert sum(k * v for k, v in metrics['fixup_depth']['insert'].items()) == metrics['insert_fixup_iterations']
+    assert metrics['latency']['insert']['count'] == 100
+    assert sum(metrics['latency']['search']['buckets'].values()) == 50
+    # Deleting a missing key still finishes the operation it started
+    rbt.delete_node(1000)
+    assert rbt.metrics()['operations']['delete'] == 35
+    assert rbt.metrics()['latency']['delete']['count'] == 35
+
+    # Counters restart from zero, and disabling restores the wrapped tracer
+    rbt.reset_metrics()
+    assert rbt.metrics()['comparisons'] == 0
+    assert rbt.metrics()['recolors'] == 0
+    rbt.disable_metrics()
+    assert rbt.tracer is None and rbt.metrics() is None
+
+    history = HistoryTracer()
+    rbt = RedBlackTree(tracer=history)
+    rbt.enable_metrics()
+    rbt.insert(1)
+    assert rbt.metrics()['comparisons'] == 0
+    rbt.insert(2)
+    assert rbt.metrics()['comparisons'] == 1
+    rbt.disable_metrics()
+    assert rbt.tracer is history
+    print("✅ Metrics test passed!")
+
+def test_join_and_split():
+    print("Testing join and split...")
+    random.seed(14)
+    for _ in range(100):
+        keys = sorted(random.sample(range(1000), random.randint(0, 150)))
+        rbt = RedBlackTree()
+        for key in random.sample(keys, len(keys)):
+            rbt.insert(key, str(key))
+        pivot = random.randint(-10, 1010)
+        low, high = rbt.split(pivot)
+        assert len(rbt) == 0
+        assert_valid(low)
+        assert_valid(high)
+        assert inorder_keys(low) == [k for k in keys if k < pivot]
+        assert inorder_keys(high) == [k for k in keys if k >= pivot]
+
+        joined = RedBlackTree.join(low, pivot, high, value="pivot")
+        assert len(low) == 0 and len(high) == 0
+        assert_valid(joined)
+        assert inorder_keys(joined) == sorted(keys + [pivot])
+        assert joined[pivot] == "pivot" or pivot in keys
+
+    # Trees of very different heights
+    small = RedBlackTree.from_sorted([1, 2])
+    large = RedBlackTree.from_sorted(list(range(10, 1000)))
+    joined = RedBlackTree.join(small, 5, large)
+    assert_valid(joined)
+    assert len(joined) == 993
+
+    try:
+        RedBlackTree.join(RedBlackTree.from_sorted([5]), 3, RedBlackTree())
+        assert False, "Expected ValueError"
+    except ValueError:
+        pass
+    print("✅ Join and split test passed!")
+
+def test_set_operations():
+    print("Testing union, intersection and difference...")
+    random.seed(15)
+    for trial in range(300):
+        # Mix sizes on both sides of the small-input cutoff, with duplicates
+        a = [random.randint(0, 80) for _ in range(random.randint(0, 150))]
+        b = [random.randint(0, 80) for _ in range(random.randint(0, 150))]
+        first = RedBlackTree()
+        second = RedBlackTree()
+        for key in a:
+            first.insert(key, 'first')
+        for key in b:
+            second.insert(key, 'second')
+
+        operation = trial % 3
+        if operation == 0:
+            result = first.union(second)
+            expected = sorted(a + [k for k in b if k not in set(a)])
+        elif operation == 1:
+            result = first.intersection(second)
+            expected = sorted(k for k in a if k in set(b))
+        else:
+            result = first.difference(second)
+            expected = sorted(k for k in a if k not in set(b))
+        assert len(first) == 0 and len(second) == 0
+        assert_valid(result)
+        assert inorder_keys(result) == expected
+        for key, value in result.items():
+            assert value == ('first' if key in set(a) else 'second')
+    print("✅ Set operations test passed!")
+
+def test_version_counter():
+    print("Testing mutation version counter...")
+    tree = RedBlackTree()
+    other = RedBlackTree()
+    assert tree.uid != other.uid
+
+    versions = [tree.version]
+    def changed():
+        assert tree.version > versions[-1]
+        versions.append(tree.version)
+
+    tree.insert(5)
+    changed()
+    tree.insert_many([1, 2, 3])
+    changed()
+    tree[2] = "two"
+    changed()
+    tree.delete_node(1)
+    changed()
+    tree.delete_many([2, 3])
+    changed()
+    tree.insert_many(range(100))  # Rebuild path
+    changed()
+    # Reads and failed deletes leave the version alone
+    tree.search(5)
+    list(tree.irange(1, 10))
+    tree.delete_node(-1)
+    assert tree.version == versions[-1]
+    low, high = tree.split(50)
+    changed()
+    assert {low.uid, high.uid}.isdisjoint({tree.uid})
+    print("✅ Version counter test passed!")
+
 def run_all_tests():
     print("🧪 Running Red-Black Tree Tests...")
     print("=" * 50)
@@ -156,9 +720,25 @@ def run_all_tests():
     try:
         test_insert()
         test_delete()
+        test_delete_fixup_mirror_case_3()
         test_red_black_properties()
         test_search()
         test_edge_cases()
+        test_operation_snapshots()
+        test_tracing()
+        test_node_memory()
+        test_bulk_construction()
+        test_batch_operations()
+        test_order_statistics()
+        test_incomparable_insert()
+        test_ordered_iteration()
+        test_mapping_interface()
+        test_maintained_statistics()
+        test_validating_tracer()
+        test_metrics()
+        test_join_and_split()
+        test_set_operations()
+        test_version_counter()
         
         print("=" * 50)
         print("🎉 All tests passed successfully!")
@@ -0,0 +1,126 @@
+import random
+from array_tree import ArrayRedBlackTree
+from algorithm import RedBlackTree
+
+def check_properties(tree):
+    """Assert the Red-Black properties and return the black height"""
+    assert not tree.red[tree.root]
+    assert not tree.red[tree.TNULL]
+
+    def walk(node, low, high):
+        if node == tree.TNULL:
+            return 1
+        key = tree.keys[node]
+        assert low is None or key >= low
+        assert high is None or key <= high
+        for child in (tree.left[node], tree.right[node]):
+            if child != tree.TNULL:
+                assert tree.parent[child] == node
+                if tree.red[node]:
+                    assert not tree.red[child]
+        left_height = walk(tree.left[node], low, key)
+        right_height = walk(tree.right[node], key, high)
+        assert left_height == right_height
+        return left_height + (0 if tree.red[node] else 1)
+
+    return walk(tree.root, None, None)
+
+def inorder(tree):
+    keys = []
+    stack = []
+    node = tree.root
+    while stack or node != tree.TNULL:
+        while node != tree.TNULL:
+            stack.append(node)
+            node = tree.left[node]
+        node = stack.pop()
+        keys.append(tree.keys[node])
+        node = tree.right[node]
+    return keys
+
+def test_matches_linked_tree():
+    print("Testing array tree against the linked tree...")
+    random.seed(4)
+    tree = ArrayRedBlackTree()
+    linked = RedBlackTree()
+    keys = []
+    for _ in range(2000):
+        if keys and random.random() < 0.4:
+            key = random.choice(keys)
+            keys.remove(key)
+            tree.delete_node(key)
+            linked.delete_node(key)
+        else:
+            key = random.randint(0, 500)
+            keys.append(key)
+            tree.insert(key)
+            linked.insert(key)
+    check_properties(tree)
+    assert inorder(tree) == sorted(keys)
+    assert len(tree) == len(keys)
+    for key in range(0, 500, 7):
+        found = tree.search(key)
+        assert (found != tree.TNULL) == (key in keys)
+        if found != tree.TNULL:
+            assert tree.keys[found] == key
+
+    # Same algorithm on the same operations gives the same shape and colors
+    def shape(node):
+        if node == tree.TNULL:
+            return None
+        return (tree.keys[node], bool(tree.red[node]),
+                shape(tree.left[node]), shape(tree.right[node]))
+
+    def linked_shape(node):
+        if node == linked.TNULL:
+            return None
+        return (node.key, node.red, linked_shape(node.left), linked_shape(node.right))
+
+    assert shape(tree.root) == linked_shape(linked.root)
+    print("✅ Array tree comparison test passed!")
+
+def test_slot_reuse():
+    print("Testing free slot reuse...")
+    tree = ArrayRedBlackTree()
+    for key in range(100):
+        tree.insert(key)
+    capacity = len(tree.keys)
+    for key in range(0, 100, 2):
+        tree.delete_node(key)
+    for key in range(1000, 1050):
+        tree.insert(key)
+    assert len(tree.keys) == capacity
+    assert len(tree) == 100
+    check_properties(tree)
+    print("✅ Slot reuse test passed!")
+
+def test_memory_per_node():
+    print("Testing array tree memory footprint...")
+    tree = ArrayRedBlackTree()
+    count = 100000
+    for key in range(count):
+        tree.insert(key)
+    per_node = tree.memory_usage() / count
+    print(f"   Array tree memory per node: {per_node:.1f} bytes")
+    assert per_node < 30
+    print("✅ Array tree memory test passed!")
+
+def run_all_tests():
+    print("🧪 Running Array Red-Black Tree Tests...")
+    print("=" * 50)
+
+    try:
+        test_matches_linked_tree()
+        test_slot_reuse()
+        test_memory_per_node()
+
+        print("=" * 50)
+        print("🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,111 @@
+import random
+import threading
+from concurrent_tree import ConcurrentRedBlackTree
+from test_persistent import check_properties
+
+def test_single_thread_api():
+    print("Testing concurrent tree API...")
+    tree = ConcurrentRedBlackTree()
+    for key in [5, 3, 8, 1]:
+        tree.insert(key, key * 10)
+    tree[9] = 90
+    assert list(tree) == [1, 3, 5, 8, 9]
+    assert tree[8] == 80 and tree.get(4) is None and 3 in tree
+    assert tree.delete_node(3) and not tree.delete_node(3)
+    assert list(tree.irange(2, 8)) == [5, 8]
+
+    snapshot = tree.snapshot()
+    tree.insert_many([20, 30])
+    assert tree.delete_many([1, 20, 99]) == 2
+    assert list(snapshot) == [1, 5, 8, 9]
+    assert list(tree) == [5, 8, 9, 30]
+
+    # A failed batch publishes nothing
+    try:
+        with tree.batch() as batch:
+            batch.insert(100)
+            assert batch.search(100) is not tree.TNULL
+            raise RuntimeError("abort")
+    except RuntimeError:
+        pass
+    assert 100 not in tree
+    print("✅ Concurrent tree API test passed!")
+
+def test_stress():
+    print("Testing concurrent readers and writers...")
+    tree = ConcurrentRedBlackTree()
+    writers = 4
+    per_writer = 400
+    errors = []
+    done = threading.Event()
+
+    def writer(w):
+        rng = random.Random(w)
+        # Each writer owns the keys congruent to w, so the final state is known
+        keys = [w + writers * i for i in range(per_writer)]
+        for i, key in enumerate(keys):
+            if i % 10 == 9:
+                with tree.batch() as batch:
+                    batch.insert(key)
+                    batch.delete_node(keys[i - 1])
+            else:
+                tree.insert(key)
+            if rng.random() < 0.3:
+                tree.delete_node(key)
+                tree.insert(key)
+
+    def reader(r):
+        rng = random.Random(100 + r)
+        try:
+            while not done.is_set():
+                choice = rng.random()
+                if choice < 0.5:
+                    tree.search(rng.randrange(writers * per_writer))
+                elif choice < 0.8:
+                    lo = rng.randrange(writers * per_writer)
+                    keys = list(tree.irange(lo, lo + 50))
+                    assert keys == sorted(keys)
+                    assert all(lo <= k <= lo + 50 for k in keys)
+                else:
+                    # A snapshot is one consistent version
+                    snapshot = tree.snapshot()
+                    assert len(list(snapshot)) == len(snapshot)
+                    check_properties(snapshot)
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=reader, args=(r,)) for r in range(4)]
+    writer_threads = [threading.Thread(target=writer, args=(w,)) for w in range(writers)]
+    for thread in readers + writer_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    done.set()
+    for thread in readers:
+        thread.join()
+
+    assert not errors, errors
+    expected = sorted(w + writers * i for w in range(writers) for i in range(per_writer)
+                      if i % 10 != 8)
+    assert list(tree) == expected
+    check_properties(tree.snapshot())
+    print("✅ Concurrent stress test passed!")
+
+def run_all_tests():
+    print("🧪 Running Concurrent Red-Black Tree Tests...")
+    print("=" * 50)
+
+    try:
+        test_single_thread_api()
+        test_stress()
+
+        print("=" * 50)
+        print("🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,110 @@
+import random
+from algorithm import RedBlackTree
+from history import OperationHistory, OP_INSERT, OP_DELETE
+
+def shape(tree):
+    """Preorder (key, color, depth) of every node, to compare trees node for node"""
+    nodes = []
+    stack = [(tree.root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        if node is tree.TNULL:
+            continue
+        nodes.append((node.key, node.red, depth))
+        stack.append((node.right, depth + 1))
+        stack.append((node.left, depth + 1))
+    return nodes
+
+def test_replay_matches():
+    print("Testing history replay...")
+    rng = random.Random(0)
+    tree = RedBlackTree()
+    history = OperationHistory(memory_budget=10 ** 9, checkpoint_every=7)
+    expected = []
+    for i in range(300):
+        key = rng.randrange(200)
+        if rng.random() < 0.1:
+            # Changed behind the history's back
+            tree.insert(rng.randrange(200))
+        if rng.random() < 0.3:
+            opcode = OP_DELETE if rng.random() < 0.4 else OP_INSERT
+            trace = history.apply(tree, opcode, key, trace=True)
+            for index, (description, step_type) in enumerate(trace):
+                if step_type in ('rotation', 'recolor'):
+                    history.record(tree, description, step_type, trace=index)
+                    expected.append(None)
+        elif rng.random() < 0.6:
+            history.insert(tree, key)
+        else:
+            history.delete(tree, key)
+        history.record(tree, f"After step {i}")
+        expected.append(shape(tree))
+    assert len(history) == len(expected)
+    for step, nodes in zip(history, expected):
+        state = history.state(step)
+        if nodes is not None:
+            assert shape(state) == nodes, step['description']
+    # Traced steps show the tree partway through the operation
+    tree = RedBlackTree()
+    history = OperationHistory()
+    for key in [1, 2]:
+        history.insert(tree, key)
+    trace = history.apply(tree, OP_INSERT, 3, trace=True)
+    rotation = [index for index, (_, step_type) in enumerate(trace) if step_type == 'rotation'][0]
+    history.record(tree, trace[rotation][0], 'rotation', trace=rotation)
+    assert [key for key, _, _ in shape(history.state(history[0]))] == [1, 2, 3]
+    assert history.state(history[0]) is history.state(history[0])
+    print("✅ History replay test passed!")
+
+def test_memory_budget():
+    print("Testing history memory budget...")
+    tree = RedBlackTree()
+    history = OperationHistory(memory_budget=200000, checkpoint_every=20)
+    for key in range(3000):
+        history.insert(tree, key)
+        history.record(tree, f"Inserted {key}")
+    assert history.bytes <= 200000
+    assert history.dropped > 0 and len(history) + history.dropped == 3000
+    # The oldest kept step is still rebuildable, and later steps are intact
+    oldest = history[0]
+    assert len(history.state(oldest)) == int(oldest['description'].split()[1]) + 1
+    assert shape(history.state(history[-1])) == shape(tree)
+    history.clear()
+    assert len(history) == 0 and history.bytes == 0
+    print("✅ History memory budget test passed!")
+
+def test_traced_steps_at_checkpoint():
+    print("Testing traced steps at a checkpoint boundary...")
+    tree = RedBlackTree()
+    tree.insert_many(range(0, 40000, 2))
+    # Room for one checkpoint only, so every new one drops the previous
+    history = OperationHistory(memory_budget=300000, checkpoint_every=5)
+    for i in range(23):
+        trace = history.apply(tree, OP_INSERT, 2 * i + 1, trace=True)
+        for index, (description, step_type) in enumerate(trace):
+            history.record(tree, description, step_type, trace=index)
+        assert history.state(history[-1]) is not None
+        history.record(tree, f"After inserting {2 * i + 1}")
+        assert shape(history.state(history[-1])) == shape(tree)
+    assert len(history._checkpoints) == 1 and history.dropped > 0
+    print("✅ Traced steps at checkpoint boundary test passed!")
+
+def run_all_tests():
+    print("🧪 Running Operation History Tests...")
+    print("=" * 50)
+
+    try:
+        test_replay_matches()
+        test_memory_budget()
+        test_traced_steps_at_checkpoint()
+
+        print("=" * 50)
+        print("🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,120 @@
+import random
+from collections import defaultdict
+from algorithm import RedBlackTree, SnapshotNode, SNAPSHOT_NULL, TreeSnapshot
+import layout as layout_module
+from layout import MIN_SEPARATION, layout_tree, tree_to_svg
+
+def check_layout(tree):
+    """Assert that no two nodes on a level are too close and parents are centered"""
+    layout = layout_tree(tree)
+    levels = defaultdict(list)
+    children = defaultdict(list)
+    for i in range(len(layout)):
+        levels[layout.depth[i]].append(layout.x[i])
+        if layout.parent[i] >= 0:
+            children[layout.parent[i]].append(i)
+    for xs in levels.values():
+        xs.sort()
+        assert all(b - a >= MIN_SEPARATION - 1e-9 for a, b in zip(xs, xs[1:]))
+    for parent, kids in children.items():
+        if len(kids) == 2:
+            left, right = kids
+            assert layout.x[left] < layout.x[parent] < layout.x[right]
+            assert abs((layout.x[left] + layout.x[right]) / 2 - layout.x[parent]) < 1e-9
+    return layout
+
+def unbalanced(keys):
+    """Plain (unbalanced) BST snapshot, to exercise contours of very different heights"""
+    root = SNAPSHOT_NULL
+    for key in keys:
+        if root is SNAPSHOT_NULL:
+            root = SnapshotNode(key, False, SNAPSHOT_NULL, SNAPSHOT_NULL)
+            continue
+        node = root
+        while True:
+            side = 'left' if key < node.key else 'right'
+            child = getattr(node, side)
+            if child is SNAPSHOT_NULL:
+                setattr(node, side, SnapshotNode(key, False, SNAPSHOT_NULL, SNAPSHOT_NULL))
+                break
+            node = child
+    return TreeSnapshot(root, len(keys))
+
+def test_tidy_layout():
+    print("Testing tidy tree layout...")
+    rng = random.Random(0)
+    for _ in range(100):
+        tree = RedBlackTree()
+        for key in rng.sample(range(1000), rng.randint(0, 200)):
+            tree.insert(key)
+        for key in rng.sample(range(1000), 100):
+            if key in tree:
+                tree.delete_node(key)
+        layout = check_layout(tree)
+        assert len(layout) == len(tree)
+    for _ in range(100):
+        check_layout(unbalanced(rng.sample(range(1000), rng.randint(1, 120))))
+    # A degenerate chain deeper than the recursion limit lays out fine
+    layout = check_layout(unbalanced(range(3000)))
+    assert layout.height == 3000
+    print("✅ Tidy layout test passed!")
+
+def test_absolute_x_paths():
+    print("Testing pure and NumPy coordinate passes...")
+    rng = random.Random(1)
+    trees = [unbalanced(rng.sample(range(1000), 200)), unbalanced(range(300))]
+    tree = RedBlackTree()
+    tree.insert_many(range(2000))
+    trees.append(tree)
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+    saved = layout_module.np
+    try:
+        for tree in trees:
+            layout_module.np = None
+            pure = check_layout(tree).x
+            if numpy is not None:
+                layout_module.np = numpy
+                assert check_layout(tree).x == pure
+    finally:
+        layout_module.np = saved
+    if numpy is None:
+        print("(NumPy not installed, only the pure Python pass was run)")
+    print("✅ Coordinate pass test passed!")
+
+def test_svg_output():
+    print("Testing SVG output...")
+    assert tree_to_svg(RedBlackTree()) is None
+    tree = RedBlackTree()
+    tree.insert_many(range(10000))
+    svg = tree_to_svg(tree)
+    assert svg.startswith('<svg') and svg.endswith('</svg>')
+    assert svg.count('<circle') == 10000 and svg.count('<line') == 9999
+    small = RedBlackTree()
+    for key in [2, 1, 3]:
+        small.insert(key)
+    svg = tree_to_svg(small)
+    assert '>2</text>' in svg and svg.count('fill="#d62728"') == 2
+    print("✅ SVG output test passed!")
+
+def run_all_tests():
+    print("🧪 Running Tree Layout Tests...")
+    print("=" * 50)
+
+    try:
+        test_tidy_layout()
+        test_absolute_x_paths()
+        test_svg_output()
+
+        print("=" * 50)
+        print("🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,74 @@
+import os
+import random
+import tempfile
+from mmap_tree import MmapRedBlackTree
+from test_array_tree import check_properties, inorder
+
+def test_operations_and_reopen():
+    print("Testing memory-mapped tree...")
+    random.seed(2)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tree.rbt")
+        keys = []
+        with MmapRedBlackTree(path) as tree:
+            for _ in range(5000):
+                if keys and random.random() < 0.4:
+                    key = random.choice(keys)
+                    keys.remove(key)
+                    tree.delete_node(key)
+                else:
+                    key = random.randint(0, 2000)
+                    keys.append(key)
+                    tree.insert(key)
+            check_properties(tree)
+            assert inorder(tree) == sorted(keys) and len(tree) == len(keys)
+            assert list(tree.irange(100, 200)) == [k for k in sorted(keys) if 100 <= k <= 200]
+            assert tree.keys[tree.search(keys[0])] == keys[0]
+            assert tree.search(-1) == tree.TNULL
+
+        # The file holds the whole tree, including the root and free list
+        with MmapRedBlackTree(path) as tree:
+            check_properties(tree)
+            assert list(tree) == sorted(keys)
+            tree.insert(-5)
+            assert list(tree)[0] == -5
+    print("✅ Memory-mapped tree test passed!")
+
+def test_record_reuse_and_growth():
+    print("Testing record reuse and file growth...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tree.rbt")
+        with MmapRedBlackTree(path, typecode='d') as tree:
+            for key in range(3000):
+                tree.insert(key + 0.5)
+            capacity = tree.capacity
+            size = os.path.getsize(path)
+            assert capacity >= 3001
+            for key in range(0, 3000, 2):
+                tree.delete_node(key + 0.5)
+            for key in range(5000, 6500):
+                tree.insert(float(key))
+            # Deleted records were reused, so the file did not grow
+            assert tree.capacity == capacity and os.path.getsize(path) == size
+            assert len(tree) == 3000
+            check_properties(tree)
+    print("✅ Record reuse test passed!")
+
+def run_all_tests():
+    print("🧪 Running Memory-Mapped Red-Black Tree Tests...")
+    print("=" * 50)
+
+    try:
+        test_operations_and_reopen()
+        test_record_reuse_and_growth()
+
+        print("=" * 50)
+        print("🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,104 @@
+import random
+from persistent import PersistentRedBlackTree
+
+def check_properties(tree):
+    """Assert BST order, sizes and the Red-Black properties; return the black height"""
+    assert not tree.root.red
+
+    def walk(node, low, high):
+        if node is tree.TNULL:
+            return 1
+        assert low is None or node.key >= low
+        assert high is None or node.key <= high
+        assert not (node.red and (node.left.red or node.right.red))
+        assert node.size == node.left.size + node.right.size + 1
+        left_height = walk(node.left, low, node.key)
+        assert left_height == walk(node.right, node.key, high)
+        return left_height + (0 if node.red else 1)
+
+    return walk(tree.root, None, None)
+
+def test_versions():
+    print("Testing persistent versions...")
+    random.seed(15)
+    tree = PersistentRedBlackTree()
+    keys = []
+    history = []
+    for _ in range(2000):
+        if keys and random.random() < 0.45:
+            key = random.choice(keys)
+            keys.remove(key)
+            tree = tree.delete(key)
+        else:
+            key = random.randint(0, 200)
+            keys.append(key)
+            tree = tree.insert(key, -key)
+        history.append((tree, sorted(keys)))
+
+    # Every old version is still valid and unchanged
+    for version, expected in history[::25]:
+        check_properties(version)
+        assert list(version) == expected
+        assert len(version) == len(expected)
+    assert tree.version == len(history)
+    assert all(tree[key] == -key for key in keys)
+    print("✅ Persistent versions test passed!")
+
+def test_structural_sharing():
+    print("Testing structural sharing...")
+    tree = PersistentRedBlackTree.from_sorted(list(range(1024)))
+    check_properties(tree)
+    updated = tree.insert(2000)
+
+    def nodes(node, found):
+        if node is not tree.TNULL:
+            found.add(id(node))
+            nodes(node.left, found)
+            nodes(node.right, found)
+        return found
+
+    old_nodes = nodes(tree.root, set())
+    new_nodes = nodes(updated.root, set())
+    # Only the search path is copied
+    assert len(new_nodes - old_nodes) <= 2 * 11 + 1
+    assert 2000 not in tree and 2000 in updated
+    assert tree.delete(5000) is tree
+    print("✅ Structural sharing test passed!")
+
+def test_reads():
+    print("Testing persistent reads...")
+    tree = PersistentRedBlackTree()
+    for key in [50, 20, 80, 10, 30, 70, 90]:
+        tree = tree.insert(key, str(key))
+    tree = tree.set(30, "thirty")
+    assert tree[30] == "thirty"
+    assert tree.get(31) is None
+    assert list(tree.irange(20, 70)) == [20, 30, 50, 70]
+    assert tree.select(0) == 10 and tree.rank(55) == 4
+    assert list(tree.items())[:2] == [(10, "10"), (20, "20")]
+    try:
+        PersistentRedBlackTree.from_sorted([2, 1])
+        assert False, "Expected ValueError"
+    except ValueError:
+        pass
+    print("✅ Persistent reads test passed!")
+
+def run_all_tests():
+    print("🧪 Running Persistent Red-Black Tree Tests...")
+    print("=" * 50)
+
+    try:
+        test_versions()
+        test_structural_sharing()
+        test_reads()
+
+        print("=" * 50)
+        print("🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,80 @@
+import gc
+import weakref
+from algorithm import RedBlackTree
+from persistent import PersistentRedBlackTree
+from render_cache import RenderCache, render_key
+
+def test_lru_eviction():
+    print("Testing render cache LRU eviction...")
+    cache = RenderCache(max_bytes=100, max_entries=3)
+    cache.put('a', 'A', 10)
+    cache.put('b', 'B', 10)
+    cache.put('c', 'C', 10)
+    assert cache.get('a') == 'A'  # 'b' is now least recently used
+    cache.put('d', 'D', 10)
+    assert len(cache) == 3 and cache.get('b') is None
+    assert cache.get('a') == 'A' and cache.get('c') == 'C' and cache.get('d') == 'D'
+    assert cache.hits == 4 and cache.misses == 1
+    print("✅ Render cache LRU eviction test passed!")
+
+def test_byte_budget():
+    print("Testing render cache byte budget...")
+    cache = RenderCache(max_bytes=100, max_entries=10)
+    cache.put('a', 'A', 40)
+    cache.put('b', 'B', 40)
+    cache.put('c', 'C', 40)  # Over budget: 'a' goes
+    assert cache.bytes == 80 and cache.get('a') is None
+    # Replacing an entry swaps its size instead of adding to it
+    cache.put('b', 'B2', 10)
+    assert cache.bytes == 50 and cache.get('b') == 'B2'
+    # Values larger than the whole budget are never stored
+    cache.put('huge', 'H', 101)
+    assert cache.get('huge') is None and cache.bytes == 50
+    cache.put('b', 'B3', 101)  # Nor kept when they replace an entry
+    assert cache.get('b') is None and cache.bytes == 40
+    cache.clear()
+    assert len(cache) == 0 and cache.bytes == 0
+    print("✅ Render cache byte budget test passed!")
+
+def test_render_key():
+    print("Testing render keys...")
+    tree = RedBlackTree()
+    tree.insert_many(range(10))
+    key = render_key(tree)
+    assert render_key(tree) == key
+    tree.insert(10)
+    assert render_key(tree) != key
+    assert render_key(RedBlackTree()) != render_key(RedBlackTree())
+
+    # Snapshots are keyed by their root, without keeping it alive
+    cache = RenderCache()
+    snapshot = tree.snapshot()
+    cache.put(('svg', render_key(snapshot)), 'SVG', 3)
+    assert cache.get(('svg', render_key(tree.snapshot()))) == 'SVG'
+    root = weakref.ref(snapshot.root)
+    tree._clear()
+    del snapshot
+    gc.collect()
+    assert root() is None
+    assert len(cache) == 1 and cache.get(('svg', render_key(PersistentRedBlackTree().insert(1)))) is None
+    print("✅ Render keys test passed!")
+
+def run_all_tests():
+    print("🧪 Running Render Cache Tests...")
+    print("=" * 50)
+
+    try:
+        test_lru_eviction()
+        test_byte_budget()
+        test_render_key()
+
+        print("=" * 50)
+        print("🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    run_all_tests()
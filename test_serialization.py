@@ -0,0 +1,123 @@
+import io
+import pickle
+import random
+from algorithm import RedBlackTree
+from serialization import TreeReader, TreeWriter, load, save
+from test_algorithm import assert_valid
+
+def shape_of(tree):
+    return [(node.key, node.value, node.red, depth) for node, depth in tree._iter_depths()]
+
+def make_tree():
+    rng = random.Random(3)
+    tree = RedBlackTree()
+    for key in [rng.randint(0, 500) for _ in range(2000)]:
+        tree.insert(key, str(key) if key % 3 else None)
+    for key in range(0, 500, 7):
+        tree.delete_node(key)
+    return tree
+
+def test_save_and_load():
+    print("Testing binary save/load...")
+    tree = make_tree()
+    buffer = io.BytesIO()
+    save(tree, buffer, chunk_size=100)
+    buffer.seek(0)
+    loaded = load(buffer, allow_pickle=True)  # The values are pickled
+    assert_valid(loaded)
+    assert list(loaded.items()) == list(tree.items())
+
+    # shape=True restores the same nodes, colors and shape
+    buffer = io.BytesIO()
+    save(tree, buffer, shape=True, chunk_size=100)
+    buffer.seek(0)
+    loaded = load(buffer, allow_pickle=True)
+    assert_valid(loaded)
+    assert shape_of(loaded) == shape_of(tree)
+    assert loaded.black_height == tree.black_height
+
+    # Numbers and strings are stored natively, so they load without pickle
+    for keys in (['', 'a', 'b\ud800', 'é' * 300], [b'', b'\x00', b'ab'], [0.5, 1.5], []):
+        buffer = io.BytesIO()
+        save(RedBlackTree.from_sorted(keys), buffer, chunk_size=2)
+        buffer.seek(0)
+        assert list(load(buffer)) == keys
+
+    # Other keys, and values, are pickled and refused unless allowed
+    for tree in (RedBlackTree.from_sorted([1, 2 ** 70]), RedBlackTree.from_sorted([1], ['one'])):
+        buffer = io.BytesIO()
+        save(tree, buffer)
+        try:
+            load(io.BytesIO(buffer.getvalue()))
+            assert False, "pickled chunks need allow_pickle"
+        except ValueError:
+            pass
+        assert list(load(io.BytesIO(buffer.getvalue()), allow_pickle=True).items()) == list(tree.items())
+
+    for data in (b'nope', buffer.getvalue()[:-3]):
+        try:
+            load(io.BytesIO(data), allow_pickle=True)
+            assert False, "bad data should be rejected"
+        except ValueError:
+            pass
+    print("✅ Save/load test passed!")
+
+def test_streaming():
+    print("Testing streaming write/read...")
+    buffer = io.BytesIO()
+    with TreeWriter(buffer, chunk_size=1000) as writer:
+        for key in range(10500):
+            writer.write(key, key * 2 if key % 2 else None)
+        try:
+            writer.write(5)
+            assert False, "out of order keys should be rejected"
+        except ValueError:
+            pass
+    buffer.seek(0)
+    reader = TreeReader(buffer, allow_pickle=True)
+    sizes = [len(keys) for keys, _, _, _ in reader.chunks()]
+    assert sizes == [1000] * 10 + [500]
+    buffer.seek(0)
+    assert list(TreeReader(buffer, allow_pickle=True).items()) == [(k, k * 2 if k % 2 else None) for k in range(10500)]
+    print("✅ Streaming test passed!")
+
+def test_pickle_and_from_shape():
+    print("Testing pickling...")
+    tree = make_tree()
+    tree.add_operation_step("history is not pickled")
+    restored = pickle.loads(pickle.dumps(tree))
+    assert_valid(restored)
+    assert shape_of(restored) == shape_of(tree) and restored.operation_history == []
+
+    # Large trees pickle without deep recursion
+    big = RedBlackTree()
+    big.insert_many(range(50000))
+    assert list(pickle.loads(pickle.dumps(big))) == list(range(50000))
+
+    for depths in ([1, 1], [0, 0], [0, 2], [1]):
+        try:
+            RedBlackTree.from_shape(list(range(len(depths))), None, [False] * len(depths), depths)
+            assert False, "bad depths should be rejected"
+        except ValueError:
+            pass
+    print("✅ Pickle test passed!")
+
+def run_all_tests():
+    print("🧪 Running Serialization Tests...")
+    print("=" * 50)
+
+    try:
+        test_save_and_load()
+        test_streaming()
+        test_pickle_and_from_shape()
+
+        print("=" * 50)
+        print("🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    run_all_tests()
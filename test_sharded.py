@@ -0,0 +1,113 @@
+import random
+from collections import Counter
+from sharded import ShardedRedBlackTree
+
+def test_local_shards():
+    print("Testing sharded tree (in-process shards)...")
+    rng = random.Random(1)
+    keys = [rng.randint(0, 5000) for _ in range(8000)]
+    with ShardedRedBlackTree(shards=4, processes=False) as tree:
+        tree.bulk_load(keys, [k * 2 for k in keys])
+        assert len(tree) == 8000 and list(tree) == sorted(keys)
+        assert len(tree.boundaries) == 3
+        assert max(tree.shard_sizes()) - min(tree.shard_sizes()) < 100
+
+        assert tree.get_many([keys[0], -1], default='missing') == [keys[0] * 2, 'missing']
+        assert tree.search_many([keys[5], -3, keys[7]]) == [True, False, True]
+        assert keys[3] in tree and tree.get(keys[3]) == keys[3] * 2
+
+        # Scans that cross shard and chunk boundaries keep key order
+        expected = [(k, k * 2) for k in sorted(keys) if 1000 <= k <= 4000]
+        assert list(tree.irange_items(1000, 4000, chunk_size=7)) == expected
+        assert list(tree.irange(hi=10, chunk_size=2)) == [k for k in sorted(keys) if k <= 10]
+
+        # Skewed inserts all land in the last shard until it is rebalanced
+        extra = list(range(6000, 16000))
+        tree.insert_many(extra)
+        assert max(tree.shard_sizes()) * 4 <= 2 * len(tree)
+        assert list(tree) == sorted(keys + extra)
+
+        assert tree.delete_many(extra[::2] + [-1]) == 5000
+        assert tree.delete_node(keys[0]) and not tree.delete_node(-1)
+        remaining = Counter(keys + extra)
+        remaining.subtract(extra[::2] + [keys[0]])
+        assert list(tree) == sorted(remaining.elements())
+        assert len(tree) == sum(tree.shard_sizes())
+    print("✅ Sharded tree test passed!")
+
+def test_duplicates_and_boundaries():
+    print("Testing sharded tree with duplicates and fixed boundaries...")
+    with ShardedRedBlackTree(shards=3, processes=False) as tree:
+        # Equal keys never straddle shards, so some shards stay empty
+        tree.bulk_load([1] * 50 + [2] * 7)
+        assert tree.shard_sizes() == [50, 0, 7]
+        assert list(tree.irange(chunk_size=4)) == [1] * 50 + [2] * 7
+        tree.insert(1, 'one')
+        assert tree.shard_sizes() == [51, 0, 7]
+
+    with ShardedRedBlackTree(boundaries=[10, 20], processes=False) as tree:
+        assert tree.shard_count == 3
+        tree.insert_many([5, 10, 15, 20, 25])
+        assert tree.shard_sizes() == [1, 2, 2]
+        assert list(tree.irange(8, 22)) == [10, 15, 20]
+
+    try:
+        ShardedRedBlackTree(boundaries=[3, 1], processes=False)
+        assert False, "unsorted boundaries should be rejected"
+    except ValueError:
+        pass
+    print("✅ Sharded duplicates test passed!")
+
+def test_unsplittable_skew():
+    print("Testing rebalance back-off on a duplicated key...")
+    with ShardedRedBlackTree(shards=4, processes=False) as tree:
+        tree.bulk_load(range(1000))
+        calls = []
+        rebalance = tree.rebalance
+        tree.rebalance = lambda: calls.append(len(tree)) or rebalance()
+        # No boundary can split 5000 copies of one key
+        tree.insert_many([7] * 5000)
+        assert len(calls) == 1 and max(tree.shard_sizes()) >= 5000
+        for key in range(2000, 2500):
+            tree.insert(key)
+        assert len(calls) == 1
+        # After a shard's worth of writes it tries again
+        tree.insert_many(range(3000, 4000))
+        assert len(calls) == 2
+        assert len(tree) == sum(tree.shard_sizes()) == 7500
+        assert list(tree) == sorted(list(range(1000)) + [7] * 5000 + list(range(2000, 2500)) +
+                                    list(range(3000, 4000)))
+    print("✅ Rebalance back-off test passed!")
+
+def test_process_shards():
+    print("Testing sharded tree (worker processes)...")
+    keys = list(range(0, 3000, 3))
+    with ShardedRedBlackTree(shards=2) as tree:
+        tree.bulk_load(keys, [str(k) for k in keys])
+        tree.insert_many([1, 2999], ['a', 'b'])
+        assert tree.get_many([3, 1, 2999, 4]) == ['3', 'a', 'b', None]
+        assert list(tree.irange(2990, chunk_size=2)) == [2991, 2994, 2997, 2999]
+        assert tree.delete_many([0, 1, 4]) == 2
+        assert len(tree) == len(keys)
+    print("✅ Process shards test passed!")
+
+def run_all_tests():
+    print("🧪 Running Sharded Red-Black Tree Tests...")
+    print("=" * 50)
+
+    try:
+        test_local_shards()
+        test_duplicates_and_boundaries()
+        test_unsplittable_skew()
+        test_process_shards()
+
+        print("=" * 50)
+        print("🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,108 @@
+import asyncio
+import os
+import tempfile
+from tree_service import LENGTH, TreeClient, TreeClientError, TreeServer, OP_INSERT
+
+def test_service_operations():
+    print("Testing tree service operations...")
+
+    async def scenario():
+        server = TreeServer()
+        host, port = (await server.start())[:2]
+        async with await TreeClient.connect(host, port) as client:
+            await client.insert(5, "five")
+            await client.insert(3)
+            await client.insert(8, [1, 2])
+            await client.insert(3)
+            assert await client.len() == 4
+            assert await client.search(8) == (True, [1, 2])
+            assert await client.search(4) == (False, None)
+            assert await client.get(5) == "five" and await client.get(7, 0) == 0
+            assert await client.rank(8) == 3
+            assert await client.range(4) == [(5, "five"), (8, [1, 2])]
+            assert await client.range(limit=2) == [(3, None), (3, None)]
+
+            # Pipelined deletes of a duplicated key only succeed once per copy
+            results = await asyncio.gather(*(client.delete(3) for _ in range(3)))
+            assert results == [True, True, False]
+
+            for bad in (client.insert("x"), client.request(OP_INSERT, 1),
+                        client.range(limit=-1), client.request(99)):
+                try:
+                    await bad
+                    assert False, "bad request should be rejected"
+                except TreeClientError:
+                    pass
+            assert await client.len() == 2
+        await server.close()
+
+    asyncio.run(scenario())
+    print("✅ Tree service operations test passed!")
+
+def test_pipelined_batching():
+    print("Testing pipelined request batching...")
+
+    async def scenario():
+        server = TreeServer()
+        with tempfile.TemporaryDirectory() as directory:
+            path = await server.start_unix(os.path.join(directory, "tree.sock"))
+            clients = [await TreeClient.connect_unix(path) for _ in range(4)]
+            await asyncio.gather(*(clients[c].insert(c * 1000 + i)
+                                   for c in range(4) for i in range(500)))
+            assert server.requests == 2000
+            # Pipelined requests are coalesced into far fewer write sections
+            assert server.batches < server.requests // 10
+            assert list(server.tree) == sorted(c * 1000 + i for c in range(4) for i in range(500))
+
+            removed = await asyncio.gather(*(client.delete(k) for client in clients
+                                             for k in range(0, 4000, 2)))
+            assert sum(removed) == 1000 and len(server.tree) == 1000
+            for client in clients:
+                await client.close()
+        await server.close()
+
+    asyncio.run(scenario())
+    print("✅ Pipelined batching test passed!")
+
+def test_truncated_frame():
+    print("Testing a connection closed mid-frame...")
+
+    async def scenario():
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        server = TreeServer()
+        host, port = (await server.start())[:2]
+        reader, writer = await asyncio.open_connection(host, port)
+        # The length promises 100 bytes but the client hangs up after 3
+        writer.write(LENGTH.pack(100) + b'abc')
+        await writer.drain()
+        writer.close()
+        assert await reader.read() == b''
+        async with await TreeClient.connect(host, port) as client:
+            await client.insert(1)
+            assert await client.len() == 1
+        await server.close()
+        assert not errors, errors
+
+    asyncio.run(scenario())
+    print("✅ Truncated frame test passed!")
+
+def run_all_tests():
+    print("🧪 Running Tree Service Tests...")
+    print("=" * 50)
+
+    try:
+        test_service_operations()
+        test_pipelined_batching()
+        test_truncated_frame()
+
+        print("=" * 50)
+        print("🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,98 @@
+import random
+from algorithm import RedBlackTree
+from persistent import PersistentRedBlackTree
+from viewport import VIEW_NULL, tree_viewport
+
+def covered(node):
+    """Tree nodes a view node stands for (itself, or its whole collapsed subtree)"""
+    if node is VIEW_NULL:
+        return 0
+    if node.summary:
+        return node.size
+    return 1 + covered(node.left) + covered(node.right)
+
+def real_depth_below(node):
+    if node is VIEW_NULL or node.summary:
+        return 0
+    return 1 + max(real_depth_below(node.left), real_depth_below(node.right))
+
+def test_viewport_window():
+    print("Testing viewport window...")
+    tree = RedBlackTree()
+    tree.insert_many(range(0, 200000, 2))
+    rng = random.Random(1)
+    for _ in range(50):
+        focus = rng.randrange(200000)
+        depth = rng.randint(0, 5)
+        view = tree_viewport(tree, focus, depth)
+        # Every node is either shown or counted in exactly one summary
+        assert covered(view.root) == view.total == len(tree)
+        # The path ends at the focus key, or where the search for it stopped
+        node = tree.root
+        for key in view.path:
+            assert node.key == key
+            if key != focus:
+                node = node.left if focus < key else node.right
+        assert view.focus.key == view.path[-1]
+        if focus % 2 == 0:
+            assert view.focus.key == focus
+        # At most depth full levels below focus, each ending in summaries
+        assert real_depth_below(view.focus) <= depth + 1
+        assert len(view) <= len(view.path) * 2 + 2 ** (depth + 2)
+    view = tree_viewport(tree, depth=2)
+    assert view.path == [tree.root.key] and view.parent_key is None
+    assert tree_viewport(RedBlackTree()) is None
+    print("✅ Viewport window test passed!")
+
+def test_summary_nodes():
+    print("Testing summary nodes...")
+    tree = RedBlackTree()
+    for key in random.Random(2).sample(range(10000), 3000):
+        tree.insert(key)
+    view = tree_viewport(tree, depth=0)
+    for side in ('left', 'right'):
+        summary = getattr(view.root, side)
+        node = getattr(tree.root, side)
+        assert summary.summary and summary.key == node.key and summary.size == node.size
+        black = 0
+        while node is not tree.TNULL:
+            black += not node.red
+            node = node.right
+        assert summary.black_height == black
+    # Snapshots and persistent versions carry subtree sizes too, and black
+    # heights are right deep in the view whatever the tree type
+    for other in (tree, tree.snapshot(), PersistentRedBlackTree.from_sorted(sorted(tree.irange()))):
+        view = tree_viewport(other, 5000, 3)
+        assert covered(view.root) == len(tree)
+        stack = [(view.root, other.root)]
+        while stack:
+            view_node, node = stack.pop()
+            if view_node.summary:
+                black = 0
+                while node is not other.TNULL:
+                    black += not node.red
+                    node = node.left
+                assert view_node.black_height == black
+            elif view_node is not view.TNULL:
+                stack.append((view_node.left, node.left))
+                stack.append((view_node.right, node.right))
+    print("✅ Summary nodes test passed!")
+
+def run_all_tests():
+    print("🧪 Running Viewport Tests...")
+    print("=" * 50)
+
+    try:
+        test_viewport_window()
+        test_summary_nodes()
+
+        print("=" * 50)
+        print("🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,324 @@
+"""Local Red-Black Tree service over TCP or a Unix socket.
+
+Every message is a frame: a 4-byte big-endian payload length, then the
+payload. A request payload is a request id (uint32), an opcode (uint8) and
+the JSON-encoded argument list; a response payload is the same request id, a
+status byte and the JSON-encoded result (or error message). Clients may send
+any number of requests without waiting (pipelining); responses carry the
+request id, and come back in request order on each connection.
+
+    python tree_service.py --port 8765
+    python tree_service.py --unix /tmp/rbtree.sock
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import struct
+from collections import Counter
+from algorithm import RedBlackTree
+
+OP_INSERT = 1  # (key, value) -> None
+OP_DELETE = 2  # (key,) -> whether one occurrence was removed
+OP_SEARCH = 3  # (key,) -> [found, value]
+OP_RANGE = 4   # (lo, hi, limit) -> [[key, value], ...] with lo <= key <= hi
+OP_RANK = 5    # (key,) -> number of keys smaller than key
+OP_LEN = 6     # () -> number of keys
+OPCODES = {OP_INSERT: 2, OP_DELETE: 1, OP_SEARCH: 1, OP_RANGE: 3, OP_RANK: 1, OP_LEN: 0}
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+LENGTH = struct.Struct('!I')
+HEADER = struct.Struct('!IB')
+# Larger frames are treated as a broken client and close the connection
+MAX_FRAME = 16 * 1024 * 1024
+
+def encode_frame(request_id, code, body):
+    """Frame a request (code is an opcode) or a response (code is a status)"""
+    payload = json.dumps(body, separators=(',', ':')).encode()
+    return LENGTH.pack(HEADER.size + len(payload)) + HEADER.pack(request_id, code) + payload
+
+async def read_frame(reader):
+    """Return (request_id, code, body) for the next frame, or None at EOF"""
+    try:
+        header = await reader.readexactly(LENGTH.size)
+    except asyncio.IncompleteReadError:
+        return None
+    (length,) = LENGTH.unpack(header)
+    if not HEADER.size <= length <= MAX_FRAME:
+        raise ValueError(f"Bad frame length {length}")
+    payload = await reader.readexactly(length)
+    request_id, code = HEADER.unpack_from(payload)
+    return request_id, code, json.loads(payload[HEADER.size:])
+
+def _check_key(key, allow_none=False):
+    # Only numbers are accepted, so every key in the tree stays comparable
+    if key is None and allow_none:
+        return
+    if isinstance(key, bool) or not isinstance(key, (int, float)) or key != key:
+        raise TypeError(f"Keys must be numbers, not {key!r}")
+
+class TreeServer:
+    """Serves one RedBlackTree to any number of pipelined connections.
+
+    Requests that arrive together (from one or many connections) are
+    coalesced: they are queued until the event loop has read everything
+    available, then applied as one batch with no await in between, so the
+    batch is a single write section that no other request interleaves
+    with. Within a batch, requests keep their arrival order; consecutive
+    inserts go through insert_many and consecutive deletes through
+    delete_many.
+    """
+    def __init__(self, tree=None):
+        self.tree = tree if tree is not None else RedBlackTree()
+        self._pending = []  # (writer, request_id, opcode, args) in arrival order
+        self._flush_scheduled = False
+        self._server = None
+        # Totals, for checking how well requests coalesce
+        self.requests = 0
+        self.batches = 0
+
+    async def start(self, host='127.0.0.1', port=0):
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server.sockets[0].getsockname()
+
+    async def start_unix(self, path):
+        self._server = await asyncio.start_unix_server(self._serve, path)
+        return path
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                frame = await read_frame(reader)
+                if frame is None:
+                    break
+                request_id, opcode, args = frame
+                self._pending.append((writer, request_id, opcode, args))
+                if not self._flush_scheduled:
+                    # Runs once every connection has handed over what it has read
+                    self._flush_scheduled = True
+                    asyncio.get_running_loop().call_soon(self._flush)
+                if writer.transport.get_write_buffer_size() > MAX_FRAME:
+                    await writer.drain()
+        except (ValueError, ConnectionError, asyncio.IncompleteReadError):
+            # Bad frames, resets and EOF partway through a frame drop the connection
+            pass
+        finally:
+            writer.close()
+
+    def _flush(self):
+        self._flush_scheduled = False
+        batch, self._pending = self._pending, []
+        self.requests += len(batch)
+        self.batches += 1
+        results = self.apply(batch)
+        for (writer, request_id, _, _), (status, body) in zip(batch, results):
+            if not writer.is_closing():
+                writer.write(encode_frame(request_id, status, body))
+
+    def apply(self, batch):
+        """Apply (writer, request_id, opcode, args) requests in order.
+
+        Returns one (status, body) pair per request.
+        """
+        results = []
+        for opcode, run in itertools.groupby(batch, key=lambda request: request[2]):
+            run = [request[3] for request in run]
+            if opcode == OP_INSERT:
+                results.extend(self._insert_run(run))
+            elif opcode == OP_DELETE:
+                results.extend(self._delete_run(run))
+            else:
+                results.extend(self._apply_one(opcode, args) for args in run)
+        return results
+
+    def _valid(self, opcode, args):
+        """Return an error result for malformed arguments, or None"""
+        try:
+            if OPCODES.get(opcode) is None:
+                raise ValueError(f"Unknown opcode {opcode}")
+            if not isinstance(args, list) or len(args) != OPCODES[opcode]:
+                raise ValueError(f"Opcode {opcode} takes {OPCODES[opcode]} arguments")
+            if opcode == OP_RANGE:
+                _check_key(args[0], allow_none=True)
+                _check_key(args[1], allow_none=True)
+                limit = args[2]
+                if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int)
+                                          or limit < 0):
+                    raise ValueError(f"Range limit must be a non-negative integer, not {limit!r}")
+            elif args:
+                _check_key(args[0])
+        except (TypeError, ValueError) as e:
+            return STATUS_ERROR, str(e)
+        return None
+
+    def _insert_run(self, run):
+        results = [self._valid(OP_INSERT, args) for args in run]
+        accepted = [args for args, error in zip(run, results) if error is None]
+        if accepted and all(value is None for _, value in accepted):
+            self.tree.insert_many([key for key, _ in accepted])
+        else:
+            for key, value in accepted:
+                self.tree.insert(key, value)
+        return [error or (STATUS_OK, None) for error in results]
+
+    def _delete_run(self, run):
+        results = [self._valid(OP_DELETE, args) for args in run]
+        keys = [args[0] for args, error in zip(run, results) if error is None]
+        # Only as many deletes of a key succeed as there are copies of it
+        available = {key: sum(1 for _ in itertools.islice(self.tree._iter_nodes(key, key), wanted))
+                     for key, wanted in Counter(keys).items()}
+        self.tree.delete_many(keys)
+        for i, (args, error) in enumerate(zip(run, results)):
+            if error is None:
+                key = args[0]
+                results[i] = STATUS_OK, available[key] > 0
+                available[key] -= 1
+        return results
+
+    def _apply_one(self, opcode, args):
+        error = self._valid(opcode, args)
+        if error is not None:
+            return error
+        tree = self.tree
+        if opcode == OP_SEARCH:
+            node = tree.search(args[0])
+            if node is tree.TNULL:
+                return STATUS_OK, [False, None]
+            return STATUS_OK, [True, node.value]
+        if opcode == OP_RANGE:
+            lo, hi, limit = args
+            nodes = tree._iter_nodes(lo, hi)
+            if limit is not None:
+                nodes = itertools.islice(nodes, limit)
+            return STATUS_OK, [[node.key, node.value] for node in nodes]
+        if opcode == OP_RANK:
+            return STATUS_OK, tree.rank(args[0])
+        return STATUS_OK, len(tree)
+
+class TreeClientError(Exception):
+    """The service rejected a request"""
+
+class TreeClient:
+    """Pipelined asyncio client for TreeServer.
+
+    Every call sends its request immediately and waits only for its own
+    response, so issuing many calls at once (asyncio.gather) keeps many
+    requests in flight on one connection.
+    """
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count()
+        self._waiting = {}
+        self._receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=8765):
+        return cls(*await asyncio.open_connection(host, port))
+
+    @classmethod
+    async def connect_unix(cls, path):
+        return cls(*await asyncio.open_unix_connection(path))
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        await self._receiver
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.close()
+        return False
+
+    async def _receive(self):
+        try:
+            while True:
+                frame = await read_frame(self._reader)
+                if frame is None:
+                    break
+                request_id, status, body = frame
+                future = self._waiting.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if status == STATUS_OK:
+                    future.set_result(body)
+                else:
+                    future.set_exception(TreeClientError(body))
+        except (ValueError, ConnectionError):
+            pass
+        finally:
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection to tree service lost"))
+            self._waiting.clear()
+
+    async def request(self, opcode, *args):
+        if self._receiver.done():
+            raise ConnectionError("Connection to tree service lost")
+        request_id = next(self._ids) & 0xFFFFFFFF
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        self._writer.write(encode_frame(request_id, opcode, list(args)))
+        if self._writer.transport.get_write_buffer_size() > MAX_FRAME:
+            await self._writer.drain()
+        return await future
+
+    async def insert(self, key, value=None):
+        await self.request(OP_INSERT, key, value)
+
+    async def delete(self, key):
+        """Delete one occurrence of key, returning whether it was present"""
+        return await self.request(OP_DELETE, key)
+
+    async def search(self, key):
+        """Return (found, value) for key"""
+        found, value = await self.request(OP_SEARCH, key)
+        return found, value
+
+    async def get(self, key, default=None):
+        found, value = await self.search(key)
+        return value if found else default
+
+    async def range(self, lo=None, hi=None, limit=None):
+        """Return [(key, value), ...] with lo <= key <= hi in key order"""
+        return [tuple(item) for item in await self.request(OP_RANGE, lo, hi, limit)]
+
+    async def rank(self, key):
+        return await self.request(OP_RANK, key)
+
+    async def len(self):
+        return await self.request(OP_LEN)
+
+async def serve(host, port, unix_path=None):
+    server = TreeServer()
+    if unix_path:
+        address = await server.start_unix(unix_path)
+    else:
+        address = await server.start(host, port)
+    print(f"Serving Red-Black Tree on {address}")
+    await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a Red-Black Tree over a socket")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="Listen on this Unix socket path instead of TCP")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
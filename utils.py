@@ -1,11 +1,84 @@
 import graphviz
+from collections import deque
 from algorithm import RedBlackTree, Node
+from layout import tree_to_svg
+from render_cache import render_cache, render_key
+from viewport import DEFAULT_DEPTH, tree_viewport
 
-def plot_tree(tree):
-    """Create a compact and efficient visualization of the Red-Black Tree"""
+# Trees with more nodes than this are drawn by layout.tree_to_svg, because
+# Graphviz's dot layout takes seconds once trees reach a few thousand nodes
+NATIVE_LAYOUT_THRESHOLD = 500
+# Above this many nodes the app starts in the focus viewport rather than
+# drawing every node
+VIEWPORT_THRESHOLD = 20000
+
+def plot_tree(tree, focus=None, depth=None, view=None):
+    """Return the Graphviz graph for the tree, cached until the tree changes.
+
+    With a focus key or a depth, only the viewport around focus is drawn
+    (see viewport.tree_viewport): the path down to it and depth levels
+    below, every other subtree collapsed into a summary node. The cost then
+    depends on the visible nodes, not on the size of the tree. A caller that
+    already built that TreeViewport can pass it as view to skip rebuilding it.
+    """
     if tree.root == tree.TNULL:
         return None
-    
+    if focus is None and depth is None:
+        key = ('dot', render_key(tree))
+    else:
+        depth = DEFAULT_DEPTH if depth is None else depth
+        key = ('dot-view', render_key(tree), focus, depth)
+    dot = render_cache.get(key)
+    if dot is None:
+        if key[0] == 'dot':
+            dot = _build_tree_graph(tree)
+        else:
+            if view is None:
+                view = tree_viewport(tree, focus, depth)
+            dot = _build_viewport_graph(view)
+        if dot is not None:
+            render_cache.put(key, dot, len(dot.source))
+    return dot
+
+def render_svg(tree, focus=None, depth=None, view=None):
+    """Return the tree (or its viewport) laid out by Graphviz as SVG bytes, cached like plot_tree.
+
+    Returns None when there is nothing to draw, or when Graphviz's dot
+    program is not installed; plot_tree's graph can still be drawn by the
+    browser then.
+    """
+    dot = plot_tree(tree, focus, depth, view)
+    if dot is None:
+        return None
+    key = ('svg', render_key(tree), focus, depth)
+    svg = render_cache.get(key)
+    if svg is None:
+        try:
+            svg = dot.pipe(format='svg')
+        except graphviz.ExecutableNotFound:
+            return None
+        render_cache.put(key, svg, len(svg))
+    return svg
+
+def render_layout_svg(tree):
+    """Return the tree drawn by the built-in tidy layout as SVG text, cached like plot_tree"""
+    if tree.root == tree.TNULL:
+        return None
+    key = ('layout', render_key(tree))
+    svg = render_cache.get(key)
+    if svg is None:
+        svg = tree_to_svg(tree)
+        render_cache.put(key, svg, len(svg))
+    return svg
+
+def use_native_layout(tree):
+    return count_nodes(tree) > NATIVE_LAYOUT_THRESHOLD
+
+def use_viewport(tree):
+    return count_nodes(tree) > VIEWPORT_THRESHOLD
+
+def _build_tree_graph(tree):
+    """Create a compact and efficient visualization of the Red-Black Tree"""
     try:
         # Create the graph with minimal settings
         dot = graphviz.Digraph(comment='Red-Black Tree')
@@ -64,6 +137,36 @@ def plot_tree(tree):
         print(f"Error in tree visualization: {e}")
         return None
 
+def _build_viewport_graph(view):
+    """Draw a TreeViewport: tree nodes as circles, collapsed subtrees as boxes"""
+    dot = graphviz.Digraph(comment='Red-Black Tree viewport')
+    dot.attr(rankdir='TB', dpi='72', nodesep='0.2', ranksep='0.3')
+    dot.attr('node', shape='circle', style='filled', fontcolor='white',
+             width='0.4', height='0.4', fontsize='8', margin='0.01', penwidth='0.5')
+    
+    # Node ids are positions in the view, since keys may repeat
+    ids = {}
+    queue = deque([view.root])
+    while queue:
+        node = queue.popleft()
+        name = ids[node] = str(len(ids))
+        if node.summary:
+            dot.node(name, f"{node.size:,} keys\nbh {node.black_height}", shape='box',
+                     style='filled,dashed', fillcolor='lightgrey', fontcolor='black')
+        elif node is view.focus:
+            dot.node(name, str(node.key), fillcolor='red' if node.red else 'black',
+                     color='gold', penwidth='3')
+        else:
+            dot.node(name, str(node.key), fillcolor='red' if node.red else 'black')
+        for child in (node.left, node.right):
+            if child is not view.TNULL:
+                queue.append(child)
+    for node, name in ids.items():
+        for child in (node.left, node.right):
+            if child is not view.TNULL:
+                dot.edge(name, ids[child])
+    return dot
+
 def _add_nodes_and_edges_compact(dot, tree):
     """Helper function to add nodes and edges with minimal overhead"""
     if tree.root == tree.TNULL:
@@ -90,16 +193,8 @@ def _add_nodes_and_edges_compact(dot, tree):
                 queue.append(current_node.right)
 
 def count_nodes(tree):
-    """Count total number of nodes in the tree"""
-    if tree.root == tree.TNULL:
-        return 0
-    
-    def count_recursive(node):
-        if node == tree.TNULL:
-            return 0
-        return 1 + count_recursive(node.left) + count_recursive(node.right)
-    
-    return count_recursive(tree.root)
+    """Count total number of nodes in the tree (O(1) from the root's subtree size)"""
+    return len(tree)
 
 def get_tree_height(tree):
     """Get the height of the tree"""
@@ -115,95 +210,108 @@ def get_tree_height(tree):
 
 def get_black_height(tree):
     """Get the black height of the tree (number of black nodes from root to any leaf)"""
-    if tree.root == tree.TNULL:
-        return 0
-    
-    def black_height_recursive(node):
-        if node == tree.TNULL:
-            return 0
-        
-        # Count black nodes on the path
-        black_count = 1 if node.color == "BLACK" else 0
-        
-        # All paths should have the same black height
-        left_height = black_height_recursive(node.left)
-        right_height = black_height_recursive(node.right)
-        
-        # Return the black height plus current node if it's black
-        return black_count + left_height
+    if hasattr(tree, 'black_height'):
+        return tree.black_height
     
-    return black_height_recursive(tree.root)
+    # All paths have the same black height, so the leftmost path is enough
+    black_count = 0
+    node = tree.root
+    while node != tree.TNULL:
+        if not node.red:
+            black_count += 1
+        node = node.left
+    return black_count
 
-def validate_red_black_properties(tree):
-    """Validate that the tree satisfies all Red-Black Tree properties"""
+def get_height_bound(tree):
+    """Upper bound on the tree height (in edges) implied by its black height"""
+    return max(2 * get_black_height(tree) - 1, 0)
+
+def validate_red_black_properties(tree, fail_first=False):
+    """Validate that the tree satisfies all Red-Black Tree properties.
+
+    Runs one iterative pass that checks node colors, the black root, red
+    nodes with red children, equal black heights, BST ordering, and (where
+    the nodes carry them) parent pointers and subtree sizes. With
+    fail_first=True it stops at the first violation.
+    """
     if tree.root == tree.TNULL:
         return True, "Empty tree is valid"
     
+    TNULL = tree.TNULL
     violations = []
     
-    # Property 1: Every node is either red or black
-    def check_colors(node):
-        if node == tree.TNULL:
-            return
-        if node.color not in ["RED", "BLACK"]:
-            violations.append(f"Node {node.key} has invalid color: {node.color}")
-        check_colors(node.left)
-        check_colors(node.right)
-    
     # Property 2: Root is black
     if tree.root.color != "BLACK":
         violations.append("Root is not black")
+        if fail_first:
+            return False, f"Violations found: {violations[0]}"
     
-    # Property 4: Red nodes cannot have red children
-    def check_red_children(node):
-        if node == tree.TNULL:
-            return
-        if node.color == "RED":
-            if node.left != tree.TNULL and node.left.color == "RED":
-                violations.append(f"Red node {node.key} has red left child {node.left.key}")
-            if node.right != tree.TNULL and node.right.color == "RED":
-                violations.append(f"Red node {node.key} has red right child {node.right.key}")
-        check_red_children(node.left)
-        check_red_children(node.right)
-    
-    # Property 5: All paths from root to leaves have same number of black nodes
-    def get_black_height_path(node):
-        if node == tree.TNULL:
-            return 0
-        black_count = 1 if node.color == "BLACK" else 0
-        return black_count + get_black_height_path(node.left)
-    
-    def check_black_height_consistency(node, expected_height, current_height):
-        if node == tree.TNULL:
-            if current_height != expected_height:
-                violations.append(f"Path to leaf has black height {current_height}, expected {expected_height}")
-            return
+    expected_black_height = None
+    # Each entry: (node, parent, lowest allowed key, highest allowed key, black nodes above)
+    stack = [(tree.root, None, None, None, 0)]
+    while stack:
+        node, parent, low, high, black_above = stack.pop()
+        start = len(violations)
         
-        new_height = current_height + (1 if node.color == "BLACK" else 0)
-        check_black_height_consistency(node.left, expected_height, new_height)
-        check_black_height_consistency(node.right, expected_height, new_height)
-    
-    # Run all checks
-    check_colors(tree.root)
-    check_red_children(tree.root)
-    
-    expected_black_height = get_black_height_path(tree.root)
-    check_black_height_consistency(tree.root, expected_black_height, 0)
+        # Property 1: Every node is either red or black
+        color = node.color
+        if color not in ("RED", "BLACK"):
+            violations.append(f"Node {node.key} has invalid color: {color}")
+        
+        if (low is not None and node.key < low) or (high is not None and node.key > high):
+            violations.append(f"Node {node.key} is out of BST order")
+        if getattr(node, 'parent', parent) is not parent:
+            violations.append(f"Node {node.key} has a wrong parent pointer")
+        
+        left, right = node.left, node.right
+        size = getattr(node, 'size', None)
+        if size is not None and size != left.size + right.size + 1:
+            violations.append(f"Node {node.key} has size {size}, expected {left.size + right.size + 1}")
+        
+        # Property 4: Red nodes cannot have red children
+        if color == "RED":
+            if left != TNULL and left.color == "RED":
+                violations.append(f"Red node {node.key} has red left child {left.key}")
+            if right != TNULL and right.color == "RED":
+                violations.append(f"Red node {node.key} has red right child {right.key}")
+        
+        # Property 5: All paths from root to leaves have same number of black nodes
+        black_count = black_above + (1 if color == "BLACK" else 0)
+        if left == TNULL or right == TNULL:
+            if expected_black_height is None:
+                expected_black_height = black_count
+            elif black_count != expected_black_height:
+                violations.append(f"Path to leaf has black height {black_count}, expected {expected_black_height}")
+        
+        if fail_first and len(violations) > start:
+            del violations[start + 1:]
+            break
+        
+        if right != TNULL:
+            stack.append((right, node, node.key, high, black_count))
+        if left != TNULL:
+            stack.append((left, node, low, node.key, black_count))
     
     if violations:
         return False, f"Violations found: {'; '.join(violations)}"
     else:
         return True, "All Red-Black Tree properties are satisfied"
 
-def get_tree_statistics(tree):
-    """Get comprehensive statistics about the tree"""
+def get_tree_statistics(tree, validate=False):
+    """Get comprehensive statistics about the tree.
+
+    Counts are maintained by the tree itself, so this is O(1). Pass
+    validate=True to also run the O(n) property check once.
+    """
     stats = {
         'total_nodes': count_nodes(tree),
-        'height': get_tree_height(tree),
+        'height_bound': get_height_bound(tree),
         'black_height': get_black_height(tree),
-        'is_valid': validate_red_black_properties(tree)[0],
-        'validation_message': validate_red_black_properties(tree)[1]
+        'rotations': getattr(tree, 'rotations', 0),
+        'recolors': getattr(tree, 'recolors', 0)
     }
+    if validate:
+        stats['is_valid'], stats['validation_message'] = validate_red_black_properties(tree)
     return stats
 
 def measure_operation_time(operation_func, *args, **kwargs):
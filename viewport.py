@@ -0,0 +1,156 @@
+"""Focus-and-depth views of large trees.
+
+tree_viewport keeps only the part of a tree worth drawing: the path from
+the root to a focus key and a window of levels below it. Every subtree left
+out is replaced by one summary node carrying its size and black height, so
+building a view costs O(visible nodes + log n) however large the tree is.
+
+Works with anything exposing root/TNULL and nodes with key/red/left/right/size:
+RedBlackTree, TreeSnapshot and PersistentRedBlackTree.
+"""
+
+DEFAULT_DEPTH = 4  # Levels shown below the focus node
+
+class ViewNode:
+    """A node of a TreeViewport.
+
+    Summary nodes stand for a whole collapsed subtree: key is the key of
+    that subtree's root (so the view can be re-focused there), size is its
+    node count and black_height the black nodes on any path down from it.
+    """
+    __slots__ = ('key', 'red', 'left', 'right', 'summary', 'size', 'black_height')
+
+    def __init__(self, key, red, summary=False, size=1, black_height=0):
+        self.key = key
+        self.red = red
+        self.left = VIEW_NULL
+        self.right = VIEW_NULL
+        self.summary = summary
+        self.size = size
+        self.black_height = black_height
+
+    @property
+    def color(self):
+        return "RED" if self.red else "BLACK"
+
+VIEW_NULL = ViewNode.__new__(ViewNode)
+VIEW_NULL.key = None
+VIEW_NULL.red = False
+VIEW_NULL.left = VIEW_NULL.right = None
+VIEW_NULL.summary = False
+VIEW_NULL.size = VIEW_NULL.black_height = 0
+
+class TreeViewport:
+    """The visible part of a tree, shaped like a tree itself (root/TNULL).
+
+    path holds the keys from the root down to focus, the ViewNode the view
+    is centered on (the focus key's node, or where the search for it ended).
+    """
+    def __init__(self, root, focus, path, depth, total):
+        self.root = root
+        self.TNULL = VIEW_NULL
+        self.focus = focus
+        self.path = path
+        self.depth = depth
+        self.total = total  # Nodes in the whole tree
+
+    def __len__(self):
+        """Number of ViewNodes, summaries included"""
+        count = 0
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is not VIEW_NULL:
+                count += 1
+                stack.append(node.left)
+                stack.append(node.right)
+        return count
+
+    @property
+    def parent_key(self):
+        """Key to focus on to move one level up (None at the root)"""
+        return self.path[-2] if len(self.path) > 1 else None
+
+def _black_height(node, TNULL):
+    # Every path down has the same black height, so the leftmost one will do.
+    # Only used once, for the root of trees that do not maintain it
+    height = 0
+    while node is not TNULL:
+        if not node.red:
+            height += 1
+        node = node.left
+    return height
+
+def _summarize(node, TNULL, black_height):
+    if node is TNULL:
+        return VIEW_NULL
+    return ViewNode(node.key, node.red, True, node.size, black_height)
+
+def _child_black_height(node, black_height):
+    """Black height of node's children, given node's own"""
+    return black_height if node.red else black_height - 1
+
+def tree_viewport(tree, focus=None, depth=DEFAULT_DEPTH):
+    """Return the TreeViewport around focus (the root when None), or None if empty.
+
+    The nodes on the path from the root to focus are shown, with the
+    subtrees hanging off the path collapsed into summaries; below focus,
+    depth more levels are shown in full before collapsing. Black heights
+    are carried down from the root, so each visible node costs O(1).
+    """
+    TNULL = tree.TNULL
+    if tree.root is TNULL:
+        return None
+    if depth < 0:
+        raise ValueError("depth must be non-negative")
+
+    path = [tree.root]
+    if focus is not None:
+        node = tree.root
+        while focus != node.key:
+            node = node.left if focus < node.key else node.right
+            if node is TNULL:
+                break
+            path.append(node)
+
+    # Black nodes on any path from the root down, counting the root
+    black_height = getattr(tree, 'black_height', None)
+    if black_height is None:
+        black_height = _black_height(tree.root, TNULL)
+
+    # Path nodes: the child on the path is expanded, the other summarized
+    root = parent = None
+    for i, node in enumerate(path):
+        if i:
+            black_height = _child_black_height(path[i - 1], black_height)
+        view = ViewNode(node.key, node.red)
+        if parent is None:
+            root = view
+        elif node is path[i - 1].left:
+            parent.left = view
+        else:
+            parent.right = view
+        if i + 1 < len(path):
+            child_bh = _child_black_height(node, black_height)
+            if path[i + 1] is node.left:
+                view.right = _summarize(node.right, TNULL, child_bh)
+            else:
+                view.left = _summarize(node.left, TNULL, child_bh)
+        parent = view
+    focus_view = parent
+
+    # The window below focus
+    stack = [(path[-1], focus_view, depth, black_height)]
+    while stack:
+        node, view, levels, node_bh = stack.pop()
+        child_bh = _child_black_height(node, node_bh)
+        for side in ('left', 'right'):
+            child = getattr(node, side)
+            if child is TNULL or levels == 0:
+                setattr(view, side, _summarize(child, TNULL, child_bh))
+                continue
+            child_view = ViewNode(child.key, child.red)
+            setattr(view, side, child_view)
+            stack.append((child, child_view, levels - 1, child_bh))
+
+    return TreeViewport(root, focus_view, [node.key for node in path], depth, tree.root.size)